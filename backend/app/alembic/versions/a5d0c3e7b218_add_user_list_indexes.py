@@ -0,0 +1,37 @@
+"""Add user list indexes
+
+Revision ID: a5d0c3e7b218
+Revises: f2c6d8e0a417
+Create Date: 2026-10-19 18:12:40.318205
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = 'a5d0c3e7b218'
+down_revision = 'f2c6d8e0a417'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    # Build concurrently, the user table stays writable while indexes are built
+    with op.get_context().autocommit_block():
+        op.create_index('ix_user_email_trgm', 'user', ['email'], unique=False, postgresql_using='gin', postgresql_ops={'email': 'gin_trgm_ops'}, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_user_full_name_trgm', 'user', ['full_name'], unique=False, postgresql_using='gin', postgresql_ops={'full_name': 'gin_trgm_ops'}, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_user_full_name_id', 'user', ['full_name', 'id'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_user_is_active_email', 'user', ['is_active', 'email'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_user_is_superuser_email', 'user', ['is_superuser', 'email'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_user_is_superuser_email', table_name='user', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_user_is_active_email', table_name='user', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_user_full_name_id', table_name='user', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_user_full_name_trgm', table_name='user', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_user_email_trgm', table_name='user', postgresql_concurrently=True, if_exists=True)
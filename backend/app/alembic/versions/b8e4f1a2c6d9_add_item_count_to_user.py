@@ -0,0 +1,48 @@
+"""Add item_count to user
+
+Revision ID: b8e4f1a2c6d9
+Revises: a5d0c3e7b218
+Create Date: 2026-10-19 19:03:27.541862
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8e4f1a2c6d9'
+down_revision = 'a5d0c3e7b218'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+
+def upgrade():
+    op.add_column('user', sa.Column('item_count', sa.Integer(), server_default='0', nullable=False))
+
+    # Backfill in small committed batches, counts that drift while this runs are
+    # fixed afterwards with `python app/reconcile_item_counts.py`
+    with op.get_context().autocommit_block():
+        connection = op.get_bind()
+        last_id = None
+        while True:
+            user_ids = connection.execute(sa.text("""
+                SELECT id FROM "user"
+                WHERE CAST(:last_id AS uuid) IS NULL OR id > CAST(:last_id AS uuid)
+                ORDER BY id LIMIT :batch_size
+            """), {"last_id": last_id, "batch_size": BATCH_SIZE}).scalars().all()
+            if not user_ids:
+                break
+            connection.execute(sa.text("""
+                UPDATE "user" SET item_count = (
+                    SELECT count(*) FROM item WHERE item.owner_id = "user".id
+                )
+                WHERE id = ANY(:user_ids)
+            """), {"user_ids": list(user_ids)})
+            last_id = user_ids[-1]
+
+
+def downgrade():
+    op.drop_column('user', 'item_count')
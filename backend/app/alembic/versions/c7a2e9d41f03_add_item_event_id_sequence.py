@@ -0,0 +1,26 @@
+"""Add item event id sequence
+
+Revision ID: c7a2e9d41f03
+Revises: b4f1c2d3e5a6
+Create Date: 2026-10-19 11:03:27.518204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7a2e9d41f03'
+down_revision = 'b4f1c2d3e5a6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Ids of the events sent through NOTIFY on the item_events channel
+    op.execute(sa.schema.CreateSequence(sa.Sequence('item_event_id_seq')))
+
+
+def downgrade():
+    op.execute(sa.schema.DropSequence(sa.Sequence('item_event_id_seq')))
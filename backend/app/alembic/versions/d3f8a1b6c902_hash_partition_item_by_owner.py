@@ -0,0 +1,91 @@
+"""Hash partition item by owner_id
+
+Revision ID: d3f8a1b6c902
+Revises: c7a2e9d41f03
+Create Date: 2026-10-19 13:41:09.864310
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3f8a1b6c902'
+down_revision = 'c7a2e9d41f03'
+branch_labels = None
+depends_on = None
+
+# Must match app.models.ITEM_PARTITIONS
+ITEM_PARTITIONS = 16
+BATCH_SIZE = 10000
+
+
+def upgrade():
+    # Postgres can't partition an existing table, build a new one and copy the rows
+    op.rename_table('item', 'item_unpartitioned')
+    op.execute('ALTER INDEX item_pkey RENAME TO item_unpartitioned_pkey')
+
+    op.create_table(
+        'item',
+        sa.Column('title', sqlmodel.sql.sqltypes.AutoString(length=255), nullable=False),
+        sa.Column('description', sqlmodel.sql.sqltypes.AutoString(length=255), nullable=True),
+        sa.Column('id', sa.Uuid(), nullable=False),
+        sa.Column('owner_id', sa.Uuid(), nullable=False),
+        sa.ForeignKeyConstraint(['owner_id'], ['user.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('owner_id', 'id'),
+        postgresql_partition_by='HASH (owner_id)',
+    )
+    for remainder in range(ITEM_PARTITIONS):
+        op.execute(
+            f'CREATE TABLE item_p{remainder} PARTITION OF item '
+            f'FOR VALUES WITH (MODULUS {ITEM_PARTITIONS}, REMAINDER {remainder})'
+        )
+
+    # Copy in small committed batches, items not copied yet can't be found, so
+    # stop the backend while this runs
+    with op.get_context().autocommit_block():
+        connection = op.get_bind()
+        last_id = None
+        while True:
+            item_ids = connection.execute(sa.text("""
+                SELECT id FROM item_unpartitioned
+                WHERE CAST(:last_id AS uuid) IS NULL OR id > CAST(:last_id AS uuid)
+                ORDER BY id LIMIT :batch_size
+            """), {"last_id": last_id, "batch_size": BATCH_SIZE}).scalars().all()
+            if not item_ids:
+                break
+            connection.execute(sa.text("""
+                INSERT INTO item (title, description, id, owner_id)
+                SELECT title, description, id, owner_id FROM item_unpartitioned
+                WHERE id = ANY(:item_ids)
+            """), {"item_ids": list(item_ids)})
+            last_id = item_ids[-1]
+
+    # Not unique, a unique index on a partitioned table must include owner_id.
+    # Ids are random UUIDs generated by the backend, never sent by clients.
+    # Built after the copy, much faster than maintaining it row by row
+    op.create_index(op.f('ix_item_id'), 'item', ['id'], unique=False)
+    op.drop_table('item_unpartitioned')
+
+
+def downgrade():
+    op.rename_table('item', 'item_partitioned')
+    op.execute('ALTER INDEX item_pkey RENAME TO item_partitioned_pkey')
+    op.execute('ALTER INDEX ix_item_id RENAME TO ix_item_partitioned_id')
+
+    op.create_table(
+        'item',
+        sa.Column('title', sqlmodel.sql.sqltypes.AutoString(length=255), nullable=False),
+        sa.Column('description', sqlmodel.sql.sqltypes.AutoString(length=255), nullable=True),
+        sa.Column('id', sa.Uuid(), nullable=False),
+        sa.Column('owner_id', sa.Uuid(), nullable=False),
+        sa.ForeignKeyConstraint(['owner_id'], ['user.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.execute(
+        'INSERT INTO item (title, description, id, owner_id) '
+        'SELECT title, description, id, owner_id FROM item_partitioned'
+    )
+    # Drops the partitions as well
+    op.drop_table('item_partitioned')
@@ -0,0 +1,30 @@
+"""Add user filtered full_name indexes
+
+Revision ID: e5c1a9f3b7d2
+Revises: d4b9e2f7a031
+Create Date: 2026-10-19 21:04:52.106388
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5c1a9f3b7d2'
+down_revision = 'd4b9e2f7a031'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Build concurrently, the user table stays writable while indexes are built
+    with op.get_context().autocommit_block():
+        op.create_index('ix_user_is_active_full_name_id', 'user', ['is_active', 'full_name', 'id'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_user_is_superuser_full_name_id', 'user', ['is_superuser', 'full_name', 'id'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_user_is_superuser_full_name_id', table_name='user', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_user_is_active_full_name_id', table_name='user', postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,75 @@
+"""Store user emails lowercased
+
+Revision ID: f2c6d8e0a417
+Revises: e91b5c0d7a24
+Create Date: 2026-10-19 17:05:13.772940
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2c6d8e0a417'
+down_revision = 'e91b5c0d7a24'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        connection = op.get_bind()
+        # Accounts differing only by case can't all keep their email. Keep the
+        # most privileged one, deactivate the others and move them to a
+        # placeholder email so an admin can merge them, nothing is deleted.
+        connection.execute(sa.text("""
+            CREATE TEMPORARY TABLE user_email_duplicate AS
+            SELECT id FROM (
+                SELECT id, row_number() OVER (
+                    PARTITION BY lower(email)
+                    ORDER BY is_superuser DESC, is_active DESC, email = lower(email) DESC, id
+                ) AS rank
+                FROM "user"
+            ) AS ranked
+            WHERE rank > 1
+        """))
+        for user_ids in batches(connection, "user_email_duplicate"):
+            connection.execute(sa.text("""
+                UPDATE "user" SET
+                    email = 'duplicate-' || id || '@invalid.example',
+                    is_active = false
+                WHERE id = ANY(:user_ids)
+            """), {"user_ids": user_ids})
+        connection.execute(sa.text("DROP TABLE user_email_duplicate"))
+
+        # Lowercase the rest once no duplicate holds their email, in small
+        # committed batches to keep row locks short
+        for user_ids in batches(connection, '"user"'):
+            connection.execute(sa.text("""
+                UPDATE "user" SET email = lower(email)
+                WHERE id = ANY(:user_ids) AND email <> lower(email)
+            """), {"user_ids": user_ids})
+
+    op.create_check_constraint('ck_user_email_lower', 'user', 'email = lower(email)')
+
+
+def batches(connection, table):
+    # Walk the ids in order, each batch starts after the last one
+    last_id = None
+    while True:
+        user_ids = connection.execute(sa.text(f"""
+            SELECT id FROM {table}
+            WHERE CAST(:last_id AS uuid) IS NULL OR id > CAST(:last_id AS uuid)
+            ORDER BY id LIMIT :batch_size
+        """), {"last_id": last_id, "batch_size": BATCH_SIZE}).scalars().all()
+        if not user_ids:
+            return
+        yield list(user_ids)
+        last_id = user_ids[-1]
+
+
+def downgrade():
+    op.drop_constraint('ck_user_email_lower', 'user', type_='check')
@@ -10,7 +10,10 @@ from sqlmodel import Session
 
 from app.core import security
 from app.core.config import settings
-from app.core.db import engine
+from app.core.db import get_engine
+from app.core.profiling import register_thread
+from app.core.timing import timed
+from app.core.tracing import traced
 from app.models import TokenPayload, User
 
 reusable_oauth2 = OAuth2PasswordBearer(
@@ -19,7 +22,9 @@ reusable_oauth2 = OAuth2PasswordBearer(
 
 
 def get_db() -> Generator[Session, None, None]:
-    with Session(engine) as session:
+    # Run in a worker thread, like the sync routes using the session
+    register_thread()
+    with Session(get_engine()) as session:
         yield session
 
 
@@ -28,27 +33,42 @@ TokenDep = Annotated[str, Depends(reusable_oauth2)]
 
 
 def get_current_user(session: SessionDep, token: TokenDep) -> User:
-    try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
-        )
-        token_data = TokenPayload(**payload)
-    except (InvalidTokenError, ValidationError):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Could not validate credentials",
-        )
-    user = session.get(User, token_data.sub)
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    if not user.is_active:
-        raise HTTPException(status_code=400, detail="Inactive user")
-    return user
+    with traced("get_current_user"):
+        try:
+            with timed("auth"):
+                payload = jwt.decode(
+                    token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
+                )
+                token_data = TokenPayload(**payload)
+        except (InvalidTokenError, ValidationError):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Could not validate credentials",
+            )
+        with timed("user"):
+            user = session.get(User, token_data.sub)
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        if not user.is_active:
+            raise HTTPException(status_code=400, detail="Inactive user")
+        return user
 
 
 CurrentUser = Annotated[User, Depends(get_current_user)]
 
 
+def is_superuser_token(token: str) -> bool:
+    """
+    Whether the token belongs to an active superuser, for middlewares.
+    """
+    with Session(get_engine()) as session:
+        try:
+            user = get_current_user(session, token)
+        except HTTPException:
+            return False
+        return user.is_superuser
+
+
 def get_current_active_superuser(current_user: CurrentUser) -> User:
     if not current_user.is_superuser:
         raise HTTPException(
@@ -1,6 +1,14 @@
 from fastapi import APIRouter
 
-from app.api.routes import items, login, private, users, utils
+from app.api.routes import (
+    broadcasts,
+    diagnostics,
+    items,
+    login,
+    private,
+    users,
+    utils,
+)
 from app.core.config import settings
 
 api_router = APIRouter()
@@ -8,6 +16,8 @@ api_router.include_router(login.router)
 api_router.include_router(users.router)
 api_router.include_router(utils.router)
 api_router.include_router(items.router)
+api_router.include_router(broadcasts.router)
+api_router.include_router(diagnostics.router)
 
 
 if settings.ENVIRONMENT == "local":
@@ -0,0 +1,62 @@
+import uuid
+from typing import Any
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlmodel import select
+
+from app.api.deps import SessionDep, get_current_active_superuser
+from app.broadcast import broadcast_job_queued, enqueue_broadcast
+from app.core.config import settings
+from app.models import Broadcast, BroadcastCreate, BroadcastPublic
+
+router = APIRouter(
+    prefix="/broadcasts",
+    tags=["broadcasts"],
+    dependencies=[Depends(get_current_active_superuser)],
+)
+
+
+@router.post("/", response_model=BroadcastPublic, status_code=202)
+def create_broadcast(*, session: SessionDep, broadcast_in: BroadcastCreate) -> Any:
+    """
+    Email a message to all active users, it is sent by the job worker.
+    """
+    if not settings.emails_enabled:
+        raise HTTPException(status_code=400, detail="Emails are not enabled")
+    broadcast = Broadcast.model_validate(broadcast_in)
+    session.add(broadcast)
+    enqueue_broadcast(session=session, broadcast=broadcast)
+    session.commit()
+    session.refresh(broadcast)
+    return broadcast
+
+
+@router.get("/{id}", response_model=BroadcastPublic)
+def read_broadcast(session: SessionDep, id: uuid.UUID) -> Any:
+    """
+    Get a broadcast and its progress.
+    """
+    broadcast = session.get(Broadcast, id)
+    if not broadcast:
+        raise HTTPException(status_code=404, detail="Broadcast not found")
+    return broadcast
+
+
+@router.post("/{id}/resume", response_model=BroadcastPublic, status_code=202)
+def resume_broadcast(session: SessionDep, id: uuid.UUID) -> Any:
+    """
+    Send a broadcast whose job failed to the remaining users.
+    """
+    # Locked so concurrent resumes can't both queue a job
+    statement = select(Broadcast).where(Broadcast.id == id).with_for_update()
+    broadcast = session.exec(statement).first()
+    if not broadcast:
+        raise HTTPException(status_code=404, detail="Broadcast not found")
+    if broadcast.status == "done":
+        raise HTTPException(status_code=409, detail="Broadcast already sent")
+    if broadcast_job_queued(session=session, broadcast_id=broadcast.id):
+        raise HTTPException(status_code=409, detail="Broadcast is being sent")
+    enqueue_broadcast(session=session, broadcast=broadcast)
+    session.commit()
+    session.refresh(broadcast)
+    return broadcast
@@ -0,0 +1,110 @@
+import uuid
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from app.api.deps import get_current_active_superuser
+from app.core import memory
+from app.core.profiling import call_tree, parse_collapsed_stacks, profile_path
+from app.models import AllocationSites, GCStats, MemoryStatus, ObjectCounts
+
+# Memory is diagnosed in the worker process handling the request, its pid is
+# returned to tell them apart
+router = APIRouter(
+    prefix="/diagnostics",
+    tags=["diagnostics"],
+    dependencies=[Depends(get_current_active_superuser)],
+)
+
+
+@router.get("/profiles/{profile_id}", response_class=PlainTextResponse)
+def read_profile(
+    profile_id: uuid.UUID, format: Literal["tree", "collapsed"] = "tree"
+) -> str:
+    """
+    Get the profile of a request sent with an X-Profile header, as a call tree or
+    as collapsed stacks to open in speedscope or flamegraph.pl.
+    """
+    path = profile_path(profile_id.hex)
+    if not path.exists():
+        raise HTTPException(status_code=404, detail="Profile not found")
+    collapsed = path.read_text()
+    if format == "collapsed":
+        return collapsed
+    return call_tree(parse_collapsed_stacks(collapsed))
+
+
+@router.get("/memory", response_model=MemoryStatus)
+def read_memory_status() -> MemoryStatus:
+    """
+    Get the memory used by the worker, and by the traced allocations.
+    """
+    return memory.memory_status()
+
+
+@router.post("/memory/start", response_model=MemoryStatus)
+def start_memory_tracing(frames: int = Query(default=1, ge=1, le=100)) -> MemoryStatus:
+    """
+    Trace the allocations of the worker, recording `frames` frames of their
+    traceback, and take the snapshot they are compared to.
+    """
+    if not memory.start_tracing(frames):
+        raise HTTPException(
+            status_code=409, detail="Memory tracing is already started, stop it first"
+        )
+    return memory.memory_status()
+
+
+@router.post("/memory/stop", response_model=MemoryStatus)
+def stop_memory_tracing() -> MemoryStatus:
+    """
+    Stop tracing allocations, tracing slows down the worker.
+    """
+    memory.stop_tracing()
+    return memory.memory_status()
+
+
+@router.post("/memory/snapshot", response_model=MemoryStatus)
+def take_memory_snapshot() -> MemoryStatus:
+    """
+    Compare the allocations to the ones alive now from now on.
+    """
+    if not memory.memory_status().tracing:
+        raise HTTPException(status_code=400, detail="Memory tracing is not started")
+    memory.replace_snapshot()
+    return memory.memory_status()
+
+
+@router.get("/memory/allocations", response_model=AllocationSites)
+def read_allocations(
+    group_by: memory.GroupBy = "lineno",
+    limit: int = Query(default=20, ge=1, le=1000),
+    compare: bool = False,
+) -> AllocationSites:
+    """
+    Get the sites holding the most memory or, with `compare`, the ones which grew
+    the most since the snapshot.
+    """
+    allocations = memory.top_allocations(
+        group_by=group_by, limit=limit, compare=compare
+    )
+    if allocations is None:
+        raise HTTPException(status_code=400, detail="Memory tracing is not started")
+    return allocations
+
+
+@router.get("/memory/objects", response_model=ObjectCounts)
+def read_object_counts(limit: int = Query(default=50, ge=1, le=1000)) -> ObjectCounts:
+    """
+    Get the most common types of objects tracked by the garbage collector.
+    """
+    return memory.object_counts(limit)
+
+
+@router.get("/memory/gc", response_model=GCStats)
+def read_gc_stats() -> GCStats:
+    """
+    Get the collections, collected objects and thresholds of each generation.
+    """
+    return memory.gc_stats()
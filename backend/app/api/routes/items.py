@@ -1,44 +1,117 @@
 import uuid
-from typing import Any
+from typing import Annotated, Any
 
-from fastapi import APIRouter, HTTPException
-from sqlmodel import func, select
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlmodel import Session, func, select
 
+from app import crud
 from app.api.deps import CurrentUser, SessionDep
-from app.models import Item, ItemCreate, ItemPublic, ItemsPublic, ItemUpdate, Message
+from app.core.cache import get_items_cache, items_cache_key
+from app.core.config import settings
+from app.core.events import item_event_broker, stream_item_events
+from app.core.responses import TrustedResponse
+from app.core.timing import timed
+from app.models import (
+    Item,
+    ItemCreate,
+    ItemPublic,
+    ItemsPublic,
+    ItemUpdate,
+    Message,
+    User,
+)
 
 router = APIRouter(prefix="/items", tags=["items"])
 
 
+def get_item_for_user(*, session: Session, current_user: User, id: uuid.UUID) -> Item:
+    owner_id = None if current_user.is_superuser else current_user.id
+    item = crud.get_item(session=session, item_id=id, owner_id=owner_id)
+    if not item:
+        # Only pay for the lookup across all partitions on the error path
+        if owner_id is not None and crud.get_item(session=session, item_id=id):
+            raise HTTPException(status_code=400, detail="Not enough permissions")
+        raise HTTPException(status_code=404, detail="Item not found")
+    return item
+
+
 @router.get("/", response_model=ItemsPublic)
 def read_items(
     session: SessionDep, current_user: CurrentUser, skip: int = 0, limit: int = 100
 ) -> Any:
     """
     Retrieve items.
+
+    Pages are built as JSON by the database, without loading Item instances.
+    Pages of regular users are cached under their items version, so any change
+    to their items makes the previously cached pages unreachable.
     """
 
     if current_user.is_superuser:
         count_statement = select(func.count()).select_from(Item)
-        count = session.exec(count_statement).one()
-        statement = select(Item).offset(skip).limit(limit)
-        items = session.exec(statement).all()
-    else:
-        count_statement = (
-            select(func.count())
-            .select_from(Item)
-            .where(Item.owner_id == current_user.id)
-        )
-        count = session.exec(count_statement).one()
-        statement = (
-            select(Item)
-            .where(Item.owner_id == current_user.id)
-            .offset(skip)
-            .limit(limit)
+        with timed("count"):
+            count = session.exec(count_statement).one()
+        with timed("page"):
+            body = crud.get_items_page_json(
+                session=session, count=count, skip=skip, limit=limit
+            )
+        return TrustedResponse(body)
+
+    cache = get_items_cache() if settings.ITEMS_CACHE_ENABLED else None
+    cache_key = items_cache_key(
+        owner_id=current_user.id,
+        version=current_user.items_version,
+        skip=skip,
+        limit=limit,
+    )
+    with timed("cache"):
+        cached = cache.get(cache_key) if cache else None
+    if cached is not None:
+        return TrustedResponse(cached)
+    # Kept up to date by the item write paths, no need to count the rows
+    with timed("page"):
+        body = crud.get_items_page_json(
+            session=session,
+            count=current_user.item_count,
+            skip=skip,
+            limit=limit,
+            owner_id=current_user.id,
         )
-        items = session.exec(statement).all()
+    if cache:
+        cache.set(cache_key, body)
+    return TrustedResponse(body)
+
+
+@router.get("/events", response_class=StreamingResponse)
+async def read_item_events(
+    session: SessionDep,
+    current_user: CurrentUser,
+    last_event_id: Annotated[int | None, Header()] = None,
+) -> StreamingResponse:
+    """
+    Stream item changes as Server-Sent Events.
 
-    return ItemsPublic(data=items, count=count)
+    Regular users receive the changes to their own items, superusers receive all
+    of them. Reconnecting with `Last-Event-ID` resumes the stream, a `reset`
+    event means some changes could not be replayed and items should be reloaded.
+    """
+    owner_id = None if current_user.is_superuser else current_user.id
+    # The stream can stay open for hours, don't hold a DB connection for it
+    await run_in_threadpool(session.close)
+    subscription, complete = item_event_broker.subscribe(
+        owner_id=owner_id, last_event_id=last_event_id
+    )
+    return StreamingResponse(
+        stream_item_events(
+            subscription,
+            complete=complete,
+            heartbeat_seconds=settings.ITEM_EVENTS_HEARTBEAT_SECONDS,
+        ),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.get("/{id}", response_model=ItemPublic)
@@ -46,11 +119,7 @@ def read_item(session: SessionDep, current_user: CurrentUser, id: uuid.UUID) ->
     """
     Get item by ID.
     """
-    item = session.get(Item, id)
-    if not item:
-        raise HTTPException(status_code=404, detail="Item not found")
-    if not current_user.is_superuser and (item.owner_id != current_user.id):
-        raise HTTPException(status_code=400, detail="Not enough permissions")
+    item = get_item_for_user(session=session, current_user=current_user, id=id)
     return item
 
 
@@ -63,6 +132,7 @@ def create_item(
     """
     item = Item.model_validate(item_in, update={"owner_id": current_user.id})
     session.add(item)
+    crud.record_item_change(session=session, item=item, action="created")
     session.commit()
     session.refresh(item)
     return item
@@ -79,14 +149,11 @@ def update_item(
     """
     Update an item.
     """
-    item = session.get(Item, id)
-    if not item:
-        raise HTTPException(status_code=404, detail="Item not found")
-    if not current_user.is_superuser and (item.owner_id != current_user.id):
-        raise HTTPException(status_code=400, detail="Not enough permissions")
+    item = get_item_for_user(session=session, current_user=current_user, id=id)
     update_dict = item_in.model_dump(exclude_unset=True)
     item.sqlmodel_update(update_dict)
     session.add(item)
+    crud.record_item_change(session=session, item=item, action="updated")
     session.commit()
     session.refresh(item)
     return item
@@ -99,11 +166,8 @@ def delete_item(
     """
     Delete an item.
     """
-    item = session.get(Item, id)
-    if not item:
-        raise HTTPException(status_code=404, detail="Item not found")
-    if not current_user.is_superuser and (item.owner_id != current_user.id):
-        raise HTTPException(status_code=400, detail="Not enough permissions")
+    item = get_item_for_user(session=session, current_user=current_user, id=id)
     session.delete(item)
+    crud.record_item_change(session=session, item=item, action="deleted")
     session.commit()
     return Message(message="Item deleted successfully")
@@ -1,8 +1,8 @@
 import uuid
-from typing import Any
+from typing import Annotated, Any
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import col, delete, func, select
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlmodel import func, select
 
 from app import crud
 from app.api.deps import (
@@ -11,20 +11,29 @@ from app.api.deps import (
     get_current_active_superuser,
 )
 from app.core.config import settings
+from app.core.responses import TrustedResponse
 from app.core.security import get_password_hash, verify_password
 from app.models import (
-    Item,
     Message,
     UpdatePassword,
     User,
     UserCreate,
+    UserDeletion,
+    UserDeletionPublic,
+    UserOrderBy,
     UserPublic,
     UserRegister,
+    UsersBulkCreate,
+    UsersBulkCreated,
     UsersPublic,
     UserUpdate,
     UserUpdateMe,
 )
-from app.utils import generate_new_account_email, send_email
+from app.utils import (
+    enqueue_new_account_emails,
+    generate_new_account_email,
+    send_email,
+)
 
 router = APIRouter(prefix="/users", tags=["users"])
 
@@ -34,18 +43,38 @@ router = APIRouter(prefix="/users", tags=["users"])
     dependencies=[Depends(get_current_active_superuser)],
     response_model=UsersPublic,
 )
-def read_users(session: SessionDep, skip: int = 0, limit: int = 100) -> Any:
+def read_users(
+    session: SessionDep,
+    skip: int = 0,
+    limit: int = 100,
+    is_active: bool | None = None,
+    is_superuser: bool | None = None,
+    search: Annotated[str | None, Query(min_length=3, max_length=255)] = None,
+    order_by: UserOrderBy = "email",
+) -> Any:
     """
     Retrieve users.
+
+    `search` matches a substring of the email or full name, it needs at least 3
+    characters to use the trigram indexes.
     """
+    filters = crud.get_user_filters(
+        is_active=is_active, is_superuser=is_superuser, search=search
+    )
 
-    count_statement = select(func.count()).select_from(User)
+    count_statement = select(func.count()).select_from(User).where(*filters)
     count = session.exec(count_statement).one()
 
-    statement = select(User).offset(skip).limit(limit)
+    statement = (
+        select(User)
+        .where(*filters)
+        .order_by(*crud.USER_ORDER_BY[order_by])
+        .offset(skip)
+        .limit(limit)
+    )
     users = session.exec(statement).all()
 
-    return UsersPublic(data=users, count=count)
+    return TrustedResponse(UsersPublic(data=users, count=count))
 
 
 @router.post(
@@ -55,14 +84,12 @@ def create_user(*, session: SessionDep, user_in: UserCreate) -> Any:
     """
     Create new user.
     """
-    user = crud.get_user_by_email(session=session, email=user_in.email)
-    if user:
+    user = crud.create_user_if_not_exists(session=session, user_create=user_in)
+    if not user:
         raise HTTPException(
             status_code=400,
             detail="The user with this email already exists in the system.",
         )
-
-    user = crud.create_user(session=session, user_create=user_in)
     if settings.emails_enabled and user_in.email:
         email_data = generate_new_account_email(
             email_to=user_in.email, username=user_in.email, password=user_in.password
@@ -75,6 +102,44 @@ def create_user(*, session: SessionDep, user_in: UserCreate) -> Any:
     return user
 
 
+@router.post(
+    "/bulk",
+    dependencies=[Depends(get_current_active_superuser)],
+    response_model=UsersBulkCreated,
+)
+def create_users_bulk(
+    *,
+    session: SessionDep,
+    users_in: UsersBulkCreate,
+) -> Any:
+    """
+    Create many users at once.
+
+    Users whose email already exists, or is repeated in the request, are skipped
+    and reported in `conflicts`. Welcome emails are sent by the job worker.
+    """
+    users, conflicts = crud.create_users_bulk(
+        session=session,
+        users_create=users_in.data,
+        batch_size=settings.USERS_BULK_CREATE_BATCH_SIZE,
+    )
+    if settings.emails_enabled and users:
+        created_emails = {user.email for user in users}
+        # Repeated emails were only created from their first occurrence
+        welcome = {
+            user_in.email: user_in
+            for user_in in reversed(users_in.data)
+            if user_in.email in created_emails
+        }
+        enqueue_new_account_emails(session=session, users_in=list(welcome.values()))
+        session.commit()
+    return UsersBulkCreated(
+        data=[UserPublic.model_validate(user) for user in users],
+        count=len(users),
+        conflicts=conflicts,
+    )
+
+
 @router.patch("/me", response_model=UserPublic)
 def update_user_me(
     *, session: SessionDep, user_in: UserUpdateMe, current_user: CurrentUser
@@ -125,18 +190,20 @@ def read_user_me(current_user: CurrentUser) -> Any:
     return current_user
 
 
-@router.delete("/me", response_model=Message)
+@router.delete("/me", response_model=Message, status_code=202)
 def delete_user_me(session: SessionDep, current_user: CurrentUser) -> Any:
     """
     Delete own user.
+
+    The user is deactivated right away, it is deleted with its items by the job
+    worker.
     """
     if current_user.is_superuser:
         raise HTTPException(
             status_code=403, detail="Super users are not allowed to delete themselves"
         )
-    session.delete(current_user)
-    session.commit()
-    return Message(message="User deleted successfully")
+    crud.mark_user_deleted(session=session, db_user=current_user)
+    return Message(message="User deletion started")
 
 
 @router.post("/signup", response_model=UserPublic)
@@ -144,14 +211,13 @@ def register_user(session: SessionDep, user_in: UserRegister) -> Any:
     """
     Create new user without the need to be logged in.
     """
-    user = crud.get_user_by_email(session=session, email=user_in.email)
-    if user:
+    user_create = UserCreate.model_validate(user_in)
+    user = crud.create_user_if_not_exists(session=session, user_create=user_create)
+    if not user:
         raise HTTPException(
             status_code=400,
             detail="The user with this email already exists in the system",
         )
-    user_create = UserCreate.model_validate(user_in)
-    user = crud.create_user(session=session, user_create=user_create)
     return user
 
 
@@ -205,12 +271,21 @@ def update_user(
     return db_user
 
 
-@router.delete("/{user_id}", dependencies=[Depends(get_current_active_superuser)])
+@router.delete(
+    "/{user_id}",
+    dependencies=[Depends(get_current_active_superuser)],
+    status_code=202,
+)
 def delete_user(
-    session: SessionDep, current_user: CurrentUser, user_id: uuid.UUID
+    session: SessionDep,
+    current_user: CurrentUser,
+    user_id: uuid.UUID,
 ) -> Message:
     """
     Delete a user.
+
+    The user is deactivated right away, it is deleted with its items by the job
+    worker, see the progress at `/users/{user_id}/deletion`.
     """
     user = session.get(User, user_id)
     if not user:
@@ -219,8 +294,20 @@ def delete_user(
         raise HTTPException(
             status_code=403, detail="Super users are not allowed to delete themselves"
         )
-    statement = delete(Item).where(col(Item.owner_id) == user_id)
-    session.exec(statement)  # type: ignore
-    session.delete(user)
-    session.commit()
-    return Message(message="User deleted successfully")
+    crud.mark_user_deleted(session=session, db_user=user)
+    return Message(message="User deletion started")
+
+
+@router.get(
+    "/{user_id}/deletion",
+    dependencies=[Depends(get_current_active_superuser)],
+    response_model=UserDeletionPublic,
+)
+def read_user_deletion(session: SessionDep, user_id: uuid.UUID) -> Any:
+    """
+    Get the progress of a user deletion.
+    """
+    deletion = session.get(UserDeletion, user_id)
+    if not deletion:
+        raise HTTPException(status_code=404, detail="User deletion not found")
+    return deletion
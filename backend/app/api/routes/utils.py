@@ -1,7 +1,10 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
 from pydantic.networks import EmailStr
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
 
-from app.api.deps import get_current_active_superuser
+from app.api.deps import SessionDep, get_current_active_superuser
+from app.core.warmup import ready
 from app.models import Message
 from app.utils import generate_test_email, send_email
 
@@ -29,3 +32,17 @@ def test_email(email_to: EmailStr) -> Message:
 @router.get("/health-check/")
 async def health_check() -> bool:
     return True
+
+
+@router.get("/readiness-check/")
+def readiness_check(session: SessionDep) -> bool:
+    """
+    Ready once the worker is warmed up, while it can reach the database.
+    """
+    if not ready.is_set():
+        raise HTTPException(status_code=503, detail="Warming up")
+    try:
+        session.connection().execute(text("SELECT 1"))
+    except SQLAlchemyError:
+        raise HTTPException(status_code=503, detail="Database unavailable")
+    return True
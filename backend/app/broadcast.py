@@ -0,0 +1,155 @@
+import logging
+import secrets
+import time
+import uuid
+from collections.abc import Callable, Iterator, Sequence
+from datetime import datetime, timezone
+from html import escape
+from typing import Any
+
+from sqlalchemy import Row
+from sqlmodel import Session, col, select
+
+from app.core.config import settings
+from app.core.db import get_engine
+from app.core.jobs import enqueue_job, job_handler
+from app.core.mail import MailDispatcher, OutgoingEmail
+from app.core.templates import render_email_template
+from app.models import Broadcast, Job, User
+
+logger = logging.getLogger(__name__)
+
+broadcast_dispatcher = MailDispatcher(
+    workers=settings.BROADCAST_SENDERS,
+    batch_size=settings.SMTP_BATCH_SIZE,
+    max_retries=settings.SMTP_MAX_RETRIES,
+    retry_backoff_seconds=settings.SMTP_RETRY_BACKOFF_SECONDS,
+    idle_timeout_seconds=settings.SMTP_IDLE_TIMEOUT_SECONDS,
+    rate_limit=settings.BROADCAST_RATE_LIMIT,
+)
+
+
+def enqueue_broadcast(*, session: Session, broadcast: Broadcast) -> None:
+    # Behind the jobs users are waiting for, such as purges
+    enqueue_job(
+        session=session,
+        name="send_broadcast",
+        payload={"broadcast_id": str(broadcast.id)},
+        priority=-1,
+    )
+
+
+def broadcast_job_queued(*, session: Session, broadcast_id: uuid.UUID) -> bool:
+    """
+    Whether a job sending the broadcast is waiting or running, including one
+    whose worker died and that will be claimed again once its lease expires.
+    """
+    statement = select(Job.id).where(
+        Job.name == "send_broadcast",
+        col(Job.status).in_(("pending", "running")),
+        col(Job.payload)["broadcast_id"].astext == str(broadcast_id),
+    )
+    return session.exec(statement).first() is not None
+
+
+def broadcast_renderer(broadcast: Broadcast) -> Callable[[str, str], str]:
+    """
+    Render the broadcast email once, returns a function filling in a recipient's
+    email and name.
+    """
+    email_marker = secrets.token_hex(16)
+    username_marker = secrets.token_hex(16)
+    html_content = render_email_template(
+        template_name="broadcast.html",
+        context={
+            "project_name": settings.PROJECT_NAME,
+            "message": escape(broadcast.message),
+            "email": email_marker,
+            "username": username_marker,
+        },
+    )
+
+    def render(email: str, username: str) -> str:
+        return html_content.replace(email_marker, escape(email)).replace(
+            username_marker, escape(username)
+        )
+
+    return render
+
+
+def iter_recipients(after: uuid.UUID | None) -> Iterator[Sequence[Row[Any]]]:
+    """
+    Active users after the `after` id in id order, fetched in batches from a
+    server side cursor so they are never all in memory.
+    """
+    statement = (
+        select(User.id, User.email, User.full_name)
+        .where(col(User.is_active))
+        .order_by(col(User.id))
+    )
+    if after is not None:
+        statement = statement.where(col(User.id) > after)
+    with get_engine().connect() as connection:
+        result = connection.execution_options(
+            yield_per=settings.BROADCAST_BATCH_SIZE
+        ).execute(statement)
+        yield from result.partitions()
+
+
+def send_broadcast(broadcast_id: uuid.UUID) -> None:
+    """
+    Send a broadcast to the active users, checkpointing after each batch.
+
+    A batch is checkpointed once all its emails were sent or given up, so an
+    interrupted broadcast resumes after the last checkpoint and may send the
+    last batch twice. Emails the dispatcher gave up on after its retries are
+    logged and counted as processed, they are not sent again. The job stops
+    after `BROADCAST_JOB_SECONDS` and queues a new one to continue.
+    """
+    deadline = time.monotonic() + settings.BROADCAST_JOB_SECONDS
+    with Session(get_engine()) as session:
+        broadcast = session.get(Broadcast, broadcast_id)
+        if not broadcast or broadcast.status == "done":
+            return
+        broadcast.status = "running"
+        session.add(broadcast)
+        session.commit()
+        render = broadcast_renderer(broadcast)
+        subject = broadcast.subject
+        for recipients in iter_recipients(broadcast.last_user_id):
+            for recipient in recipients:
+                broadcast_dispatcher.enqueue(
+                    OutgoingEmail(
+                        email_to=recipient.email,
+                        subject=subject,
+                        html_content=render(
+                            recipient.email, recipient.full_name or recipient.email
+                        ),
+                    )
+                )
+            broadcast_dispatcher.flush()
+            broadcast.recipients_processed += len(recipients)
+            broadcast.last_user_id = recipients[-1].id
+            session.add(broadcast)
+            if time.monotonic() > deadline:
+                enqueue_broadcast(session=session, broadcast=broadcast)
+                session.commit()
+                logger.info(
+                    f"broadcast {broadcast_id} continues in a new job, "
+                    f"{broadcast.recipients_processed} recipients processed"
+                )
+                return
+            session.commit()
+        broadcast.status = "done"
+        broadcast.finished_at = datetime.now(timezone.utc)
+        session.add(broadcast)
+        session.commit()
+        logger.info(
+            f"broadcast {broadcast_id} sent to "
+            f"{broadcast.recipients_processed} recipients"
+        )
+
+
+@job_handler("send_broadcast")
+def send_broadcast_job(payload: dict[str, Any]) -> None:
+    send_broadcast(uuid.UUID(payload["broadcast_id"]))
@@ -0,0 +1,174 @@
+import logging
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from functools import lru_cache
+from typing import Any
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    entries: int = 0
+    size_bytes: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class CacheBackend(ABC):
+    """
+    Byte-oriented key/value store used to cache serialized API responses.
+
+    Hits and misses are counted here, backends only store and evict values.
+    """
+
+    def __init__(self, *, max_entry_bytes: int) -> None:
+        self.max_entry_bytes = max_entry_bytes
+        self._stats = CacheStats()
+        self._stats_lock = threading.Lock()
+
+    def get(self, key: str) -> bytes | None:
+        value = self._get(key)
+        with self._stats_lock:
+            if value is None:
+                self._stats.misses += 1
+            else:
+                self._stats.hits += 1
+        return value
+
+    def set(self, key: str, value: bytes) -> None:
+        if len(value) > self.max_entry_bytes:
+            return
+        self._set(key, value)
+
+    def stats(self) -> CacheStats:
+        with self._stats_lock:
+            return replace(self._stats)
+
+    @abstractmethod
+    def _get(self, key: str) -> bytes | None: ...
+
+    @abstractmethod
+    def _set(self, key: str, value: bytes) -> None: ...
+
+    @abstractmethod
+    def clear(self) -> None: ...
+
+
+class LRUCacheBackend(CacheBackend):
+    """
+    In-process cache bounded both by number of entries and by total bytes.
+    """
+
+    def __init__(self, *, max_entries: int, max_bytes: int) -> None:
+        super().__init__(max_entry_bytes=max_bytes)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data: OrderedDict[str, bytes] = OrderedDict()
+        self._size_bytes = 0
+        self._lock = threading.Lock()
+
+    def _get(self, key: str) -> bytes | None:
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def _set(self, key: str, value: bytes) -> None:
+        evictions = 0
+        with self._lock:
+            previous = self._data.pop(key, None)
+            if previous is not None:
+                self._size_bytes -= len(previous)
+            self._data[key] = value
+            self._size_bytes += len(value)
+            while (
+                len(self._data) > self.max_entries or self._size_bytes > self.max_bytes
+            ):
+                _, evicted = self._data.popitem(last=False)
+                self._size_bytes -= len(evicted)
+                evictions += 1
+            entries, size_bytes = len(self._data), self._size_bytes
+        with self._stats_lock:
+            self._stats.evictions += evictions
+            self._stats.entries = entries
+            self._stats.size_bytes = size_bytes
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._size_bytes = 0
+        with self._stats_lock:
+            self._stats.entries = 0
+            self._stats.size_bytes = 0
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Cache shared by all workers.
+
+    Memory is bounded by the Redis server (`maxmemory` with an LRU policy) and by
+    the TTL, as stale versions are never read again once they are superseded.
+    Redis errors are logged and treated as cache misses.
+    """
+
+    def __init__(
+        self, *, url: str, ttl_seconds: int, max_entry_bytes: int, prefix: str = ""
+    ) -> None:
+        super().__init__(max_entry_bytes=max_entry_bytes)
+        # Optional dependency, only required when the shared backend is configured
+        import redis
+
+        self._redis = redis
+        self._client: Any = redis.Redis.from_url(url)
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+
+    def _get(self, key: str) -> bytes | None:
+        try:
+            value: bytes | None = self._client.get(self.prefix + key)
+        except self._redis.RedisError as e:
+            logger.warning(f"cache get failed: {e}")
+            return None
+        return value
+
+    def _set(self, key: str, value: bytes) -> None:
+        try:
+            self._client.set(self.prefix + key, value, ex=self.ttl_seconds)
+        except self._redis.RedisError as e:
+            logger.warning(f"cache set failed: {e}")
+
+    def clear(self) -> None:
+        for key in self._client.scan_iter(match=f"{self.prefix}*"):
+            self._client.delete(key)
+
+
+@lru_cache
+def get_items_cache() -> CacheBackend:
+    if settings.ITEMS_CACHE_REDIS_URL:
+        return RedisCacheBackend(
+            url=str(settings.ITEMS_CACHE_REDIS_URL),
+            ttl_seconds=settings.ITEMS_CACHE_TTL_SECONDS,
+            max_entry_bytes=settings.ITEMS_CACHE_MAX_BYTES,
+            prefix="items:",
+        )
+    return LRUCacheBackend(
+        max_entries=settings.ITEMS_CACHE_MAX_ENTRIES,
+        max_bytes=settings.ITEMS_CACHE_MAX_BYTES,
+    )
+
+
+def items_cache_key(*, owner_id: uuid.UUID, version: int, skip: int, limit: int) -> str:
+    return f"{owner_id}:{version}:{skip}:{limit}"
@@ -0,0 +1,221 @@
+import importlib.util
+import zlib
+from collections.abc import Iterable
+from functools import lru_cache
+from typing import Protocol
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+class Compressor(Protocol):
+    def compress(self, data: bytes) -> bytes: ...
+
+    def flush(self) -> bytes:
+        """
+        Output everything compressed so far, so the client can decode it.
+        """
+        ...
+
+    def finish(self) -> bytes: ...
+
+
+class GzipCompressor:
+    def __init__(self, level: int) -> None:
+        # wbits 31 writes a gzip header and trailer
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class BrotliCompressor:
+    def __init__(self, level: int) -> None:
+        import brotli
+
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes) -> bytes:
+        return bytes(self._compressor.process(data))
+
+    def flush(self) -> bytes:
+        return bytes(self._compressor.flush())
+
+    def finish(self) -> bytes:
+        return bytes(self._compressor.finish())
+
+
+class ZstdCompressor:
+    def __init__(self, level: int) -> None:
+        import zstandard
+
+        self._zstandard = zstandard
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return bytes(self._compressor.compress(data))
+
+    def flush(self) -> bytes:
+        flush_block = self._zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        return bytes(self._compressor.flush(flush_block))
+
+    def finish(self) -> bytes:
+        return bytes(self._compressor.flush())
+
+
+COMPRESSORS: dict[str, type[GzipCompressor | BrotliCompressor | ZstdCompressor]] = {
+    "gzip": GzipCompressor,
+    "br": BrotliCompressor,
+    "zstd": ZstdCompressor,
+}
+# Optional dependencies, the encoding is only offered when installed
+ENCODING_MODULES = {"br": "brotli", "zstd": "zstandard"}
+
+
+@lru_cache
+def available_encodings() -> frozenset[str]:
+    return frozenset(
+        encoding
+        for encoding in COMPRESSORS
+        if encoding not in ENCODING_MODULES
+        or importlib.util.find_spec(ENCODING_MODULES[encoding]) is not None
+    )
+
+
+def get_compressor(encoding: str, level: int) -> Compressor:
+    return COMPRESSORS[encoding](level)
+
+
+def parse_quality_values(value: str) -> dict[str, float]:
+    """
+    Quality value of each item of an Accept or Accept-Encoding header.
+    """
+    accepted = {}
+    for part in value.split(","):
+        name, _, parameters = part.partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for parameter in parameters.split(";"):
+            key, _, quality_value = parameter.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(quality_value)
+                except ValueError:
+                    quality = 0.0
+        accepted[name] = quality
+    return accepted
+
+
+def choose_encoding(accept_encoding: str, encodings: Iterable[str]) -> str | None:
+    """
+    The encoding the client prefers, ties go to the first in `encodings`.
+    """
+    accepted = parse_quality_values(accept_encoding)
+    wildcard = accepted.get("*", 0.0)
+    chosen, chosen_quality = None, 0.0
+    for encoding in encodings:
+        quality = accepted.get(encoding, wildcard)
+        if quality > chosen_quality:
+            chosen, chosen_quality = encoding, quality
+    return chosen
+
+
+class CompressionMiddleware:
+    """
+    Compress responses with gzip, brotli or zstd, as negotiated with the client.
+
+    `levels` maps content types to the encodings to use for them, in order of
+    preference, and their compression level. Other content types are sent as
+    they are. Responses smaller than `minimum_size` aren't compressed, streamed
+    responses are compressed chunk by chunk and flushed after each one so they
+    are delivered as soon as they are produced.
+    """
+
+    def __init__(
+        self, app: ASGIApp, *, minimum_size: int, levels: dict[str, dict[str, int]]
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.levels = levels
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.levels:
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = Headers(scope=scope).get("accept-encoding", "")
+        responder = CompressionResponder(self, accept_encoding, send)
+        await self.app(scope, receive, responder.send)
+
+
+class CompressionResponder:
+    def __init__(
+        self, middleware: CompressionMiddleware, accept_encoding: str, send: Send
+    ) -> None:
+        self.middleware = middleware
+        self.accept_encoding = accept_encoding
+        self._send = send
+        self.start: Message | None = None
+        self.compressor: Compressor | None = None
+        self.passthrough = False
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            # Headers depend on the body, sent with its first chunk
+            self.start = message
+        elif message["type"] != "http.response.body" or self.passthrough:
+            await self._send(message)
+        elif self.compressor is not None:
+            await self._send_compressed(message)
+        else:
+            await self._send_first(message)
+
+    async def _send_first(self, message: Message) -> None:
+        assert self.start is not None
+        headers = MutableHeaders(raw=self.start["headers"])
+        body: bytes = message.get("body", b"")
+        more_body: bool = message.get("more_body", False)
+        content_type = headers.get("content-type", "").partition(";")[0].strip()
+        levels = self.middleware.levels.get(content_type.lower())
+        encoding = None
+        if levels and "content-encoding" not in headers:
+            headers.add_vary_header("Accept-Encoding")
+            if more_body or len(body) >= self.middleware.minimum_size:
+                encodings = [e for e in levels if e in available_encodings()]
+                encoding = choose_encoding(self.accept_encoding, encodings)
+        if not levels or not encoding:
+            self.passthrough = True
+            await self._send(self.start)
+            await self._send(message)
+            return
+        self.compressor = get_compressor(encoding, levels[encoding])
+        headers["Content-Encoding"] = encoding
+        if more_body:
+            del headers["Content-Length"]
+        else:
+            body = self.compressor.compress(body) + self.compressor.finish()
+            headers["Content-Length"] = str(len(body))
+            message = {**message, "body": body}
+            self.compressor = None
+            self.passthrough = True
+        await self._send(self.start)
+        if self.compressor is not None:
+            await self._send_compressed(message)
+        else:
+            await self._send(message)
+
+    async def _send_compressed(self, message: Message) -> None:
+        assert self.compressor is not None
+        body = self.compressor.compress(message.get("body", b""))
+        if message.get("more_body", False):
+            body += self.compressor.flush()
+        else:
+            body += self.compressor.finish()
+        await self._send({**message, "body": body})
@@ -8,6 +8,7 @@ from pydantic import (
     EmailStr,
     HttpUrl,
     PostgresDsn,
+    RedisDsn,
     computed_field,
     model_validator,
 )
@@ -56,6 +57,9 @@ class Settings(BaseSettings):
     POSTGRES_PASSWORD: str = ""
     POSTGRES_DB: str = ""
 
+    # Connections opened when a worker starts, up to the pool size
+    POSTGRES_WARM_UP_CONNECTIONS: int = 5
+
     @computed_field  # type: ignore[prop-decorator]
     @property
     def SQLALCHEMY_DATABASE_URI(self) -> PostgresDsn:
@@ -68,6 +72,85 @@ class Settings(BaseSettings):
             path=self.POSTGRES_DB,
         )
 
+    # Share of the requests whose phases are timed, reported in a Server-Timing
+    # header and logged
+    SERVER_TIMING_SAMPLE_RATE: float = 0.01
+
+    # Statements slower than this are logged with the types of their parameters
+    SLOW_STATEMENT_THRESHOLD_SECONDS: float = 0.5
+    # Requests executing more statements are logged as warnings
+    REQUEST_STATEMENTS_THRESHOLD: int = 25
+
+    # OpenTelemetry traces, needs the tracing extra. A share of the requests is
+    # traced (head sampling), the failed or slow traces and a share of the
+    # others are exported once complete (tail sampling)
+    TRACING_ENABLED: bool = False
+    TRACING_HEAD_SAMPLE_RATE: float = 1.0
+    TRACING_TAIL_SAMPLE_RATE: float = 0.01
+    TRACING_TAIL_SLOW_SECONDS: float = 1.0
+    # "file" writes a JSON span per line to a file per worker in
+    # TRACING_DIRECTORY, see scripts/summarize_traces.py. "otlp" sends them to
+    # the collector set in the OTEL_EXPORTER_OTLP_* environment variables
+    TRACING_EXPORTER: Literal["console", "file", "otlp"] = "file"
+    TRACING_DIRECTORY: str = "traces"
+
+    # Superusers can profile a request by sending an X-Profile header, up to
+    # PROFILING_RATE_LIMIT requests per period in each worker. Only the latest
+    # PROFILING_MAX_PROFILES profiles are kept
+    PROFILING_ENABLED: bool = True
+    PROFILING_RATE_LIMIT: int = 10
+    PROFILING_RATE_PERIOD_SECONDS: float = 3600.0
+    PROFILING_INTERVAL_SECONDS: float = 0.001
+    PROFILING_MAX_SECONDS: float = 30.0
+    PROFILING_DIRECTORY: str = "profiles"
+    PROFILING_MAX_PROFILES: int = 100
+
+    # Prometheus metrics served at /metrics, needs the metrics extra. Scrapers
+    # must send the token when set, it is required outside local environments
+    METRICS_ENABLED: bool = True
+    METRICS_BEARER_TOKEN: str | None = None
+    # How often each worker records its database pool and threadpool usage
+    METRICS_UPDATE_INTERVAL_SECONDS: float = 5.0
+
+    # Responses of these content types are compressed with the first encoding
+    # the client accepts, at the given level. br and zstd need the compression
+    # extra. Levels from scripts/benchmark_compression.py, past them the CPU cost
+    # grows much faster than the bytes saved
+    COMPRESSION_LEVELS: dict[str, dict[str, int]] = {
+        "application/json": {"zstd": 3, "br": 4, "gzip": 4},
+        "text/html": {"zstd": 3, "br": 4, "gzip": 4},
+        # Compressed and flushed event by event, cheaper levels
+        "text/event-stream": {"zstd": 1, "br": 1, "gzip": 1},
+    }
+    # Smaller responses aren't worth compressing, streamed ones always are
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+
+    ITEMS_CACHE_ENABLED: bool = True
+    ITEMS_CACHE_MAX_ENTRIES: int = 10_000
+    ITEMS_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    # Shared cache for all workers, the in-process LRU is used when unset
+    ITEMS_CACHE_REDIS_URL: RedisDsn | None = None
+    ITEMS_CACHE_TTL_SECONDS: int = 60 * 60
+
+    ITEM_EVENTS_HEARTBEAT_SECONDS: float = 15.0
+    # Events kept per worker to let reconnecting clients resume
+    ITEM_EVENTS_HISTORY_SIZE: int = 1_000
+    # Pending events per subscriber before it is dropped as too slow
+    ITEM_EVENTS_QUEUE_SIZE: int = 100
+
+    # Items of deleted users are purged in small committed batches
+    USER_PURGE_BATCH_SIZE: int = 1_000
+    USER_PURGE_BATCH_DELAY_SECONDS: float = 0.1
+    # The purge pauses while replicas lag behind by more than this
+    USER_PURGE_MAX_REPLICATION_LAG_SECONDS: float = 10.0
+
+    JOBS_MAX_ATTEMPTS: int = 5
+    # Delay before the first retry of a failed job, doubled on each attempt
+    JOBS_RETRY_BACKOFF_SECONDS: float = 10.0
+    # Jobs of a worker that stopped responding are run again after this
+    JOBS_LEASE_SECONDS: float = 60 * 60
+    JOBS_POLL_INTERVAL_SECONDS: float = 1.0
+
     SMTP_TLS: bool = True
     SMTP_SSL: bool = False
     SMTP_PORT: int = 587
@@ -76,6 +159,15 @@ class Settings(BaseSettings):
     SMTP_PASSWORD: str | None = None
     EMAILS_FROM_EMAIL: EmailStr | None = None
     EMAILS_FROM_NAME: EmailStr | None = None
+    SMTP_TIMEOUT_SECONDS: float = 10.0
+    # Emails are sent in the background by this many connections
+    SMTP_POOL_SIZE: int = 2
+    # Emails sent in a row on a connection before waiting for more
+    SMTP_BATCH_SIZE: int = 50
+    SMTP_MAX_RETRIES: int = 5
+    SMTP_RETRY_BACKOFF_SECONDS: float = 1.0
+    # Connections without emails to send for this long are closed
+    SMTP_IDLE_TIMEOUT_SECONDS: float = 30.0
 
     @model_validator(mode="after")
     def _set_default_emails_from(self) -> Self:
@@ -83,7 +175,24 @@ class Settings(BaseSettings):
             self.EMAILS_FROM_NAME = self.PROJECT_NAME
         return self
 
+    # Broadcasts have their own connections so other emails aren't held up
+    BROADCAST_SENDERS: int = 4
+    # Emails sent per second by a broadcast, unlimited when unset
+    BROADCAST_RATE_LIMIT: float | None = 20.0
+    # Recipients read and checkpointed at a time
+    BROADCAST_BATCH_SIZE: int = 500
+    # A broadcast job hands over to a new job after this, so it never holds a
+    # worker or outlives its lease
+    BROADCAST_JOB_SECONDS: float = 5 * 60
+
     EMAIL_RESET_TOKEN_EXPIRE_HOURS: int = 48
+    # Compiled email templates shared by workers, a temporary directory when unset
+    EMAIL_TEMPLATES_BYTECODE_CACHE_DIR: str | None = None
+
+    # Threads hashing passwords in bulk operations, defaults to the number of CPUs
+    # plus 4, at most 32, like ThreadPoolExecutor
+    PASSWORD_HASH_WORKERS: int | None = None
+    USERS_BULK_CREATE_BATCH_SIZE: int = 1_000
 
     @computed_field  # type: ignore[prop-decorator]
     @property
@@ -112,6 +221,15 @@ class Settings(BaseSettings):
         self._check_default_secret(
             "FIRST_SUPERUSER_PASSWORD", self.FIRST_SUPERUSER_PASSWORD
         )
+        if (
+            self.METRICS_ENABLED
+            and not self.METRICS_BEARER_TOKEN
+            and self.ENVIRONMENT != "local"
+        ):
+            raise ValueError(
+                "METRICS_BEARER_TOKEN is not set, for security, please set it "
+                "or set METRICS_ENABLED to false for deployments."
+            )
 
         return self
 
@@ -1,10 +1,25 @@
-from sqlmodel import Session, create_engine, select
+from functools import lru_cache
+
+from sqlalchemy import Engine
+from sqlmodel import Session, create_engine
 
 from app import crud
 from app.core.config import settings
-from app.models import User, UserCreate
+from app.core.timing import time_statements
+from app.core.tracing import trace_statements
+from app.models import UserCreate
+
 
-engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI))
+@lru_cache
+def get_engine() -> Engine:
+    """
+    The engine is created on first use, importing the app doesn't load the
+    database driver.
+    """
+    engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI))
+    time_statements(engine)
+    trace_statements(engine)
+    return engine
 
 
 # make sure all SQLModel models are imported (app.models) before initializing DB
@@ -21,9 +36,7 @@ def init_db(session: Session) -> None:
     # This works because the models are already imported and registered from app.models
     # SQLModel.metadata.create_all(engine)
 
-    user = session.exec(
-        select(User).where(User.email == settings.FIRST_SUPERUSER)
-    ).first()
+    user = crud.get_user_by_email(session=session, email=settings.FIRST_SUPERUSER)
     if not user:
         user_in = UserCreate(
             email=settings.FIRST_SUPERUSER,
@@ -0,0 +1,214 @@
+import asyncio
+import json
+import logging
+import uuid
+from collections import deque
+from collections.abc import AsyncIterator
+from dataclasses import asdict, dataclass
+from typing import Literal
+
+from sqlmodel import Session, text
+
+from app.core.config import settings
+from app.models import item_event_id_seq
+
+logger = logging.getLogger(__name__)
+
+ITEM_EVENTS_CHANNEL = "item_events"
+
+ItemAction = Literal["created", "updated", "deleted"]
+
+
+@dataclass(frozen=True)
+class ItemEvent:
+    id: int
+    action: str
+    item_id: str
+    owner_id: str
+
+
+def publish_item_event(
+    *, session: Session, action: ItemAction, item_id: uuid.UUID, owner_id: uuid.UUID
+) -> None:
+    """
+    Queue a NOTIFY in the current transaction, it is delivered only if it commits.
+    """
+    statement = text(
+        "SELECT pg_notify(:channel, json_build_object("
+        f"'id', nextval('{item_event_id_seq.name}'), "
+        "'action', CAST(:action AS text), "
+        "'item_id', CAST(:item_id AS uuid), "
+        "'owner_id', CAST(:owner_id AS uuid))::text)"
+    ).bindparams(
+        channel=ITEM_EVENTS_CHANNEL,
+        action=action,
+        item_id=str(item_id),
+        owner_id=str(owner_id),
+    )
+    session.exec(statement)  # type: ignore
+
+
+class Subscription:
+    def __init__(self, *, owner_id: str | None, queue_size: int) -> None:
+        # None receives the events of every owner, used for superusers
+        self.owner_id = owner_id
+        self.queue: asyncio.Queue[ItemEvent | None] = asyncio.Queue(queue_size)
+        self.dropped = False
+
+    def accepts(self, event: ItemEvent) -> bool:
+        return self.owner_id is None or self.owner_id == event.owner_id
+
+    def push(self, event: ItemEvent | None) -> None:
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.dropped = True
+
+
+class ItemEventBroker:
+    """
+    Fan out item events from a single LISTEN connection to all the subscribers
+    of this worker.
+
+    Recent events are kept in delivery order so a reconnecting client can resume
+    from its last event id. Subscribers that fall behind are dropped instead of
+    buffering without bound, they reconnect and resume like any other client.
+    """
+
+    def __init__(self, *, history_size: int, queue_size: int) -> None:
+        self.queue_size = queue_size
+        self._history: deque[ItemEvent] = deque(maxlen=history_size)
+        self._subscriptions: set[Subscription] = set()
+        self._listener: asyncio.Task[None] | None = None
+        # Whether notifications are received, events sent before are missed
+        self.listening = False
+
+    def subscribe(
+        self, *, owner_id: uuid.UUID | None, last_event_id: int | None = None
+    ) -> tuple[Subscription, bool]:
+        """
+        Register a subscriber and replay what it missed since `last_event_id`.
+
+        Returns the subscription and whether the replay is complete. When it is
+        not, the client has to reload its state.
+        """
+        self._ensure_listening()
+        subscription = Subscription(
+            owner_id=str(owner_id) if owner_id is not None else None,
+            queue_size=self.queue_size,
+        )
+        complete = True
+        if last_event_id is not None:
+            ids = [event.id for event in self._history]
+            if last_event_id in ids:
+                missed = list(self._history)[ids.index(last_event_id) + 1 :]
+                for event in missed:
+                    if subscription.accepts(event):
+                        subscription.push(event)
+            else:
+                complete = False
+        self._subscriptions.add(subscription)
+        return subscription, complete
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscriptions.discard(subscription)
+
+    def dispatch(self, event: ItemEvent) -> None:
+        self._history.append(event)
+        for subscription in list(self._subscriptions):
+            if not subscription.accepts(event):
+                continue
+            subscription.push(event)
+            if subscription.dropped:
+                logger.info("dropping slow item events subscriber")
+                self.unsubscribe(subscription)
+
+    async def close(self) -> None:
+        if self._listener:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        self.listening = False
+        self._drop_all()
+
+    def _drop_all(self) -> None:
+        for subscription in self._subscriptions:
+            subscription.dropped = True
+            subscription.push(None)
+        self._subscriptions.clear()
+
+    def _ensure_listening(self) -> None:
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+
+    async def _listen(self) -> None:
+        import psycopg
+        from psycopg.conninfo import make_conninfo
+
+        conninfo = make_conninfo(
+            host=settings.POSTGRES_SERVER,
+            port=settings.POSTGRES_PORT,
+            user=settings.POSTGRES_USER,
+            password=settings.POSTGRES_PASSWORD,
+            dbname=settings.POSTGRES_DB,
+        )
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(
+                    conninfo, autocommit=True
+                ) as conn:
+                    await conn.execute(f"LISTEN {ITEM_EVENTS_CHANNEL}")
+                    self.listening = True
+                    async for notify in conn.notifies():
+                        self.dispatch(ItemEvent(**json.loads(notify.payload)))
+            except (psycopg.Error, OSError) as e:
+                self.listening = False
+                logger.error(f"item events listener failed: {e}")
+                # Events sent while disconnected are lost, make clients reconnect
+                # and reload instead of silently missing them
+                self._history.clear()
+                self._drop_all()
+                await asyncio.sleep(1)
+
+
+item_event_broker = ItemEventBroker(
+    history_size=settings.ITEM_EVENTS_HISTORY_SIZE,
+    queue_size=settings.ITEM_EVENTS_QUEUE_SIZE,
+)
+
+
+def format_sse(*, event: str, data: str, id: int | None = None) -> str:
+    message = f"event: {event}\ndata: {data}\n\n"
+    if id is not None:
+        message = f"id: {id}\n{message}"
+    return message
+
+
+async def stream_item_events(
+    subscription: Subscription, *, complete: bool, heartbeat_seconds: float
+) -> AsyncIterator[str]:
+    try:
+        # Sent right away, as compression holds the headers until the first chunk
+        yield ": connected\n\n"
+        if not complete:
+            yield format_sse(event="reset", data="{}")
+        while True:
+            try:
+                event = await asyncio.wait_for(
+                    subscription.queue.get(), timeout=heartbeat_seconds
+                )
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            if event is None:
+                return
+            yield format_sse(
+                event=event.action, data=json.dumps(asdict(event)), id=event.id
+            )
+            if subscription.dropped and subscription.queue.empty():
+                return
+    finally:
+        item_event_broker.unsubscribe(subscription)
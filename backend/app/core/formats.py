@@ -0,0 +1,244 @@
+import importlib.util
+from collections.abc import Collection
+from functools import lru_cache
+from typing import Any
+
+import pydantic_core
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.compression import parse_quality_values
+from app.core.responses import PydanticJSONResponse
+
+# Media types accepted for each binary format, the first one is used in responses
+FORMAT_MEDIA_TYPES = {
+    "msgpack": (
+        "application/msgpack",
+        "application/x-msgpack",
+        "application/vnd.msgpack",
+    ),
+    "cbor": ("application/cbor",),
+}
+# Optional dependencies, the format is only offered when installed
+FORMAT_MODULES = {"msgpack": "msgpack", "cbor": "cbor2"}
+
+
+@lru_cache
+def available_formats() -> frozenset[str]:
+    return frozenset(
+        format
+        for format, module in FORMAT_MODULES.items()
+        if importlib.util.find_spec(module) is not None
+    )
+
+
+def encode(format: str, data: Any) -> bytes:
+    if format == "msgpack":
+        import msgpack
+
+        return msgpack.packb(data)  # type: ignore[no-any-return]
+    import cbor2
+
+    return cbor2.dumps(data)
+
+
+def decode(format: str, body: bytes) -> Any:
+    """
+    Raises ValueError for invalid documents.
+    """
+    if format == "msgpack":
+        import msgpack
+
+        return msgpack.unpackb(body)
+    import cbor2
+
+    try:
+        return cbor2.loads(body)
+    except cbor2.CBORDecodeError as e:
+        raise ValueError(str(e)) from e
+
+
+def media_type_format(content_type: str) -> str | None:
+    media_type = content_type.partition(";")[0].strip().lower()
+    for format, media_types in FORMAT_MEDIA_TYPES.items():
+        if media_type in media_types:
+            return format
+    return None
+
+
+def choose_format(accept: str) -> str | None:
+    """
+    The binary format the client prefers to JSON, if any.
+
+    A media type is scored by the most specific range matching it, and JSON wins
+    ties, so clients only get a binary format when they ask for it explicitly.
+    """
+    if not accept:
+        return None
+    ranges = parse_quality_values(accept)
+
+    def score(media_type: str) -> tuple[float, int]:
+        main_type = media_type.partition("/")[0]
+        for specificity, media_range in (
+            (2, media_type),
+            (1, f"{main_type}/*"),
+            (0, "*/*"),
+        ):
+            if media_range in ranges:
+                return ranges[media_range], specificity
+        return 0.0, 0
+
+    chosen, chosen_score = None, score("application/json")
+    for format, media_types in FORMAT_MEDIA_TYPES.items():
+        if format not in available_formats():
+            continue
+        for media_type in media_types:
+            format_score = score(media_type)
+            if format_score[0] > 0 and format_score > chosen_score:
+                chosen, chosen_score = format, format_score
+    return chosen
+
+
+class BinaryFormatMiddleware:
+    """
+    Let clients send and receive MessagePack or CBOR instead of JSON.
+
+    Request bodies in a binary format are converted to JSON before reaching the
+    app, and JSON responses are converted to the format chosen from the Accept
+    header, so routes, validation and the OpenAPI schema only deal with JSON.
+    Only paths under `path_prefix` are converted, except `exclude_paths`, all
+    their responses vary on the Accept header.
+    """
+
+    def __init__(
+        self, app: ASGIApp, *, path_prefix: str, exclude_paths: Collection[str]
+    ) -> None:
+        self.app = app
+        self.path_prefix = path_prefix
+        self.exclude_paths = exclude_paths
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        path: str = scope.get("path", "")
+        if (
+            scope["type"] != "http"
+            or not path.startswith(self.path_prefix)
+            or path in self.exclude_paths
+        ):
+            await self.app(scope, receive, send)
+            return
+        if available_formats():
+            send = vary_on_accept(send)
+        headers = Headers(scope=scope)
+        request_format = media_type_format(headers.get("content-type", ""))
+        if request_format:
+            if request_format not in available_formats():
+                response = PydanticJSONResponse(
+                    {"detail": "Unsupported media type"}, status_code=415
+                )
+                await response(scope, receive, send)
+                return
+            body = await read_body(receive)
+            try:
+                json_body = pydantic_core.to_json(decode(request_format, body))
+            except (ValueError, pydantic_core.PydanticSerializationError):
+                # Not decodable, or holding values JSON can't represent
+                response = PydanticJSONResponse(
+                    {"detail": "Invalid request body"}, status_code=400
+                )
+                await response(scope, receive, send)
+                return
+            receive = json_request(scope, receive, json_body)
+        response_format = choose_format(headers.get("accept", ""))
+        if response_format:
+            send = FormatResponder(response_format, send).send
+        await self.app(scope, receive, send)
+
+
+def vary_on_accept(send: Send) -> Send:
+    """
+    Tell caches the response depends on the Accept header, JSON responses too,
+    as another Accept header may get a binary format.
+    """
+
+    async def send_with_vary(message: Message) -> None:
+        if message["type"] == "http.response.start":
+            MutableHeaders(scope=message).add_vary_header("Accept")
+        await send(message)
+
+    return send_with_vary
+
+
+async def read_body(receive: Receive) -> bytes:
+    body = b""
+    while True:
+        message = await receive()
+        chunk: bytes = message.get("body", b"")
+        body += chunk
+        if not message.get("more_body", False):
+            return body
+
+
+def json_request(scope: Scope, receive: Receive, body: bytes) -> Receive:
+    """
+    Make `body` the JSON body of the request.
+
+    The headers are replaced in the scope itself, the routing keys set in it by
+    the router are seen by the outer middlewares.
+    """
+    headers = [
+        (name, value)
+        for name, value in scope["headers"]
+        if name not in (b"content-type", b"content-length")
+    ]
+    headers += [
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(body)).encode()),
+    ]
+    sent = False
+
+    async def receive_json() -> Message:
+        nonlocal sent
+        if sent:
+            # Wait for the client to disconnect
+            return await receive()
+        sent = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    scope["headers"] = headers
+    return receive_json
+
+
+class FormatResponder:
+    def __init__(self, format: str, send: Send) -> None:
+        self.format = format
+        self._send = send
+        self.start: Message | None = None
+        self.body = b""
+        self.passthrough = False
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.start = message
+            headers = Headers(raw=message["headers"])
+            media_type = headers.get("content-type", "").partition(";")[0].strip()
+            if media_type != "application/json":
+                self.passthrough = True
+                await self._send(message)
+        elif message["type"] != "http.response.body" or self.passthrough:
+            await self._send(message)
+        else:
+            chunk: bytes = message.get("body", b"")
+            self.body += chunk
+            if not message.get("more_body", False):
+                await self._send_converted()
+
+    async def _send_converted(self) -> None:
+        assert self.start is not None
+        body = self.body
+        headers = MutableHeaders(raw=self.start["headers"])
+        if body:
+            body = encode(self.format, pydantic_core.from_json(body))
+            headers["Content-Type"] = FORMAT_MEDIA_TYPES[self.format][0]
+            headers["Content-Length"] = str(len(body))
+        await self._send(self.start)
+        await self._send({"type": "http.response.body", "body": body})
@@ -0,0 +1,187 @@
+import logging
+import threading
+from collections.abc import Callable
+from contextvars import ContextVar
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from sqlmodel import Session, col, select, update
+
+from app.core.config import settings
+from app.models import Job
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[dict[str, Any]], None]
+
+job_handlers: dict[str, JobHandler] = {}
+
+# Set while a handler runs its job
+current_job: ContextVar[Job | None] = ContextVar("current_job", default=None)
+
+
+class JobLeaseLost(Exception):
+    """
+    Another worker claimed the running job after its lease expired.
+    """
+
+
+def job_handler(name: str) -> Callable[[JobHandler], JobHandler]:
+    """
+    Register the function running the jobs named `name`, it gets the job payload.
+    """
+
+    def register(handler: JobHandler) -> JobHandler:
+        job_handlers[name] = handler
+        return handler
+
+    return register
+
+
+def enqueue_job(
+    *,
+    session: Session,
+    name: str,
+    payload: dict[str, Any] | None = None,
+    priority: int = 0,
+    run_at: datetime | None = None,
+    max_attempts: int | None = None,
+) -> Job:
+    """
+    Add a job to the current transaction, it can only be claimed once committed.
+    """
+    job = Job(
+        name=name,
+        payload=payload or {},
+        priority=priority,
+        max_attempts=max_attempts or settings.JOBS_MAX_ATTEMPTS,
+    )
+    if run_at:
+        job.run_at = run_at
+    session.add(job)
+    return job
+
+
+def claim_job(*, session: Session) -> Job | None:
+    """
+    Claim the next job that is due, or whose worker lease expired.
+
+    Locked rows are skipped so workers never wait on each other. The claim is
+    committed right away, the job's `run_at` becomes the end of its lease.
+    """
+    now = datetime.now(timezone.utc)
+    statement = (
+        select(Job)
+        .where(
+            col(Job.status).in_(("pending", "running")),
+            col(Job.run_at) <= now,
+        )
+        .order_by(col(Job.priority).desc(), col(Job.run_at))
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )
+    job = session.exec(statement).first()
+    if not job:
+        session.rollback()
+        return None
+    if job.status == "running":
+        logger.warning(f"job {job.id} lease expired, running it again")
+    job.status = "running"
+    job.attempts += 1
+    job.run_at = now + timedelta(seconds=settings.JOBS_LEASE_SECONDS)
+    session.add(job)
+    session.commit()
+    session.refresh(job)
+    return job
+
+
+def renew_job_lease(*, session: Session) -> None:
+    """
+    Extend the lease of the running job, long handlers call it between steps so
+    no other worker claims their job meanwhile. Commits the session.
+
+    Raises JobLeaseLost when another worker already claimed the job, the handler
+    must stop as the job runs there.
+    """
+    job = current_job.get()
+    if job is None:
+        return
+    run_at = datetime.now(timezone.utc) + timedelta(seconds=settings.JOBS_LEASE_SECONDS)
+    statement = (
+        update(Job)
+        .where(col(Job.id) == job.id, col(Job.attempts) == job.attempts)
+        .values(run_at=run_at)
+    )
+    result = session.exec(statement)  # type: ignore
+    session.commit()
+    if not result.rowcount:
+        raise JobLeaseLost(f"job {job.id} ({job.name}) was claimed by another worker")
+
+
+def finish_job(
+    *, session: Session, job: Job, error: str | None = None, retry: bool = True
+) -> None:
+    """
+    Record the outcome of a claimed job, failed jobs are retried with exponential
+    backoff until they run out of attempts and are dead-lettered.
+    """
+    now = datetime.now(timezone.utc)
+    values: dict[str, Any]
+    if error is None:
+        values = {"status": "done", "finished_at": now, "last_error": None}
+    elif not retry or job.attempts >= job.max_attempts:
+        logger.error(f"job {job.id} ({job.name}) failed for good: {error}")
+        values = {"status": "dead", "finished_at": now, "last_error": error}
+    else:
+        delay = settings.JOBS_RETRY_BACKOFF_SECONDS * 2 ** (job.attempts - 1)
+        values = {
+            "status": "pending",
+            "run_at": now + timedelta(seconds=delay),
+            "last_error": error,
+        }
+    # Don't overwrite the job if another worker claimed it after the lease expired
+    statement = (
+        update(Job)
+        .where(col(Job.id) == job.id, col(Job.attempts) == job.attempts)
+        .values(**values)
+    )
+    session.exec(statement)  # type: ignore
+    session.commit()
+
+
+def run_job(*, session: Session, job: Job) -> None:
+    handler = job_handlers.get(job.name)
+    if not handler:
+        error = f"Unknown job {job.name!r}"
+        finish_job(session=session, job=job, error=error, retry=False)
+        return
+    token = current_job.set(job)
+    try:
+        handler(job.payload)
+    except Exception as e:
+        logger.exception(f"job {job.id} ({job.name}) failed")
+        finish_job(session=session, job=job, error=repr(e))
+    else:
+        finish_job(session=session, job=job)
+    finally:
+        current_job.reset(token)
+
+
+def run_pending_jobs(*, session: Session, limit: int | None = None) -> int:
+    """
+    Run due jobs until there are none left, or `limit` ran. Returns how many ran.
+    """
+    count = 0
+    while limit is None or count < limit:
+        job = claim_job(session=session)
+        if not job:
+            break
+        run_job(session=session, job=job)
+        count += 1
+    return count
+
+
+def work(*, session: Session, stop: threading.Event, poll_interval: float) -> None:
+    while not stop.is_set():
+        if not run_pending_jobs(session=session, limit=1):
+            stop.wait(poll_interval)
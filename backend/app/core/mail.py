@@ -0,0 +1,272 @@
+import logging
+import queue
+import smtplib
+import threading
+import time
+from dataclasses import dataclass
+from email.message import EmailMessage
+from email.utils import formataddr, formatdate, make_msgid
+from typing import TYPE_CHECKING
+
+from app.core.config import settings
+from app.core.tracing import current_context, traced
+
+if TYPE_CHECKING:
+    from opentelemetry.context import Context
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class OutgoingEmail:
+    email_to: str
+    subject: str
+    html_content: str
+    attempts: int = 0
+    # Of the request or job sending the email, its sends are part of its trace
+    trace_context: "Context | None" = None
+
+
+def build_message(email: OutgoingEmail) -> EmailMessage:
+    message = EmailMessage()
+    message["Subject"] = email.subject
+    message["From"] = formataddr(
+        (settings.EMAILS_FROM_NAME or "", settings.EMAILS_FROM_EMAIL or "")
+    )
+    message["To"] = email.email_to
+    message["Date"] = formatdate(localtime=True)
+    message["Message-ID"] = make_msgid()
+    message.set_content(email.html_content, subtype="html")
+    return message
+
+
+def connect_smtp() -> smtplib.SMTP:
+    assert settings.SMTP_HOST, "no provided configuration for email variables"
+    smtp: smtplib.SMTP
+    if settings.SMTP_SSL:
+        smtp = smtplib.SMTP_SSL(
+            settings.SMTP_HOST,
+            settings.SMTP_PORT,
+            timeout=settings.SMTP_TIMEOUT_SECONDS,
+        )
+    else:
+        smtp = smtplib.SMTP(
+            settings.SMTP_HOST,
+            settings.SMTP_PORT,
+            timeout=settings.SMTP_TIMEOUT_SECONDS,
+        )
+        if settings.SMTP_TLS:
+            smtp.starttls()
+    if settings.SMTP_USER and settings.SMTP_PASSWORD:
+        smtp.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
+    return smtp
+
+
+def disconnect(smtp: smtplib.SMTP | None) -> None:
+    if smtp is None:
+        return
+    try:
+        smtp.quit()
+    except (smtplib.SMTPException, OSError):
+        smtp.close()
+
+
+class MailDispatcher:
+    """
+    Send queued emails from a few worker threads, each keeping its own SMTP
+    connection open between messages.
+
+    Workers take up to `batch_size` queued emails at a time and send them over
+    the same connection, which is closed after `idle_timeout_seconds` without
+    work. Failed emails are queued again with exponential backoff and dropped,
+    with an error logged, after `max_retries` attempts. `rate_limit` caps the
+    emails sent per second by all the workers together.
+    """
+
+    def __init__(
+        self,
+        *,
+        workers: int,
+        batch_size: int,
+        max_retries: int,
+        retry_backoff_seconds: float,
+        idle_timeout_seconds: float,
+        rate_limit: float | None = None,
+    ) -> None:
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self.idle_timeout_seconds = idle_timeout_seconds
+        self.rate_limit = rate_limit
+        self._queue: queue.Queue[OutgoingEmail | None] = queue.Queue()
+        self._threads: list[threading.Thread] = []
+        self._retries: set[threading.Timer] = set()
+        self._lock = threading.Lock()
+        # Emails enqueued that were neither sent nor given up yet
+        self._unsent = 0
+        self._settled = threading.Condition(self._lock)
+        self._next_send = 0.0
+
+    def enqueue(self, email: OutgoingEmail) -> None:
+        self._ensure_running()
+        email.trace_context = current_context()
+        with self._lock:
+            self._unsent += 1
+        self._queue.put(email)
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """
+        Wait until every enqueued email was sent or given up, including retries.
+        Returns False if the timeout expired first.
+        """
+        with self._settled:
+            return self._settled.wait_for(lambda: self._unsent == 0, timeout)
+
+    def close(self) -> None:
+        """
+        Send what is queued and stop the workers, pending retries are dropped.
+        """
+        with self._lock:
+            for timer in self._retries:
+                timer.cancel()
+            if self._retries:
+                logger.warning(f"dropping {len(self._retries)} emails to retry")
+            self._unsent -= len(self._retries)
+            self._retries.clear()
+            self._settled.notify_all()
+            threads, self._threads = self._threads, []
+            for _ in threads:
+                self._queue.put(None)
+        for thread in threads:
+            thread.join()
+
+    def _ensure_running(self) -> None:
+        with self._lock:
+            if self._threads:
+                return
+            for number in range(self.workers):
+                thread = threading.Thread(
+                    target=self._work, name=f"mail-dispatcher-{number}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def _next_batch(self) -> list[OutgoingEmail | None]:
+        batch = [self._queue.get(timeout=self.idle_timeout_seconds)]
+        while batch[-1] is not None and len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _work(self) -> None:
+        smtp: smtplib.SMTP | None = None
+        while True:
+            try:
+                batch = self._next_batch()
+            except queue.Empty:
+                # Idle, don't keep the connection open until the server drops it
+                disconnect(smtp)
+                smtp = None
+                continue
+            for email in batch:
+                if email is None:
+                    disconnect(smtp)
+                    return
+                self._throttle()
+                try:
+                    with traced(
+                        "smtp.send",
+                        {"smtp.attempt": email.attempts + 1},
+                        email.trace_context,
+                    ):
+                        smtp = self._send(smtp, email)
+                except Exception:
+                    # Keep the worker alive whatever happens to a single email
+                    logger.exception(f"sending email to {email.email_to} failed")
+                    self._settle()
+
+    def _send(
+        self, smtp: smtplib.SMTP | None, email: OutgoingEmail
+    ) -> smtplib.SMTP | None:
+        """
+        Send an email, returns the connection to use for the next one.
+        """
+        email.attempts += 1
+        message = build_message(email)
+        try:
+            if smtp is not None:
+                try:
+                    smtp.send_message(message)
+                    self._settle()
+                    return smtp
+                except smtplib.SMTPServerDisconnected:
+                    # The server closed the kept connection, use a new one
+                    smtp = None
+            smtp = connect_smtp()
+            smtp.send_message(message)
+            self._settle()
+            return smtp
+        except smtplib.SMTPRecipientsRefused as e:
+            logger.error(f"email to {email.email_to} refused: {e.recipients}")
+            self._settle()
+            return smtp
+        except smtplib.SMTPResponseException as e:
+            # The transaction was reset, the connection can be reused
+            logger.warning(f"sending email to {email.email_to} failed: {e}")
+            if e.smtp_code < 500:
+                self._retry(email)
+            else:
+                self._settle()
+            return smtp
+        except (smtplib.SMTPException, OSError) as e:
+            logger.warning(f"sending email to {email.email_to} failed: {e}")
+            self._retry(email)
+            disconnect(smtp)
+            return None
+
+    def _throttle(self) -> None:
+        if not self.rate_limit:
+            return
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next_send - now
+            self._next_send = max(now, self._next_send) + 1 / self.rate_limit
+        if delay > 0:
+            time.sleep(delay)
+
+    def _settle(self) -> None:
+        with self._settled:
+            self._unsent -= 1
+            self._settled.notify_all()
+
+    def _retry(self, email: OutgoingEmail) -> None:
+        if email.attempts >= self.max_retries:
+            logger.error(
+                f"giving up sending email to {email.email_to} "
+                f"after {email.attempts} attempts"
+            )
+            self._settle()
+            return
+        delay = self.retry_backoff_seconds * 2 ** (email.attempts - 1)
+        timer = threading.Timer(delay, self._requeue, args=(email,))
+        timer.daemon = True
+        with self._lock:
+            self._retries.add(timer)
+        timer.start()
+
+    def _requeue(self, email: OutgoingEmail) -> None:
+        with self._lock:
+            self._retries.discard(threading.current_thread())
+        self._queue.put(email)
+
+
+mail_dispatcher = MailDispatcher(
+    workers=settings.SMTP_POOL_SIZE,
+    batch_size=settings.SMTP_BATCH_SIZE,
+    max_retries=settings.SMTP_MAX_RETRIES,
+    retry_backoff_seconds=settings.SMTP_RETRY_BACKOFF_SECONDS,
+    idle_timeout_seconds=settings.SMTP_IDLE_TIMEOUT_SECONDS,
+)
@@ -0,0 +1,170 @@
+import gc
+import os
+import resource
+import sys
+import threading
+import tracemalloc
+from collections import Counter
+from typing import Literal
+
+from app.models import (
+    AllocationSite,
+    AllocationSites,
+    GCGeneration,
+    GCStats,
+    MemoryStatus,
+    ObjectCount,
+    ObjectCounts,
+)
+
+GroupBy = Literal["lineno", "filename", "traceback"]
+
+# Allocations made by tracemalloc itself or while importing
+IGNORED_TRACES = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+# The snapshot allocations are compared to, taken when tracing starts
+_snapshot: tracemalloc.Snapshot | None = None
+_lock = threading.Lock()
+
+
+def current_rss() -> int | None:
+    """
+    The memory resident now, in bytes, None where /proc is not available.
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            resident_pages = int(statm.read().split()[1])
+    except OSError:
+        return None
+    return resident_pages * os.sysconf("SC_PAGE_SIZE")
+
+
+def memory_status() -> MemoryStatus:
+    traced_size, traced_peak_size = tracemalloc.get_traced_memory()
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform != "darwin":
+        # In KiB, except on macOS
+        max_rss *= 1024
+    return MemoryStatus(
+        pid=os.getpid(),
+        tracing=tracemalloc.is_tracing(),
+        traced_size=traced_size,
+        traced_peak_size=traced_peak_size,
+        tracemalloc_size=tracemalloc.get_tracemalloc_memory(),
+        rss=current_rss(),
+        max_rss=max_rss,
+        has_snapshot=_snapshot is not None,
+    )
+
+
+def start_tracing(frames: int) -> bool:
+    """
+    Trace the allocations made from now on, recording `frames` frames of their
+    traceback. Costs memory and CPU for every allocation until stopped.
+
+    False when already tracing, the traces and snapshot are left as they are.
+    """
+    global _snapshot
+    with _lock:
+        if tracemalloc.is_tracing():
+            return False
+        tracemalloc.start(frames)
+        _snapshot = take_snapshot()
+    return True
+
+
+def stop_tracing() -> None:
+    """
+    Stop tracing and free the traces.
+    """
+    global _snapshot
+    with _lock:
+        tracemalloc.stop()
+        _snapshot = None
+
+
+def take_snapshot() -> tracemalloc.Snapshot:
+    return tracemalloc.take_snapshot().filter_traces(IGNORED_TRACES)
+
+
+def replace_snapshot() -> None:
+    """
+    Compare the allocations to the ones alive now from now on.
+    """
+    global _snapshot
+    with _lock:
+        _snapshot = take_snapshot()
+
+
+def top_allocations(
+    *, group_by: GroupBy, limit: int, compare: bool
+) -> AllocationSites | None:
+    """
+    The sites holding the most memory or, with `compare`, which grew the most
+    since the snapshot. None when not tracing.
+    """
+    with _lock:
+        if not tracemalloc.is_tracing() or (compare and _snapshot is None):
+            return None
+        snapshot = take_snapshot()
+        if compare:
+            assert _snapshot is not None
+            differences = snapshot.compare_to(_snapshot, group_by)[:limit]
+            data = [
+                AllocationSite(
+                    traceback=difference.traceback.format(),
+                    size=difference.size,
+                    count=difference.count,
+                    size_diff=difference.size_diff,
+                    count_diff=difference.count_diff,
+                )
+                for difference in differences
+            ]
+        else:
+            data = [
+                AllocationSite(
+                    traceback=statistic.traceback.format(),
+                    size=statistic.size,
+                    count=statistic.count,
+                )
+                for statistic in snapshot.statistics(group_by)[:limit]
+            ]
+    return AllocationSites(pid=os.getpid(), data=data)
+
+
+def object_counts(limit: int) -> ObjectCounts:
+    """
+    The most common types of the objects tracked by the garbage collector, the
+    containers such as instances, dicts and lists.
+    """
+    counts = Counter(
+        f"{type(obj).__module__}.{type(obj).__qualname__}" for obj in gc.get_objects()
+    )
+    return ObjectCounts(
+        pid=os.getpid(),
+        data=[
+            ObjectCount(type=name, count=count)
+            for name, count in counts.most_common(limit)
+        ],
+    )
+
+
+def gc_stats() -> GCStats:
+    generations = [
+        GCGeneration(
+            collections=stats["collections"],
+            collected=stats["collected"],
+            uncollectable=stats["uncollectable"],
+            count=count,
+            threshold=threshold,
+        )
+        for stats, count, threshold in zip(
+            gc.get_stats(), gc.get_count(), gc.get_threshold(), strict=True
+        )
+    ]
+    return GCStats(pid=os.getpid(), generations=generations, garbage=len(gc.garbage))
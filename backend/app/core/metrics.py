@@ -0,0 +1,271 @@
+import asyncio
+import importlib.util
+import os
+import secrets
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any
+
+from anyio import to_thread
+from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
+from fastapi.routing import APIRoute
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+
+@dataclass
+class Metrics:
+    request_seconds: Any
+    requests_in_progress: Any
+    db_pool_connections: Any
+    db_pool_size: Any
+    threadpool_threads: Any
+    threadpool_size: Any
+    password_hash_seconds: Any
+    items_cache_lookups: Any
+    items_cache_evictions: Any
+    items_cache_entries: Any
+    items_cache_size: Any
+
+
+@lru_cache
+def prometheus_client_installed() -> bool:
+    return importlib.util.find_spec("prometheus_client") is not None
+
+
+def metrics_enabled() -> bool:
+    # Optional dependency, metrics are only collected when it is installed
+    return settings.METRICS_ENABLED and prometheus_client_installed()
+
+
+_metrics: Metrics | None = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics() -> Metrics | None:
+    """
+    The metrics of this process, None when disabled.
+
+    With several workers, PROMETHEUS_MULTIPROC_DIR must be set to a directory
+    shared by the workers and emptied before they start, their samples are
+    written there and aggregated when scraped.
+    """
+    if _metrics is not None or not metrics_enabled():
+        return _metrics
+    with _metrics_lock:
+        # Registering a metric twice fails, first uses may race in threads
+        if _metrics is None:
+            _create_metrics()
+    return _metrics
+
+
+def _create_metrics() -> None:
+    global _metrics
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        # Also set for the scripts and the single worker of development runs
+        os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+    from prometheus_client import Gauge, Histogram
+
+    _metrics = Metrics(
+        request_seconds=Histogram(
+            "http_request_duration_seconds",
+            "Time to send the response, per route.",
+            ["route", "method", "status"],
+        ),
+        requests_in_progress=Gauge(
+            "http_requests_in_progress",
+            "Requests being handled.",
+            multiprocess_mode="livesum",
+        ),
+        db_pool_connections=Gauge(
+            "db_pool_connections",
+            "Database connections, checked out by a request or idle in the pool.",
+            ["state"],
+            multiprocess_mode="livesum",
+        ),
+        db_pool_size=Gauge(
+            "db_pool_size",
+            "Connections kept open by the pools.",
+            multiprocess_mode="livesum",
+        ),
+        threadpool_threads=Gauge(
+            "threadpool_threads_busy",
+            "Worker threads running sync routes and dependencies.",
+            multiprocess_mode="livesum",
+        ),
+        threadpool_size=Gauge(
+            "threadpool_threads_limit",
+            "Worker threads available to run sync routes and dependencies.",
+            multiprocess_mode="livesum",
+        ),
+        password_hash_seconds=Histogram(
+            "password_hash_duration_seconds",
+            "Time to hash or verify a password.",
+            ["operation"],
+            buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 2.0, 5.0),
+        ),
+        # Totals kept by the cache of each worker, summed across workers
+        items_cache_lookups=Gauge(
+            "items_cache_lookups",
+            "Items pages looked up in the cache, found or not.",
+            ["result"],
+            multiprocess_mode="sum",
+        ),
+        items_cache_evictions=Gauge(
+            "items_cache_evictions",
+            "Items pages evicted from the in-process cache to make room.",
+            multiprocess_mode="sum",
+        ),
+        items_cache_entries=Gauge(
+            "items_cache_entries",
+            "Items pages held by the in-process cache.",
+            multiprocess_mode="livesum",
+        ),
+        items_cache_size=Gauge(
+            "items_cache_size_bytes",
+            "Size of the items pages held by the in-process cache.",
+            multiprocess_mode="livesum",
+        ),
+    )
+
+
+@contextmanager
+def time_password_hash(operation: str) -> Iterator[None]:
+    metrics = get_metrics()
+    if metrics is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.password_hash_seconds.labels(operation).observe(
+            time.perf_counter() - start
+        )
+
+
+def update_resource_metrics() -> None:
+    """
+    Record the database pool, threadpool and items cache usage, from the event
+    loop thread.
+    """
+    from app.core.cache import get_items_cache
+    from app.core.db import get_engine
+
+    metrics = get_metrics()
+    if metrics is None:
+        return
+    pool: Any = get_engine().pool
+    metrics.db_pool_connections.labels("checked_out").set(pool.checkedout())
+    metrics.db_pool_connections.labels("idle").set(pool.checkedin())
+    metrics.db_pool_size.set(pool.size())
+    limiter = to_thread.current_default_thread_limiter()
+    metrics.threadpool_threads.set(limiter.borrowed_tokens)
+    metrics.threadpool_size.set(limiter.total_tokens)
+    if settings.ITEMS_CACHE_ENABLED:
+        stats = get_items_cache().stats()
+        metrics.items_cache_lookups.labels("hit").set(stats.hits)
+        metrics.items_cache_lookups.labels("miss").set(stats.misses)
+        metrics.items_cache_evictions.set(stats.evictions)
+        metrics.items_cache_entries.set(stats.entries)
+        metrics.items_cache_size.set(stats.size_bytes)
+
+
+async def update_resource_metrics_periodically(interval: float) -> None:
+    while True:
+        update_resource_metrics()
+        await asyncio.sleep(interval)
+
+
+def mark_process_dead() -> None:
+    """
+    Drop the live gauges of this worker from the aggregated samples.
+    """
+    if get_metrics() is not None and "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(os.getpid())  # type: ignore[no-untyped-call]
+
+
+def generate_metrics() -> bytes:
+    from prometheus_client import (
+        REGISTRY,
+        CollectorRegistry,
+        generate_latest,
+        multiprocess,
+    )
+
+    registry = REGISTRY
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        # Aggregate the samples of all the workers
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)  # type: ignore[no-untyped-call]
+    return generate_latest(registry)
+
+
+async def metrics_endpoint(request: Request) -> Response:
+    from prometheus_client import CONTENT_TYPE_LATEST
+
+    if settings.METRICS_BEARER_TOKEN:
+        authorization = request.headers.get("authorization", "")
+        expected = f"Bearer {settings.METRICS_BEARER_TOKEN}"
+        if not secrets.compare_digest(authorization.encode(), expected.encode()):
+            return Response(status_code=401, headers={"WWW-Authenticate": "Bearer"})
+    update_resource_metrics()
+    body = await run_in_threadpool(generate_metrics)
+    return Response(body, media_type=CONTENT_TYPE_LATEST)
+
+
+class MetricsMiddleware:
+    """
+    Record the duration of requests per route, named by their operation id, and
+    the requests in progress.
+    """
+
+    def __init__(self, app: ASGIApp, *, fastapi_app: FastAPI) -> None:
+        self.app = app
+        self.fastapi_app = fastapi_app
+        self._route_names: dict[Any, str] | None = None
+
+    def route_name(self, scope: Scope) -> str:
+        if self._route_names is None:
+            self._route_names = {
+                route.endpoint: route.unique_id
+                for route in self.fastapi_app.routes
+                if isinstance(route, APIRoute)
+            }
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        return self._route_names.get(endpoint, getattr(endpoint, "__name__", "other"))
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        metrics = get_metrics()
+        if scope["type"] != "http" or metrics is None:
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        metrics.requests_in_progress.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            metrics.requests_in_progress.dec()
+            metrics.request_seconds.labels(
+                self.route_name(scope), scope["method"], str(status_code)
+            ).observe(time.perf_counter() - start)
@@ -0,0 +1,259 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from collections.abc import Callable
+from contextvars import ContextVar
+from pathlib import Path
+from types import FrameType
+
+from fastapi.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import PlainTextResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+Stack = tuple[str, ...]
+
+
+class Sampler(threading.Thread):
+    """
+    Sample the stacks of a request every `interval` seconds, in the event loop
+    while its task runs and in the worker threads running its sync code.
+
+    Worker threads are sampled once they call `register_thread` for the request,
+    until the request ends.
+    """
+
+    def __init__(self, *, interval: float, max_seconds: float) -> None:
+        super().__init__(name="profiler", daemon=True)
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.loop = asyncio.get_running_loop()
+        self.task = asyncio.current_task()
+        self.loop_thread_id = threading.get_ident()
+        self.thread_ids: set[int] = set()
+        self.samples: Counter[Stack] = Counter()
+        self.stopped = threading.Event()
+
+    def run(self) -> None:
+        deadline = time.monotonic() + self.max_seconds
+        while not self.stopped.wait(self.interval) and time.monotonic() < deadline:
+            self.sample()
+
+    def stop(self) -> None:
+        self.stopped.set()
+        self.join()
+
+    def sample(self) -> None:
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == self.loop_thread_id:
+                if asyncio.current_task(self.loop) is not self.task:
+                    continue
+            elif thread_id not in self.thread_ids:
+                continue
+            self.samples[stack(frame)] += 1
+
+
+# Set for the profiled request, copied into the threads running its sync code
+active_sampler: ContextVar[Sampler | None] = ContextVar("active_sampler", default=None)
+
+
+def register_thread() -> None:
+    """
+    Sample the current thread for the profiled request, if any. Called from the
+    code the request runs in worker threads, such as its database session and
+    statements.
+    """
+    sampler = active_sampler.get()
+    if sampler is not None:
+        sampler.thread_ids.add(threading.get_ident())
+
+
+def stack(frame: FrameType) -> Stack:
+    """
+    The functions called from the outermost to `frame`.
+    """
+    functions = []
+    current: FrameType | None = frame
+    while current is not None:
+        code = current.f_code
+        filename = code.co_filename.rsplit("site-packages/", 1)[-1]
+        functions.append(f"{code.co_name} ({filename}:{code.co_firstlineno})")
+        current = current.f_back
+    return tuple(reversed(functions))
+
+
+def collapsed_stacks(samples: Counter[Stack]) -> str:
+    """
+    One line per stack with its samples, the input of flamegraph.pl and
+    speedscope.
+    """
+    return "".join(f"{';'.join(s)} {count}\n" for s, count in samples.items())
+
+
+def parse_collapsed_stacks(collapsed: str) -> Counter[Stack]:
+    samples: Counter[Stack] = Counter()
+    for line in collapsed.splitlines():
+        functions, _, count = line.rpartition(" ")
+        samples[tuple(functions.split(";"))] += int(count)
+    return samples
+
+
+def call_tree(samples: Counter[Stack], min_share: float = 0.005) -> str:
+    """
+    The functions sampled nested under their callers, with their share of the
+    samples. Calls below `min_share` are left out.
+    """
+    total = sum(samples.values())
+    if not total:
+        return "No samples\n"
+    tree: Counter[Stack] = Counter()
+    for functions, count in samples.items():
+        for depth in range(1, len(functions) + 1):
+            tree[functions[:depth]] += count
+    children: dict[Stack, list[Stack]] = {}
+    for path in tree:
+        children.setdefault(path[:-1], []).append(path)
+    lines = []
+
+    def add(prefix: Stack) -> None:
+        for path in sorted(children.get(prefix, []), key=lambda p: -tree[p]):
+            count = tree[path]
+            if count / total < min_share:
+                continue
+            lines.append(
+                f"{count / total:6.1%} {count:>6}  {'  ' * len(prefix)}{path[-1]}"
+            )
+            add(path)
+
+    add(())
+    return f"{total} samples\n" + "\n".join(lines) + "\n"
+
+
+def profile_path(profile_id: str) -> Path:
+    return Path(settings.PROFILING_DIRECTORY) / f"{profile_id}.collapsed"
+
+
+class RateLimiter:
+    """
+    Allow `limit` events per `period` seconds, one at a time.
+    """
+
+    def __init__(self, *, limit: int, period: float) -> None:
+        self.limit = limit
+        self.period = period
+        self.events: deque[float] = deque()
+        self.active = False
+
+    def acquire(self) -> bool:
+        now = time.monotonic()
+        while self.events and self.events[0] <= now - self.period:
+            self.events.popleft()
+        if self.active or len(self.events) >= self.limit:
+            return False
+        self.events.append(now)
+        self.active = True
+        return True
+
+    def release(self) -> None:
+        self.active = False
+
+
+class ProfilingMiddleware:
+    """
+    Profile the requests of superusers sending an `X-Profile` header.
+
+    `authorize` is given the request's bearer token and tells whether it belongs
+    to a superuser, the header is ignored otherwise. The profile is stored as
+    collapsed stacks, its id is sent in the `X-Profile-Id` response header.
+    Requests without the header only pay for looking it up.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        *,
+        authorize: Callable[[str], bool],
+        limit: int,
+        period: float,
+    ) -> None:
+        self.app = app
+        self.authorize = authorize
+        self.rate_limiter = RateLimiter(limit=limit, period=period)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        if "x-profile" not in headers:
+            await self.app(scope, receive, send)
+            return
+        scheme, _, token = headers.get("authorization", "").partition(" ")
+        if scheme.lower() != "bearer" or not await run_in_threadpool(
+            self.authorize, token
+        ):
+            await self.app(scope, receive, send)
+            return
+        if not self.rate_limiter.acquire():
+            response = PlainTextResponse("Too many profiled requests", 429)
+            await response(scope, receive, send)
+            return
+        try:
+            await self.profile(scope, receive, send)
+        finally:
+            self.rate_limiter.release()
+
+    async def profile(self, scope: Scope, receive: Receive, send: Send) -> None:
+        profile_id = uuid.uuid4().hex
+
+        async def send_with_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)["X-Profile-Id"] = profile_id
+            await send(message)
+
+        sampler = Sampler(
+            interval=settings.PROFILING_INTERVAL_SECONDS,
+            max_seconds=settings.PROFILING_MAX_SECONDS,
+        )
+        token = active_sampler.set(sampler)
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            sampler.stop()
+            active_sampler.reset(token)
+            await run_in_threadpool(save_profile, profile_id, sampler.samples)
+            logger.info(
+                f"profiled {scope['method']} {scope['path']} as {profile_id}, "
+                f"{sum(sampler.samples.values())} samples"
+            )
+
+
+def save_profile(profile_id: str, samples: Counter[Stack]) -> None:
+    """
+    Store the profile, deleting the oldest ones beyond PROFILING_MAX_PROFILES.
+    """
+    path = profile_path(profile_id)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(collapsed_stacks(samples))
+    prune_profiles(path.parent, keep=settings.PROFILING_MAX_PROFILES)
+
+
+def prune_profiles(directory: Path, *, keep: int) -> None:
+    profiles = []
+    for path in directory.glob("*.collapsed"):
+        try:
+            profiles.append((path.stat().st_mtime, path))
+        except FileNotFoundError:
+            continue
+    profiles.sort(reverse=True)
+    for _, path in profiles[keep:]:
+        path.unlink(missing_ok=True)
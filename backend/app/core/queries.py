@@ -0,0 +1,98 @@
+import logging
+from collections.abc import Mapping, Sequence
+from contextvars import ContextVar
+from typing import Any
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class QueryStats:
+    """
+    Statements executed while handling a request and the time spent in them.
+    """
+
+    def __init__(self) -> None:
+        self.statements = 0
+        self.seconds = 0.0
+
+
+# Set for each request, copied into the threads running sync code
+request_queries: ContextVar[QueryStats | None] = ContextVar(
+    "request_queries", default=None
+)
+
+
+def parameters_shape(parameters: Any, executemany: bool = False) -> str:
+    """
+    The names and types of the bound parameters, without their values.
+    """
+    if executemany and isinstance(parameters, Sequence) and parameters:
+        return f"{len(parameters)} x {parameters_shape(parameters[0])}"
+    if isinstance(parameters, Mapping):
+        types = (
+            f"{name}: {type(value).__name__}" for name, value in parameters.items()
+        )
+        return "{" + ", ".join(types) + "}"
+    if isinstance(parameters, Sequence):
+        return "(" + ", ".join(type(value).__name__ for value in parameters) + ")"
+    return type(parameters).__name__
+
+
+def record_statement(
+    statement: str, parameters: Any, executemany: bool, seconds: float
+) -> None:
+    """
+    Count an executed statement in the request's stats and log it when slower
+    than `SLOW_STATEMENT_THRESHOLD_SECONDS`, called by the statement listeners.
+    """
+    stats = request_queries.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.seconds += seconds
+    if seconds >= settings.SLOW_STATEMENT_THRESHOLD_SECONDS:
+        shape = parameters_shape(parameters, executemany)
+        logger.warning(
+            f"slow statement took {seconds * 1000:.1f} ms: {statement} "
+            f"parameters={shape}",
+            extra={"duration": seconds, "parameters_shape": shape},
+        )
+
+
+class QueryCountMiddleware:
+    """
+    Log the statements executed by each request and their time, as a warning
+    above `threshold` statements, which usually means relationships are lazy
+    loaded one row at a time.
+    """
+
+    def __init__(self, app: ASGIApp, *, threshold: int) -> None:
+        self.app = app
+        self.threshold = threshold
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = QueryStats()
+        token = request_queries.set(stats)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            request_queries.reset(token)
+            level = logging.DEBUG
+            if stats.statements > self.threshold:
+                level = logging.WARNING
+            if logger.isEnabledFor(level):
+                endpoint = scope.get("endpoint")
+                logger.log(
+                    level,
+                    f"request executed {stats.statements} statements "
+                    f"in {stats.seconds * 1000:.1f} ms method={scope['method']} "
+                    f"path={scope['path']} "
+                    f"endpoint={getattr(endpoint, '__name__', None)}",
+                    extra={"statements": stats.statements, "db": stats.seconds},
+                )
@@ -0,0 +1,39 @@
+from typing import Any
+
+import pydantic_core
+from pydantic import BaseModel
+from starlette.responses import JSONResponse, Response
+
+from app.core.timing import timed
+
+
+class PydanticJSONResponse(JSONResponse):
+    """
+    JSON response encoded by pydantic-core, in Rust, instead of the json module.
+
+    NaN and infinities are sent as null, like pydantic models serialize them, as
+    JSON has no representation for them.
+    """
+
+    def render(self, content: Any) -> bytes:
+        with timed("serialize"):
+            return pydantic_core.to_json(content, inf_nan_mode="null")
+
+
+class TrustedResponse(Response):
+    """
+    JSON response for a model the route already built, or for its JSON bytes.
+
+    FastAPI validates what a route returns against its `response_model` again
+    before serializing it, but returns a response as it is. Only return this
+    for instances of the route's `response_model`, the docs are still generated
+    from it.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: BaseModel | bytes) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        with timed("serialize"):
+            return type(content).__pydantic_serializer__.to_json(content)
@@ -1,3 +1,5 @@
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from typing import Any
 
@@ -5,6 +7,8 @@ import jwt
 from passlib.context import CryptContext
 
 from app.core.config import settings
+from app.core.metrics import time_password_hash
+from app.core.tracing import traced
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -20,8 +24,18 @@ def create_access_token(subject: str | Any, expires_delta: timedelta) -> str:
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    with time_password_hash("verify"), traced("verify_password"):
+        return pwd_context.verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    with time_password_hash("hash"), traced("get_password_hash"):
+        return pwd_context.hash(password)
+
+
+def get_password_hashes(passwords: Sequence[str]) -> list[str]:
+    """
+    Hash many passwords using all the cores, bcrypt releases the GIL while hashing.
+    """
+    with ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS) as executor:
+        return list(executor.map(get_password_hash, passwords))
@@ -0,0 +1,74 @@
+import random
+import threading
+from collections import OrderedDict
+
+from opentelemetry.context import Context
+from opentelemetry.sdk.trace import ReadableSpan, Span, SpanProcessor
+from opentelemetry.trace import StatusCode
+
+
+class TailSamplingSpanProcessor(SpanProcessor):
+    """
+    Hold the spans of a trace until its local root span ends, then pass them on
+    to `processor` if the trace failed, took `slow_seconds` or more, or was
+    drawn at `sample_rate`.
+
+    Spans ending after their trace was decided, such as emails sent once the
+    response is out, follow the decision. At most `max_traces` traces are held
+    or remembered, the oldest are dropped first.
+    """
+
+    def __init__(
+        self,
+        processor: SpanProcessor,
+        *,
+        sample_rate: float,
+        slow_seconds: float,
+        max_traces: int = 10_000,
+    ) -> None:
+        self.processor = processor
+        self.sample_rate = sample_rate
+        self.slow_seconds = slow_seconds
+        self.max_traces = max_traces
+        self._lock = threading.Lock()
+        self._pending: OrderedDict[int, list[ReadableSpan]] = OrderedDict()
+        self._decided: OrderedDict[int, bool] = OrderedDict()
+
+    def on_start(self, span: Span, parent_context: Context | None = None) -> None:
+        self.processor.on_start(span, parent_context)
+
+    def on_end(self, span: ReadableSpan) -> None:
+        assert span.context is not None
+        trace_id = span.context.trace_id
+        with self._lock:
+            if trace_id in self._decided:
+                spans = [span] if self._decided[trace_id] else []
+            else:
+                pending = self._pending.setdefault(trace_id, [])
+                pending.append(span)
+                if span.parent is not None and not span.parent.is_remote:
+                    if len(self._pending) > self.max_traces:
+                        self._pending.popitem(last=False)
+                    return
+                del self._pending[trace_id]
+                keep = self.keep(span, pending)
+                self._decided[trace_id] = keep
+                if len(self._decided) > self.max_traces:
+                    self._decided.popitem(last=False)
+                spans = pending if keep else []
+        for span in spans:
+            self.processor.on_end(span)
+
+    def keep(self, root: ReadableSpan, spans: list[ReadableSpan]) -> bool:
+        if any(span.status.status_code is StatusCode.ERROR for span in spans):
+            return True
+        assert root.start_time is not None and root.end_time is not None
+        if (root.end_time - root.start_time) / 1e9 >= self.slow_seconds:
+            return True
+        return random.random() < self.sample_rate
+
+    def shutdown(self) -> None:
+        self.processor.shutdown()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return self.processor.force_flush(timeout_millis)
@@ -0,0 +1,52 @@
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+from jinja2 import (
+    BaseLoader,
+    ChoiceLoader,
+    Environment,
+    FileSystemBytecodeCache,
+    FileSystemLoader,
+    ModuleLoader,
+)
+
+from app.core.config import settings
+
+EMAIL_TEMPLATES_DIR = Path(__file__).parent.parent / "email-templates" / "build"
+# Written by scripts/compile_email_templates.py, used when present
+COMPILED_EMAIL_TEMPLATES_DIR = EMAIL_TEMPLATES_DIR.parent / "compiled"
+
+
+@lru_cache
+def get_email_templates() -> Environment:
+    """
+    Shared environment for the email templates.
+
+    Templates are compiled once and kept in memory, `auto_reload` is off so
+    rendering a loaded template doesn't stat its file. Precompiled templates are
+    preferred when bundled, otherwise compiled code is reused across processes
+    through the bytecode cache.
+    """
+    loader: BaseLoader = FileSystemLoader(EMAIL_TEMPLATES_DIR)
+    if COMPILED_EMAIL_TEMPLATES_DIR.is_dir():
+        loader = ChoiceLoader([ModuleLoader(COMPILED_EMAIL_TEMPLATES_DIR), loader])
+    return Environment(
+        loader=loader,
+        bytecode_cache=FileSystemBytecodeCache(
+            settings.EMAIL_TEMPLATES_BYTECODE_CACHE_DIR
+        ),
+        auto_reload=False,
+        # Keep every template loaded, there are only a handful
+        cache_size=-1,
+    )
+
+
+def load_email_templates() -> None:
+    environment = get_email_templates()
+    for template_name in FileSystemLoader(EMAIL_TEMPLATES_DIR).list_templates():
+        environment.get_template(template_name)
+
+
+def render_email_template(*, template_name: str, context: dict[str, Any]) -> str:
+    return get_email_templates().get_template(template_name).render(context)
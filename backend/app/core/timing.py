@@ -0,0 +1,134 @@
+import logging
+import random
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any
+
+from sqlalchemy import Connection, Engine, event
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.profiling import register_thread
+from app.core.queries import record_statement
+
+logger = logging.getLogger(__name__)
+
+
+class Timings:
+    """
+    Time spent in each phase of a request, in milliseconds.
+    """
+
+    def __init__(self) -> None:
+        self.start = time.perf_counter()
+        self.phases: dict[str, float] = {}
+
+    def add(self, name: str, milliseconds: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + milliseconds
+
+    def total(self) -> float:
+        return (time.perf_counter() - self.start) * 1000
+
+    def server_timing(self) -> str:
+        metrics = [*self.phases.items(), ("total", self.total())]
+        return ", ".join(f"{name};dur={duration:.1f}" for name, duration in metrics)
+
+
+# Set for the sampled requests only, copied into the threads running sync code
+request_timings: ContextVar[Timings | None] = ContextVar(
+    "request_timings", default=None
+)
+
+
+@contextmanager
+def timed(name: str) -> Iterator[None]:
+    """
+    Add the time spent in the block to the `name` phase of a sampled request.
+    """
+    timings = request_timings.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, (time.perf_counter() - start) * 1000)
+
+
+def time_statements(engine: Engine) -> None:
+    """
+    Time each statement, added to the `db` phase of a sampled request and to
+    the request's query stats, and logged when slow. The threads executing them
+    are sampled when the request is profiled.
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn: Connection, *_: Any) -> None:
+        register_thread()
+        conn.info["statement_start"] = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(
+        conn: Connection,
+        _cursor: Any,
+        statement: str,
+        parameters: Any,
+        _context: Any,
+        executemany: bool,
+    ) -> None:
+        start = conn.info.pop("statement_start", None)
+        if start is None:
+            return
+        elapsed = time.perf_counter() - start
+        timings = request_timings.get()
+        if timings is not None:
+            timings.add("db", elapsed * 1000)
+        record_statement(statement, parameters, executemany, elapsed)
+
+
+class ServerTimingMiddleware:
+    """
+    Time the phases of a sample of the requests, reported in a Server-Timing
+    header and logged once the response is sent.
+
+    Requests not sampled only pay for a random draw, the `timed` blocks they go
+    through do nothing.
+    """
+
+    def __init__(self, app: ASGIApp, *, sample_rate: float) -> None:
+        self.app = app
+        self.sample_rate = sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or random.random() >= self.sample_rate:
+            await self.app(scope, receive, send)
+            return
+        timings = Timings()
+        token = request_timings.set(timings)
+        status_code = 500
+
+        async def send_with_timings(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", timings.server_timing())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timings)
+        finally:
+            request_timings.reset(token)
+            endpoint = scope.get("endpoint")
+            phases = " ".join(
+                f"{name}={duration:.1f}" for name, duration in timings.phases.items()
+            )
+            logger.info(
+                f"request timings method={scope['method']} path={scope['path']} "
+                f"endpoint={getattr(endpoint, '__name__', None)} "
+                f"status={status_code} total={timings.total():.1f} {phases}",
+                extra={"timings": {**timings.phases, "total": timings.total()}},
+            )
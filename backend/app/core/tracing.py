@@ -0,0 +1,215 @@
+import importlib.util
+import os
+import sys
+import threading
+from collections.abc import Iterator, Mapping
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import IO, TYPE_CHECKING, Any
+
+from sqlalchemy import Connection, Engine, event
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+if TYPE_CHECKING:
+    from opentelemetry.context import Context
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import SpanExporter
+    from opentelemetry.trace import Tracer
+
+
+@lru_cache
+def opentelemetry_installed() -> bool:
+    return importlib.util.find_spec("opentelemetry.sdk") is not None
+
+
+def tracing_enabled() -> bool:
+    # Optional dependency, traces are only recorded when it is installed
+    return settings.TRACING_ENABLED and opentelemetry_installed()
+
+
+_provider: "TracerProvider | None" = None
+_tracer: "Tracer | None" = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> "Tracer | None":
+    """
+    The tracer of this process, None when disabled.
+    """
+    if _tracer is not None or not tracing_enabled():
+        return _tracer
+    with _tracer_lock:
+        if _tracer is None:
+            _create_tracer()
+    return _tracer
+
+
+def span_exporter() -> "SpanExporter":
+    from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+
+    if settings.TRACING_EXPORTER == "otlp":
+        # Configured by the OTEL_EXPORTER_OTLP_* environment variables
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import (
+            OTLPSpanExporter,
+        )
+
+        return OTLPSpanExporter()
+    if settings.TRACING_EXPORTER == "file":
+        # One file per worker, so they never write to the same file
+        directory = Path(settings.TRACING_DIRECTORY)
+        directory.mkdir(parents=True, exist_ok=True)
+        out: IO[str] = open(directory / f"traces-{os.getpid()}.jsonl", "a")  # noqa: SIM115
+    else:
+        out = sys.stdout
+    return ConsoleSpanExporter(
+        out=out,
+        formatter=lambda span: span.to_json(indent=None) + "\n",
+    )
+
+
+def _create_tracer() -> None:
+    global _provider, _tracer
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+    from app.core.tail_sampling import TailSamplingSpanProcessor
+
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": settings.PROJECT_NAME}),
+        sampler=ParentBased(TraceIdRatioBased(settings.TRACING_HEAD_SAMPLE_RATE)),
+    )
+    provider.add_span_processor(
+        TailSamplingSpanProcessor(
+            BatchSpanProcessor(span_exporter()),
+            sample_rate=settings.TRACING_TAIL_SAMPLE_RATE,
+            slow_seconds=settings.TRACING_TAIL_SLOW_SECONDS,
+        )
+    )
+    _provider = provider
+    _tracer = provider.get_tracer("app")
+
+
+def shutdown_tracing() -> None:
+    """
+    Export the spans still held before the process exits.
+    """
+    if _provider is not None:
+        _provider.shutdown()
+
+
+def current_context() -> "Context | None":
+    """
+    The trace context, to continue the trace in another thread.
+    """
+    if get_tracer() is None:
+        return None
+    from opentelemetry import context
+
+    return context.get_current()
+
+
+@contextmanager
+def traced(
+    name: str,
+    attributes: Mapping[str, str | int | float | bool] | None = None,
+    context: "Context | None" = None,
+) -> Iterator[None]:
+    """
+    Record the block as a span, child of the current span or of `context`.
+    """
+    tracer = get_tracer()
+    if tracer is None:
+        yield
+        return
+    with tracer.start_as_current_span(name, context=context, attributes=attributes):
+        yield
+
+
+def trace_statements(engine: Engine) -> None:
+    """
+    Record a span for each statement executed within a traced request or job.
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(
+        conn: Connection, _cursor: Any, statement: str, *_: Any
+    ) -> None:
+        tracer = get_tracer()
+        if tracer is None:
+            return
+        from opentelemetry import trace
+
+        if not trace.get_current_span().is_recording():
+            return
+        conn.info["span"] = tracer.start_span(
+            statement.split(maxsplit=1)[0],
+            kind=trace.SpanKind.CLIENT,
+            attributes={"db.system": "postgresql", "db.query.text": statement},
+        )
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn: Connection, *_: Any) -> None:
+        span = conn.info.pop("span", None)
+        if span is not None:
+            span.end()
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context: Any) -> None:
+        if context.connection is None:
+            return
+        span = context.connection.info.pop("span", None)
+        if span is not None:
+            from opentelemetry.trace import Status, StatusCode
+
+            span.record_exception(context.original_exception)
+            span.set_status(Status(StatusCode.ERROR))
+            span.end()
+
+
+class TracingMiddleware:
+    """
+    Record a span for each request, continuing the trace of the client when it
+    sends a traceparent header.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        tracer = get_tracer()
+        if scope["type"] != "http" or tracer is None:
+            await self.app(scope, receive, send)
+            return
+        from opentelemetry import propagate, trace
+
+        method = scope["method"]
+        with tracer.start_as_current_span(
+            method,
+            context=propagate.extract(Headers(scope=scope)),
+            kind=trace.SpanKind.SERVER,
+            attributes={"http.request.method": method, "url.path": scope["path"]},
+        ) as span:
+            status_code = 500
+
+            async def send_with_status(message: Message) -> None:
+                nonlocal status_code
+                if message["type"] == "http.response.start":
+                    status_code = message["status"]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                route = scope.get("route")
+                if route is not None:
+                    span.update_name(f"{method} {route.path}")
+                    span.set_attribute("http.route", route.path)
+                span.set_attribute("http.response.status_code", status_code)
+                if status_code >= 500:
+                    span.set_status(trace.Status(trace.StatusCode.ERROR))
@@ -0,0 +1,66 @@
+import logging
+import threading
+import time
+import uuid
+from contextlib import ExitStack
+from datetime import timedelta
+
+import jwt
+from fastapi import FastAPI
+from sqlalchemy import text
+
+from app.core import security
+from app.core.config import settings
+from app.core.db import get_engine
+from app.core.templates import load_email_templates
+from app.models import ItemPublic, ItemsPublic, UserPublic, UsersPublic
+
+logger = logging.getLogger(__name__)
+
+# Set once the worker is warmed up, cleared when it starts shutting down
+ready = threading.Event()
+
+
+def warm_up_pool(connections: int) -> None:
+    """
+    Open connections at the same time so they are all kept in the pool, instead
+    of each one being established by a request.
+    """
+    engine = get_engine()
+    connections = min(connections, engine.pool.size())  # type: ignore[attr-defined]
+    with ExitStack() as stack:
+        for _ in range(connections):
+            connection = stack.enter_context(engine.connect())
+            connection.execute(text("SELECT 1"))
+
+
+def warm_up_serializers() -> None:
+    user = UserPublic(id=uuid.uuid4(), email="warm-up@example.com", item_count=0)
+    item = ItemPublic(id=uuid.uuid4(), owner_id=user.id, title="Warm-up")
+    for page in (
+        UsersPublic(data=[user], count=1),
+        ItemsPublic(data=[item], count=1),
+    ):
+        type(page).model_validate(page.model_dump()).model_dump_json()
+
+
+def warm_up_security() -> None:
+    # Loads and self-tests the bcrypt backend, done on first use otherwise
+    security.pwd_context.handler().get_backend()
+    token = security.create_access_token("warm-up", timedelta(minutes=1))
+    jwt.decode(token, settings.SECRET_KEY, algorithms=[security.ALGORITHM])
+
+
+def warm_up(app: FastAPI) -> None:
+    """
+    Do the work otherwise paid by the first requests of a new worker, then mark
+    it ready.
+    """
+    start = time.perf_counter()
+    warm_up_pool(settings.POSTGRES_WARM_UP_CONNECTIONS)
+    warm_up_serializers()
+    warm_up_security()
+    load_email_templates()
+    app.openapi()
+    ready.set()
+    logger.info(f"warmed up in {time.perf_counter() - start:.2f}s")
@@ -1,10 +1,49 @@
 import uuid
+from collections.abc import Sequence
+from itertools import chain
 from typing import Any
 
-from sqlmodel import Session, select
+from sqlalchemy import (
+    ColumnElement,
+    Text,
+    UnaryExpression,
+    cast,
+    literal,
+    literal_column,
+    or_,
+)
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import Session, col, delete, func, select, update
 
-from app.core.security import get_password_hash, verify_password
-from app.models import Item, ItemCreate, User, UserCreate, UserUpdate
+from app.core.events import ItemAction, publish_item_event
+from app.core.jobs import enqueue_job
+from app.core.security import (
+    get_password_hash,
+    get_password_hashes,
+    verify_password,
+)
+from app.models import (
+    Item,
+    ItemCreate,
+    ItemPublic,
+    User,
+    UserCreate,
+    UserDeletion,
+    UserOrderBy,
+    UserUpdate,
+    normalize_email,
+)
+
+ITEM_COUNT_DELTAS: dict[ItemAction, int] = {"created": 1, "updated": 0, "deleted": -1}
+
+# Each order is backed by an index, full_name is not unique so id breaks ties to
+# keep pages stable
+USER_ORDER_BY: dict[UserOrderBy, tuple[UnaryExpression[Any], ...]] = {
+    "email": (col(User.email).asc(),),
+    "-email": (col(User.email).desc(),),
+    "full_name": (col(User.full_name).asc(), col(User.id).asc()),
+    "-full_name": (col(User.full_name).desc(), col(User.id).desc()),
+}
 
 
 def create_user(*, session: Session, user_create: UserCreate) -> User:
@@ -17,6 +56,99 @@ def create_user(*, session: Session, user_create: UserCreate) -> User:
     return db_obj
 
 
+def create_user_if_not_exists(
+    *, session: Session, user_create: UserCreate
+) -> User | None:
+    """
+    Create a user with a single INSERT ... ON CONFLICT DO NOTHING, returning None
+    if the email is already taken, even by a concurrent request.
+    """
+    db_obj = User.model_validate(
+        user_create, update={"hashed_password": get_password_hash(user_create.password)}
+    )
+    statement = (
+        insert(User)
+        .values(**db_obj.model_dump())
+        .on_conflict_do_nothing(index_elements=["email"])
+        .returning(User)
+    )
+    db_user = session.scalars(statement).first()
+    session.commit()
+    return db_user
+
+
+def create_users_bulk(
+    *, session: Session, users_create: Sequence[UserCreate], batch_size: int
+) -> tuple[list[User], list[str]]:
+    """
+    Create many users, hashing their passwords in parallel and inserting them in
+    committed batches.
+
+    Returns the created users and the emails that were not created because they
+    already exist or are repeated in `users_create`.
+    """
+    unique: dict[str, UserCreate] = {}
+    for user_create in users_create:
+        unique.setdefault(user_create.email, user_create)
+    existing = set(
+        session.exec(select(User.email).where(col(User.email).in_(unique))).all()
+    )
+    # Don't spend bcrypt rounds on users that can't be created
+    pending = [user for email, user in unique.items() if email not in existing]
+    hashed_passwords = get_password_hashes([user.password for user in pending])
+    rows = [
+        User.model_validate(
+            user_create, update={"hashed_password": hashed_password}
+        ).model_dump()
+        for user_create, hashed_password in zip(pending, hashed_passwords, strict=True)
+    ]
+    created: list[User] = []
+    for start in range(0, len(rows), batch_size):
+        statement = (
+            insert(User)
+            .values(rows[start : start + batch_size])
+            .on_conflict_do_nothing(index_elements=["email"])
+            .returning(User)
+        )
+        batch = session.scalars(statement).all()
+        # Keep the loaded state instead of reloading every user after the commit
+        for user in batch:
+            session.expunge(user)
+        created.extend(batch)
+        session.commit()
+    created_emails = {user.email for user in created}
+    conflicts = [
+        user.email
+        for user in users_create
+        if unique[user.email] is not user or user.email not in created_emails
+    ]
+    return created, conflicts
+
+
+def get_user_filters(
+    *,
+    is_active: bool | None = None,
+    is_superuser: bool | None = None,
+    search: str | None = None,
+) -> list[ColumnElement[bool]]:
+    filters: list[ColumnElement[bool]] = []
+    if is_active is not None:
+        filters.append(col(User.is_active) == is_active)
+    if is_superuser is not None:
+        filters.append(col(User.is_superuser) == is_superuser)
+    if search:
+        escaped = search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        # Backslash is the default LIKE escape character in PostgreSQL
+        pattern = f"%{escaped}%"
+        filters.append(
+            or_(
+                col(User.email).ilike(pattern),
+                col(User.full_name).ilike(pattern),
+            )
+        )
+    return filters
+
+
 def update_user(*, session: Session, db_user: User, user_in: UserUpdate) -> Any:
     user_data = user_in.model_dump(exclude_unset=True)
     extra_data = {}
@@ -32,7 +164,7 @@ def update_user(*, session: Session, db_user: User, user_in: UserUpdate) -> Any:
 
 
 def get_user_by_email(*, session: Session, email: str) -> User | None:
-    statement = select(User).where(User.email == email)
+    statement = select(User).where(User.email == normalize_email(email))
     session_user = session.exec(statement).first()
     return session_user
 
@@ -46,9 +178,159 @@ def authenticate(*, session: Session, email: str, password: str) -> User | None:
     return db_user
 
 
+def mark_user_deleted(*, session: Session, db_user: User) -> UserDeletion:
+    """
+    Deactivate the user and record a pending deletion, the user and their items
+    are purged by the job worker.
+    """
+    deletion = session.get(UserDeletion, db_user.id)
+    if deletion:
+        return deletion
+    deletion = UserDeletion(user_id=db_user.id)
+    db_user.is_active = False
+    session.add(db_user)
+    session.add(deletion)
+    enqueue_job(
+        session=session,
+        name="purge_deleted_user",
+        payload={"user_id": str(db_user.id)},
+    )
+    session.commit()
+    session.refresh(deletion)
+    return deletion
+
+
+def delete_user_items_batch(
+    *, session: Session, user_id: uuid.UUID, batch_size: int
+) -> int:
+    batch = select(Item.id).where(Item.owner_id == user_id).limit(batch_size)
+    statement = (
+        delete(Item)
+        .where(col(Item.owner_id) == user_id, col(Item.id).in_(batch))
+        .execution_options(synchronize_session=False)
+    )
+    result = session.exec(statement)  # type: ignore
+    deleted = int(result.rowcount)
+    count_statement = (
+        update(User)
+        .where(col(User.id) == user_id)
+        .values(item_count=col(User.item_count) - deleted)
+    )
+    session.exec(count_statement)  # type: ignore
+    # Added in the database, the purge may run again while its lease is renewed
+    progress_statement = (
+        update(UserDeletion)
+        .where(col(UserDeletion.user_id) == user_id)
+        .values(items_deleted=col(UserDeletion.items_deleted) + deleted)
+    )
+    session.exec(progress_statement)  # type: ignore
+    return deleted
+
+
 def create_item(*, session: Session, item_in: ItemCreate, owner_id: uuid.UUID) -> Item:
     db_item = Item.model_validate(item_in, update={"owner_id": owner_id})
     session.add(db_item)
+    record_item_change(session=session, item=db_item, action="created")
     session.commit()
     session.refresh(db_item)
     return db_item
+
+
+def get_item(
+    *, session: Session, item_id: uuid.UUID, owner_id: uuid.UUID | None = None
+) -> Item | None:
+    """
+    Get an item by id, passing its owner limits the lookup to a single partition.
+
+    The database doesn't enforce unique ids across owners, they are unique as
+    they are random UUIDs generated when items are created.
+    """
+    statement = select(Item).where(Item.id == item_id)
+    if owner_id is not None:
+        statement = statement.where(Item.owner_id == owner_id)
+    return session.exec(statement).first()
+
+
+def get_items_page_json(
+    *,
+    session: Session,
+    count: int,
+    skip: int,
+    limit: int,
+    owner_id: uuid.UUID | None = None,
+) -> bytes:
+    """
+    A page of items as ItemsPublic JSON, built by Postgres.
+
+    Rows are never loaded as Item instances, the JSON document is read as a
+    single value and can be sent as the response body.
+    """
+    statement = select(*(col(getattr(Item, name)) for name in ItemPublic.model_fields))
+    if owner_id is not None:
+        statement = statement.where(Item.owner_id == owner_id)
+    page = statement.offset(skip).limit(limit).subquery()
+    item = func.json_build_object(
+        *chain.from_iterable((name, page.c[name]) for name in ItemPublic.model_fields)
+    )
+    data = func.coalesce(func.json_agg(item), literal_column("'[]'::json"))
+    document = func.json_build_object("data", data, "count", literal(count))
+    body: str = session.exec(select(cast(document, Text)).select_from(page)).one()
+    return body.encode()
+
+
+def reconcile_item_counts(*, session: Session, batch_size: int) -> int:
+    """
+    Recount the items of every user and fix the counters that drifted, one
+    committed batch of users at a time. Returns the number of users fixed.
+
+    The users of a batch are locked before their items are counted, so item
+    writes committed before are counted and the ones still running update the
+    repaired counter after it.
+    """
+    fixed = 0
+    last_id: uuid.UUID | None = None
+    while True:
+        statement = select(User.id).order_by(col(User.id)).limit(batch_size)
+        if last_id is not None:
+            statement = statement.where(col(User.id) > last_id)
+        user_ids = session.exec(statement.with_for_update()).all()
+        if not user_ids:
+            break
+        item_count = (
+            select(func.count())
+            .select_from(Item)
+            .where(col(Item.owner_id) == User.id)
+            .scalar_subquery()
+        )
+        update_statement = (
+            update(User)
+            .where(col(User.id).in_(user_ids), col(User.item_count) != item_count)
+            .values(item_count=item_count)
+        )
+        result = session.exec(update_statement)  # type: ignore
+        fixed += int(result.rowcount)
+        session.commit()
+        last_id = user_ids[-1]
+    return fixed
+
+
+def record_item_change(*, session: Session, item: Item, action: ItemAction) -> None:
+    """
+    Record a change to an item in the current transaction.
+
+    Bumps the owner's items version, invalidating every cached item list of that
+    owner, keeps their item count up to date and notifies the item events
+    listeners once the transaction commits.
+    """
+    statement = (
+        update(User)
+        .where(col(User.id) == item.owner_id)
+        .values(
+            items_version=col(User.items_version) + 1,
+            item_count=col(User.item_count) + ITEM_COUNT_DELTAS[action],
+        )
+    )
+    session.exec(statement)  # type: ignore
+    publish_item_event(
+        session=session, action=action, item_id=item.id, owner_id=item.owner_id
+    )
@@ -1,23 +1,84 @@
-import sentry_sdk
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.routing import APIRoute
 from starlette.middleware.cors import CORSMiddleware
 
+from app.api.deps import is_superuser_token
 from app.api.main import api_router
+from app.core.compression import CompressionMiddleware
 from app.core.config import settings
+from app.core.db import get_engine
+from app.core.events import item_event_broker
+from app.core.formats import BinaryFormatMiddleware
+from app.core.mail import mail_dispatcher
+from app.core.metrics import (
+    MetricsMiddleware,
+    get_metrics,
+    mark_process_dead,
+    metrics_enabled,
+    metrics_endpoint,
+    update_resource_metrics_periodically,
+)
+from app.core.profiling import ProfilingMiddleware
+from app.core.queries import QueryCountMiddleware
+from app.core.responses import PydanticJSONResponse
+from app.core.timing import ServerTimingMiddleware
+from app.core.tracing import TracingMiddleware, shutdown_tracing
+from app.core.warmup import ready, warm_up
 
 
 def custom_generate_unique_id(route: APIRoute) -> str:
     return f"{route.tags[0]}-{route.name}"
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    await run_in_threadpool(warm_up, app)
+    metrics_task = None
+    if get_metrics() is not None:
+        metrics_task = asyncio.create_task(
+            update_resource_metrics_periodically(
+                settings.METRICS_UPDATE_INTERVAL_SECONDS
+            )
+        )
+    yield
+    ready.clear()
+    if metrics_task is not None:
+        metrics_task.cancel()
+        mark_process_dead()
+    await item_event_broker.close()
+    await run_in_threadpool(mail_dispatcher.close)
+    get_engine().dispose()
+    shutdown_tracing()
+
+
 if settings.SENTRY_DSN and settings.ENVIRONMENT != "local":
+    # Only imported when used, it is slow to import
+    import sentry_sdk
+
     sentry_sdk.init(dsn=str(settings.SENTRY_DSN), enable_tracing=True)
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     generate_unique_id_function=custom_generate_unique_id,
+    default_response_class=PydanticJSONResponse,
+    lifespan=lifespan,
+)
+
+app.add_middleware(
+    BinaryFormatMiddleware,
+    path_prefix=settings.API_V1_STR,
+    exclude_paths={app.openapi_url},
+)
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+    levels=settings.COMPRESSION_LEVELS,
 )
 
 # Set all CORS enabled origins
@@ -30,4 +91,25 @@ if settings.all_cors_origins:
         allow_headers=["*"],
     )
 
+app.add_middleware(
+    QueryCountMiddleware, threshold=settings.REQUEST_STATEMENTS_THRESHOLD
+)
+app.add_middleware(MetricsMiddleware, fastapi_app=app)
+app.add_middleware(TracingMiddleware)
+if settings.PROFILING_ENABLED:
+    app.add_middleware(
+        ProfilingMiddleware,
+        authorize=is_superuser_token,
+        limit=settings.PROFILING_RATE_LIMIT,
+        period=settings.PROFILING_RATE_PERIOD_SECONDS,
+    )
+
+# Outermost, to time the other middlewares too
+app.add_middleware(
+    ServerTimingMiddleware, sample_rate=settings.SERVER_TIMING_SAMPLE_RATE
+)
+
 app.include_router(api_router, prefix=settings.API_V1_STR)
+
+if metrics_enabled():
+    app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
@@ -1,12 +1,36 @@
 import uuid
-
-from pydantic import EmailStr
+from datetime import datetime, timezone
+from typing import Annotated, Any, Literal
+
+from pydantic import AfterValidator, EmailStr
+from sqlalchemy import (
+    CheckConstraint,
+    Column,
+    DateTime,
+    Index,
+    PrimaryKeyConstraint,
+    Sequence,
+    event,
+    text,
+)
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlmodel import Field, Relationship, SQLModel
 
 
+def normalize_email(email: str) -> str:
+    return email.strip().lower()
+
+
+# Emails are stored lowercased, so the unique index on email is case-insensitive
+NormalizedEmailStr = Annotated[EmailStr, AfterValidator(normalize_email)]
+
+# Number of hash partitions of the item table, changing it requires a migration
+ITEM_PARTITIONS = 16
+
+
 # Shared properties
 class UserBase(SQLModel):
-    email: EmailStr = Field(unique=True, index=True, max_length=255)
+    email: NormalizedEmailStr = Field(unique=True, index=True, max_length=255)
     is_active: bool = True
     is_superuser: bool = False
     full_name: str | None = Field(default=None, max_length=255)
@@ -18,20 +42,24 @@ class UserCreate(UserBase):
 
 
 class UserRegister(SQLModel):
-    email: EmailStr = Field(max_length=255)
+    email: NormalizedEmailStr = Field(max_length=255)
     password: str = Field(min_length=8, max_length=40)
     full_name: str | None = Field(default=None, max_length=255)
 
 
+class UsersBulkCreate(SQLModel):
+    data: list[UserCreate] = Field(max_length=10_000)
+
+
 # Properties to receive via API on update, all are optional
 class UserUpdate(UserBase):
-    email: EmailStr | None = Field(default=None, max_length=255)  # type: ignore
+    email: NormalizedEmailStr | None = Field(default=None, max_length=255)  # type: ignore
     password: str | None = Field(default=None, min_length=8, max_length=40)
 
 
 class UserUpdateMe(SQLModel):
     full_name: str | None = Field(default=None, max_length=255)
-    email: EmailStr | None = Field(default=None, max_length=255)
+    email: NormalizedEmailStr | None = Field(default=None, max_length=255)
 
 
 class UpdatePassword(SQLModel):
@@ -41,14 +69,54 @@ class UpdatePassword(SQLModel):
 
 # Database model, database table inferred from class name
 class User(UserBase, table=True):
+    __table_args__ = (
+        CheckConstraint("email = lower(email)", name="ck_user_email_lower"),
+        # Substring search in the admin user list (ILIKE '%...%')
+        Index(
+            "ix_user_email_trgm",
+            "email",
+            postgresql_using="gin",
+            postgresql_ops={"email": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_user_full_name_trgm",
+            "full_name",
+            postgresql_using="gin",
+            postgresql_ops={"full_name": "gin_trgm_ops"},
+        ),
+        # Filtered and sorted pages of the admin user list
+        Index("ix_user_full_name_id", "full_name", "id"),
+        Index("ix_user_is_active_email", "is_active", "email"),
+        Index("ix_user_is_active_full_name_id", "is_active", "full_name", "id"),
+        Index("ix_user_is_superuser_email", "is_superuser", "email"),
+        Index("ix_user_is_superuser_full_name_id", "is_superuser", "full_name", "id"),
+    )
+
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     hashed_password: str
-    items: list["Item"] = Relationship(back_populates="owner", cascade_delete=True)
+    # Bumped on every change to the user's items, used to key cached item lists
+    items_version: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    # Maintained with every item write, see crud.reconcile_item_counts for repairs
+    item_count: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    # Items are deleted by the database (ON DELETE CASCADE), without loading them
+    items: list["Item"] = Relationship(
+        back_populates="owner", cascade_delete=True, passive_deletes=True
+    )
+
+
+@event.listens_for(User.__table__, "before_create")  # type: ignore[attr-defined]
+def create_user_extensions(target: Any, connection: Any, **kw: Any) -> None:  # noqa: ARG001
+    connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+
+
+# Sort keys accepted by the admin user list, a leading "-" sorts descending
+UserOrderBy = Literal["email", "-email", "full_name", "-full_name"]
 
 
 # Properties to return via API, id is always required
 class UserPublic(UserBase):
     id: uuid.UUID
+    item_count: int
 
 
 class UsersPublic(SQLModel):
@@ -56,6 +124,110 @@ class UsersPublic(SQLModel):
     count: int
 
 
+class UsersBulkCreated(SQLModel):
+    data: list[UserPublic]
+    count: int
+    # Emails that already existed or were repeated in the request
+    conflicts: list[str]
+
+
+# Shared properties
+class UserDeletionBase(SQLModel):
+    # "pending", "running" or "done"
+    status: str = Field(default="pending", max_length=16)
+    items_deleted: int = 0
+    created_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        sa_type=DateTime(timezone=True),  # type: ignore
+    )
+    finished_at: datetime | None = Field(
+        default=None,
+        sa_type=DateTime(timezone=True),  # type: ignore
+    )
+
+
+# Progress of the background purge of a deleted user, kept after the user is gone
+class UserDeletion(UserDeletionBase, table=True):
+    user_id: uuid.UUID = Field(primary_key=True)
+
+
+# Properties to return via API
+class UserDeletionPublic(UserDeletionBase):
+    user_id: uuid.UUID
+
+
+# Deferred work run by the job worker, see app.core.jobs
+class Job(SQLModel, table=True):
+    __table_args__ = (
+        # Jobs that can be claimed, in claim order
+        Index(
+            "ix_job_claim",
+            text("priority DESC"),
+            "run_at",
+            postgresql_where=text("status IN ('pending', 'running')"),
+        ),
+    )
+
+    id: int | None = Field(default=None, primary_key=True)
+    name: str = Field(max_length=255)
+    payload: dict[str, Any] = Field(
+        default_factory=dict, sa_column=Column(JSONB, nullable=False)
+    )
+    # Higher runs first
+    priority: int = 0
+    # "pending", "running", "done" or "dead" once out of attempts
+    status: str = Field(default="pending", max_length=16)
+    attempts: int = 0
+    max_attempts: int = 5
+    # When it can run, for a running job when its lease expires
+    run_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        sa_type=DateTime(timezone=True),  # type: ignore
+    )
+    last_error: str | None = None
+    created_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        sa_type=DateTime(timezone=True),  # type: ignore
+    )
+    finished_at: datetime | None = Field(
+        default=None,
+        sa_type=DateTime(timezone=True),  # type: ignore
+    )
+
+
+# Properties to receive on broadcast creation
+class BroadcastCreate(SQLModel):
+    subject: str = Field(min_length=1, max_length=255)
+    message: str = Field(min_length=1, max_length=10_000)
+
+
+# Database model, sent to all active users by the job worker
+class Broadcast(BroadcastCreate, table=True):
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    # "pending", "running" or "done"
+    status: str = Field(default="pending", max_length=16)
+    recipients_processed: int = 0
+    # Recipients are processed in id order, the broadcast resumes after this one
+    last_user_id: uuid.UUID | None = None
+    created_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        sa_type=DateTime(timezone=True),  # type: ignore
+    )
+    finished_at: datetime | None = Field(
+        default=None,
+        sa_type=DateTime(timezone=True),  # type: ignore
+    )
+
+
+# Properties to return via API
+class BroadcastPublic(BroadcastCreate):
+    id: uuid.UUID
+    status: str
+    recipients_processed: int
+    created_at: datetime
+    finished_at: datetime | None
+
+
 # Shared properties
 class ItemBase(SQLModel):
     title: str = Field(min_length=1, max_length=255)
@@ -73,14 +245,40 @@ class ItemUpdate(ItemBase):
 
 
 # Database model, database table inferred from class name
+# Hash partitioned by owner, so queries filtering on owner_id touch one partition.
+# Postgres only enforces uniqueness within a partition, so the primary key has to
+# include owner_id and id alone is no longer unique in the database. Ids are
+# random UUIDs generated here, never taken from clients, so they stay unique in
+# practice and items are still looked up by id alone.
 class Item(ItemBase, table=True):
-    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    __table_args__ = (
+        PrimaryKeyConstraint("owner_id", "id"),
+        {"postgresql_partition_by": "HASH (owner_id)"},
+    )
+
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True, index=True)
     owner_id: uuid.UUID = Field(
-        foreign_key="user.id", nullable=False, ondelete="CASCADE"
+        foreign_key="user.id", primary_key=True, nullable=False, ondelete="CASCADE"
     )
     owner: User | None = Relationship(back_populates="items")
 
 
+@event.listens_for(Item.__table__, "after_create")  # type: ignore[attr-defined]
+def create_item_partitions(target: Any, connection: Any, **kw: Any) -> None:  # noqa: ARG001
+    for remainder in range(ITEM_PARTITIONS):
+        connection.execute(
+            text(
+                f"CREATE TABLE item_p{remainder} PARTITION OF item "
+                f"FOR VALUES WITH (MODULUS {ITEM_PARTITIONS}, REMAINDER {remainder})"
+            )
+        )
+
+
+# Ids of the item change events sent through NOTIFY, see app.core.events. Part
+# of the metadata so create_all builds it too
+item_event_id_seq = Sequence("item_event_id_seq", metadata=SQLModel.metadata)
+
+
 # Properties to return via API, id is always required
 class ItemPublic(ItemBase):
     id: uuid.UUID
@@ -111,3 +309,53 @@ class TokenPayload(SQLModel):
 class NewPassword(SQLModel):
     token: str
     new_password: str = Field(min_length=8, max_length=40)
+
+
+# Memory diagnostics of the worker process handling the request
+class MemoryStatus(SQLModel):
+    pid: int
+    tracing: bool
+    traced_size: int
+    traced_peak_size: int
+    tracemalloc_size: int
+    # Resident memory now and at its peak, the current one isn't known everywhere
+    rss: int | None
+    max_rss: int
+    has_snapshot: bool
+
+
+class AllocationSite(SQLModel):
+    traceback: list[str]
+    size: int
+    count: int
+    size_diff: int | None = None
+    count_diff: int | None = None
+
+
+class AllocationSites(SQLModel):
+    pid: int
+    data: list[AllocationSite]
+
+
+class ObjectCount(SQLModel):
+    type: str
+    count: int
+
+
+class ObjectCounts(SQLModel):
+    pid: int
+    data: list[ObjectCount]
+
+
+class GCGeneration(SQLModel):
+    collections: int
+    collected: int
+    uncollectable: int
+    count: int
+    threshold: int
+
+
+class GCStats(SQLModel):
+    pid: int
+    generations: list[GCGeneration]
+    garbage: int
@@ -0,0 +1,76 @@
+import logging
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any
+
+from sqlalchemy import text
+from sqlmodel import Session
+
+from app import crud
+from app.core.config import settings
+from app.core.db import get_engine
+from app.core.jobs import job_handler, renew_job_lease
+from app.models import User, UserDeletion
+
+logger = logging.getLogger(__name__)
+
+
+def replication_lag_seconds(session: Session) -> float:
+    statement = text(
+        "SELECT COALESCE(EXTRACT(EPOCH FROM max(replay_lag)), 0) "
+        "FROM pg_stat_replication"
+    )
+    return float(session.connection().execute(statement).scalar_one())
+
+
+def throttle(session: Session) -> None:
+    time.sleep(settings.USER_PURGE_BATCH_DELAY_SECONDS)
+    while (lag := replication_lag_seconds(session)) > (
+        settings.USER_PURGE_MAX_REPLICATION_LAG_SECONDS
+    ):
+        logger.info(f"replication lag is {lag:.1f}s, pausing user purge")
+        renew_job_lease(session=session)
+        time.sleep(max(1.0, settings.USER_PURGE_BATCH_DELAY_SECONDS))
+
+
+def purge_deleted_user(user_id: uuid.UUID) -> None:
+    """
+    Delete the items of a user marked as deleted, in small committed batches,
+    then the user itself.
+
+    Each batch is its own transaction, so locks are short lived and the WAL is
+    produced at a steady rate, throttled further while replicas are lagging. The
+    job lease is renewed between batches.
+    """
+    batch_size = settings.USER_PURGE_BATCH_SIZE
+    with Session(get_engine()) as session:
+        deletion = session.get(UserDeletion, user_id)
+        if not deletion or deletion.status == "done":
+            return
+        deletion.status = "running"
+        session.add(deletion)
+        session.commit()
+        while True:
+            deleted = crud.delete_user_items_batch(
+                session=session, user_id=user_id, batch_size=batch_size
+            )
+            session.commit()
+            if deleted < batch_size:
+                break
+            # Batches can run for longer than the lease
+            renew_job_lease(session=session)
+            throttle(session)
+        user = session.get(User, user_id)
+        if user:
+            session.delete(user)
+        deletion.status = "done"
+        deletion.finished_at = datetime.now(timezone.utc)
+        session.add(deletion)
+        session.commit()
+        logger.info(f"purged user {user_id}, {deletion.items_deleted} items deleted")
+
+
+@job_handler("purge_deleted_user")
+def purge_deleted_user_job(payload: dict[str, Any]) -> None:
+    purge_deleted_user(uuid.UUID(payload["user_id"]))
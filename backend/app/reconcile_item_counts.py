@@ -0,0 +1,26 @@
+import logging
+
+from sqlmodel import Session
+
+from app import crud
+from app.core.db import get_engine
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+
+def reconcile() -> int:
+    with Session(get_engine()) as session:
+        return crud.reconcile_item_counts(session=session, batch_size=BATCH_SIZE)
+
+
+def main() -> None:
+    logger.info("Reconciling user item counts")
+    fixed = reconcile()
+    logger.info(f"Item counts reconciled, {fixed} users fixed")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,21 @@
 import logging
+from collections.abc import Sequence
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
-from pathlib import Path
 from typing import Any
 
-import emails  # type: ignore
 import jwt
-from jinja2 import Template
 from jwt.exceptions import InvalidTokenError
+from sqlmodel import Session, col, update
 
 from app.core import security
 from app.core.config import settings
+from app.core.db import get_engine
+from app.core.jobs import current_job, enqueue_job, job_handler
+from app.core.mail import OutgoingEmail, mail_dispatcher
+from app.core.templates import render_email_template
+from app.models import Job, UserCreate
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
@@ -22,37 +25,19 @@ class EmailData:
     subject: str
 
 
-def render_email_template(*, template_name: str, context: dict[str, Any]) -> str:
-    template_str = (
-        Path(__file__).parent / "email-templates" / "build" / template_name
-    ).read_text()
-    html_content = Template(template_str).render(context)
-    return html_content
-
-
 def send_email(
     *,
     email_to: str,
     subject: str = "",
     html_content: str = "",
 ) -> None:
+    """
+    Queue an email, it is sent in the background by the mail dispatcher.
+    """
     assert settings.emails_enabled, "no provided configuration for email variables"
-    message = emails.Message(
-        subject=subject,
-        html=html_content,
-        mail_from=(settings.EMAILS_FROM_NAME, settings.EMAILS_FROM_EMAIL),
+    mail_dispatcher.enqueue(
+        OutgoingEmail(email_to=email_to, subject=subject, html_content=html_content)
     )
-    smtp_options = {"host": settings.SMTP_HOST, "port": settings.SMTP_PORT}
-    if settings.SMTP_TLS:
-        smtp_options["tls"] = True
-    elif settings.SMTP_SSL:
-        smtp_options["ssl"] = True
-    if settings.SMTP_USER:
-        smtp_options["user"] = settings.SMTP_USER
-    if settings.SMTP_PASSWORD:
-        smtp_options["password"] = settings.SMTP_PASSWORD
-    response = message.send(to=email_to, smtp=smtp_options)
-    logger.info(f"send email result: {response}")
 
 
 def generate_test_email(email_to: str) -> EmailData:
@@ -100,6 +85,50 @@ def generate_new_account_email(
     return EmailData(html_content=html_content, subject=subject)
 
 
+def enqueue_new_account_emails(
+    *, session: Session, users_in: Sequence[UserCreate]
+) -> None:
+    """
+    Add a job sending the new account emails of `users_in` to the current
+    transaction, so they are still sent if the server restarts meanwhile.
+    """
+    enqueue_job(
+        session=session,
+        name="send_new_account_emails",
+        payload={
+            "users": [
+                {"email": user_in.email, "password": user_in.password}
+                for user_in in users_in
+            ]
+        },
+    )
+
+
+@job_handler("send_new_account_emails")
+def send_new_account_emails_job(payload: dict[str, Any]) -> None:
+    """
+    The job only finishes once the emails were sent or given up, a job
+    interrupted before is run again and may send some of them twice. The
+    passwords are then removed from the job.
+    """
+    for user in payload["users"]:
+        email_data = generate_new_account_email(
+            email_to=user["email"], username=user["email"], password=user["password"]
+        )
+        send_email(
+            email_to=user["email"],
+            subject=email_data.subject,
+            html_content=email_data.html_content,
+        )
+    mail_dispatcher.flush()
+    job = current_job.get()
+    if job is not None:
+        with Session(get_engine()) as session:
+            statement = update(Job).where(col(Job.id) == job.id).values(payload={})
+            session.exec(statement)  # type: ignore
+            session.commit()
+
+
 def generate_password_reset_token(email: str) -> str:
     delta = timedelta(hours=settings.EMAIL_RESET_TOKEN_EXPIRE_HOURS)
     now = datetime.now(timezone.utc)
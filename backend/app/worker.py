@@ -0,0 +1,35 @@
+import logging
+import signal
+import threading
+
+from sqlmodel import Session
+
+# Register the job handlers
+import app.broadcast  # noqa: F401
+import app.purge  # noqa: F401
+import app.utils  # noqa: F401
+from app.core.config import settings
+from app.core.db import get_engine
+from app.core.jobs import work
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    stop = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        # Finish the running job before stopping
+        signal.signal(signum, lambda *_: stop.set())
+    logger.info("Starting job worker")
+    with Session(get_engine()) as session:
+        work(
+            session=session,
+            stop=stop,
+            poll_interval=settings.JOBS_POLL_INTERVAL_SECONDS,
+        )
+    logger.info("Job worker stopped")
+
+
+if __name__ == "__main__":
+    main()
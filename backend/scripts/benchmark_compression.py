@@ -0,0 +1,101 @@
+"""
+Compare the CPU cost of compressing representative list responses against the
+bytes saved, for each encoding and level.
+
+    python scripts/benchmark_compression.py --rows 100 1000
+"""
+
+import argparse
+import logging
+import random
+import string
+import time
+import uuid
+
+from app.core.compression import available_encodings, get_compressor
+from app.models import ItemPublic, ItemsPublic, UserPublic, UsersPublic
+
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+logger = logging.getLogger(__name__)
+
+LEVELS = {
+    "gzip": [1, 4, 6, 9],
+    "br": [1, 4, 5, 8, 11],
+    "zstd": [1, 3, 6, 10, 19],
+}
+WORDS = [
+    "".join(random.choices(string.ascii_lowercase, k=random.randint(3, 9)))
+    for _ in range(500)
+]
+
+
+def sentence(words: int) -> str:
+    return " ".join(random.choices(WORDS, k=words)).capitalize()
+
+
+def items_page(rows: int) -> bytes:
+    owner_id = uuid.uuid4()
+    data = [
+        ItemPublic(
+            id=uuid.uuid4(),
+            owner_id=owner_id,
+            title=sentence(random.randint(2, 6)),
+            description=sentence(random.randint(5, 25)),
+        )
+        for _ in range(rows)
+    ]
+    return ItemsPublic(data=data, count=rows * 10).model_dump_json().encode()
+
+
+def users_page(rows: int) -> bytes:
+    data = [
+        UserPublic(
+            id=uuid.uuid4(),
+            email=f"{random.choice(WORDS)}.{random.choice(WORDS)}@example.com",
+            full_name=sentence(2).title(),
+            item_count=random.randint(0, 500),
+        )
+        for _ in range(rows)
+    ]
+    return UsersPublic(data=data, count=rows * 10).model_dump_json().encode()
+
+
+def compress(encoding: str, level: int, body: bytes) -> bytes:
+    compressor = get_compressor(encoding, level)
+    return compressor.compress(body) + compressor.finish()
+
+
+def report(name: str, body: bytes, repeat: int) -> None:
+    logger.info(f"{name}: {len(body)} bytes")
+    for encoding, levels in LEVELS.items():
+        if encoding not in available_encodings():
+            logger.info(f"  {encoding} not installed")
+            continue
+        for level in levels:
+            start = time.perf_counter()
+            for _ in range(repeat):
+                compressed = compress(encoding, level, body)
+            elapsed = (time.perf_counter() - start) / repeat
+            saved = len(body) - len(compressed)
+            logger.info(
+                f"  {encoding:<4} {level:>2}  {len(compressed):>8} bytes  "
+                f"ratio {len(body) / len(compressed):5.2f}  "
+                f"{elapsed * 1000:7.3f} ms  "
+                f"{saved / 1024 / elapsed / 1000:8.1f} KiB saved per CPU ms"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    random.seed(0)
+    for rows in args.rows:
+        report(f"ItemsPublic, {rows} rows", items_page(rows), args.repeat)
+        report(f"UsersPublic, {rows} rows", users_page(rows), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Compare the time to turn an ItemsPublic page into a JSON response body with
+FastAPI's default validation and encoding against the faster response classes.
+
+    python scripts/benchmark_json_responses.py --rows 10 100 1000
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import logging
+import statistics
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from app.core.responses import PydanticJSONResponse, TrustedResponse
+from app.models import ItemPublic, ItemsPublic
+
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+logger = logging.getLogger(__name__)
+
+# The field FastAPI builds from `response_model=ItemsPublic`
+response_field = create_model_field(
+    name="Response_items-read_items", type_=ItemsPublic, mode="serialization"
+)
+
+
+def build_page(rows: int) -> ItemsPublic:
+    owner_id = uuid.uuid4()
+    data = [
+        ItemPublic(
+            id=uuid.uuid4(),
+            owner_id=owner_id,
+            title=f"Item {number}",
+            description=f"Description of item {number} " * 3,
+        )
+        for number in range(rows)
+    ]
+    return ItemsPublic(data=data, count=rows * 10)
+
+
+def validated(
+    response_class: type[JSONResponse],
+) -> Callable[[ItemsPublic], Awaitable[bytes]]:
+    async def render(page: ItemsPublic) -> bytes:
+        content = await serialize_response(field=response_field, response_content=page)
+        return bytes(response_class(content).body)
+
+    return render
+
+
+async def trusted(page: ItemsPublic) -> bytes:
+    return bytes(TrustedResponse(page).body)
+
+
+async def measure(
+    render: Callable[[ItemsPublic], Awaitable[bytes]], page: ItemsPublic, repeat: int
+) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await render(page)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+async def run(rows: list[int], repeat: int) -> None:
+    renderers = {
+        "validate + json module (before)": validated(JSONResponse),
+        "validate + pydantic-core": validated(PydanticJSONResponse),
+        "trusted": trusted,
+    }
+    if importlib.util.find_spec("orjson"):
+        renderers["validate + orjson"] = validated(ORJSONResponse)
+    for count in rows:
+        page = build_page(count)
+        timings = {
+            name: await measure(render, page, repeat)
+            for name, render in renderers.items()
+        }
+        baseline = timings["validate + json module (before)"]
+        logger.info(f"ItemsPublic, {count} rows")
+        for name, median in timings.items():
+            logger.info(f"  {name:<32} {median:8.3f} ms   {baseline / median:5.1f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(run(args.rows, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
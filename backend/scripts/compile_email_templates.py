@@ -0,0 +1,31 @@
+"""
+Precompile the email templates to Python modules, the application then loads
+them without parsing or compiling. Run it again whenever the templates change.
+
+    python scripts/compile_email_templates.py
+"""
+
+import logging
+import shutil
+
+from jinja2 import Environment, FileSystemLoader
+
+from app.core.templates import COMPILED_EMAIL_TEMPLATES_DIR, EMAIL_TEMPLATES_DIR
+
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    shutil.rmtree(COMPILED_EMAIL_TEMPLATES_DIR, ignore_errors=True)
+    environment = Environment(loader=FileSystemLoader(EMAIL_TEMPLATES_DIR))
+    environment.compile_templates(
+        COMPILED_EMAIL_TEMPLATES_DIR,
+        zip=None,
+        log_function=logger.info,
+        ignore_errors=False,
+    )
+
+
+if __name__ == "__main__":
+    main()
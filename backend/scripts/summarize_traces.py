@@ -0,0 +1,92 @@
+"""
+Summarize the traces written with TRACING_EXPORTER=file: the time spent in each
+kind of span, and the slowest traces as trees of spans.
+
+    python scripts/summarize_traces.py traces --slowest 5
+"""
+
+import argparse
+import json
+import logging
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+logger = logging.getLogger(__name__)
+
+
+def parse_time(value: str) -> datetime:
+    # fromisoformat only accepts a Z suffix from Python 3.11
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def duration_ms(span: dict[str, Any]) -> float:
+    elapsed = parse_time(span["end_time"]) - parse_time(span["start_time"])
+    return elapsed.total_seconds() * 1000
+
+
+def read_spans(directory: Path) -> list[dict[str, Any]]:
+    spans: list[dict[str, Any]] = []
+    for path in sorted(directory.glob("traces-*.jsonl")):
+        with path.open() as f:
+            spans.extend(json.loads(line) for line in f if line.strip())
+    return spans
+
+
+def report_span_names(spans: list[dict[str, Any]]) -> None:
+    durations: dict[str, list[float]] = defaultdict(list)
+    for span in spans:
+        durations[span["name"]].append(duration_ms(span))
+    logger.info(f"{'span':<50} {'count':>7} {'total ms':>10} {'mean':>8} {'max':>8}")
+    for name, values in sorted(durations.items(), key=lambda item: -sum(item[1])):
+        logger.info(
+            f"{name[:50]:<50} {len(values):>7} {sum(values):>10.1f} "
+            f"{sum(values) / len(values):>8.1f} {max(values):>8.1f}"
+        )
+
+
+def report_tree(
+    span: dict[str, Any], children: dict[str | None, list[dict[str, Any]]], depth: int
+) -> None:
+    error = " ERROR" if span["status"]["status_code"] == "ERROR" else ""
+    logger.info(f"{'  ' * depth}{duration_ms(span):8.1f} ms  {span['name']}{error}")
+    for child in sorted(children[span["context"]["span_id"]], key=start_time):
+        report_tree(child, children, depth + 1)
+
+
+def start_time(span: dict[str, Any]) -> datetime:
+    return parse_time(span["start_time"])
+
+
+def report_slowest(spans: list[dict[str, Any]], count: int) -> None:
+    span_ids = {span["context"]["span_id"] for span in spans}
+    children: dict[str | None, list[dict[str, Any]]] = defaultdict(list)
+    roots = []
+    for span in spans:
+        if span["parent_id"] in span_ids:
+            children[span["parent_id"]].append(span)
+        else:
+            roots.append(span)
+    for root in sorted(roots, key=duration_ms, reverse=True)[:count]:
+        logger.info("")
+        logger.info(f"trace {root['context']['trace_id']}")
+        report_tree(root, children, 1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("directory", type=Path, nargs="?", default=Path("traces"))
+    parser.add_argument("--slowest", type=int, default=5)
+    args = parser.parse_args()
+
+    spans = read_spans(args.directory)
+    logger.info(f"{len(spans)} spans")
+    if spans:
+        report_span_names(spans)
+        report_slowest(spans, args.slowest)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import uuid
+from collections.abc import Generator
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, col, delete, func, select
+
+from app.broadcast import broadcast_dispatcher
+from app.core.config import settings
+from app.core.jobs import run_pending_jobs
+from app.models import Broadcast, Job, User
+from tests.utils.smtp import SMTPServer, smtp_server
+from tests.utils.user import create_random_user
+
+
+@pytest.fixture
+def server(db: Session) -> Generator[SMTPServer, None, None]:
+    db.exec(delete(Job))  # type: ignore
+    db.commit()
+    with (
+        smtp_server() as server,
+        patch("app.core.config.settings.SMTP_HOST", "127.0.0.1"),
+        patch("app.core.config.settings.SMTP_PORT", server.port),
+        patch("app.core.config.settings.SMTP_TLS", False),
+        patch("app.core.config.settings.SMTP_USER", None),
+        patch("app.core.config.settings.EMAILS_FROM_EMAIL", "admin@example.com"),
+        patch.object(broadcast_dispatcher, "rate_limit", None),
+    ):
+        yield server
+        # Don't keep connections to this server open for the next test
+        broadcast_dispatcher.close()
+
+
+def active_user_emails(db: Session) -> list[str]:
+    statement = select(User.email).where(col(User.is_active)).order_by(col(User.id))
+    return list(db.exec(statement).all())
+
+
+def test_create_broadcast(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    db: Session,
+    server: SMTPServer,
+) -> None:
+    user = create_random_user(db)
+    data = {"subject": "Maintenance", "message": "Down <b>tonight</b>\nSorry"}
+    with patch("app.core.config.settings.BROADCAST_BATCH_SIZE", 2):
+        r = client.post(
+            f"{settings.API_V1_STR}/broadcasts/",
+            headers=superuser_token_headers,
+            json=data,
+        )
+        assert r.status_code == 202
+        broadcast_id = r.json()["id"]
+        assert r.json()["status"] == "pending"
+        run_pending_jobs(session=db)
+
+    r = client.get(
+        f"{settings.API_V1_STR}/broadcasts/{broadcast_id}",
+        headers=superuser_token_headers,
+    )
+    assert r.status_code == 200
+    emails = active_user_emails(db)
+    assert r.json()["status"] == "done"
+    assert r.json()["recipients_processed"] == len(emails)
+    assert sorted(message["To"] for message in server.messages) == sorted(emails)
+    message = next(m for m in server.messages if m["To"] == user.email)
+    assert message["Subject"] == "Maintenance"
+    payload = message.get_payload(decode=True)
+    assert isinstance(payload, bytes)
+    html = payload.decode()
+    assert "Down &lt;b&gt;tonight&lt;/b&gt;" in html
+    assert f"Hello {user.email}" in html
+    assert f"because {user.email} has an account" in html
+
+
+def test_broadcast_resumes_after_checkpoint(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    db: Session,
+    server: SMTPServer,
+) -> None:
+    for _ in range(3):
+        create_random_user(db)
+    emails = active_user_emails(db)
+    user_ids = db.exec(
+        select(User.id).where(col(User.is_active)).order_by(col(User.id))
+    ).all()
+    # Stopped after the first recipients
+    broadcast = Broadcast(
+        subject="Resumed",
+        message="Hello",
+        status="running",
+        recipients_processed=2,
+        last_user_id=user_ids[1],
+    )
+    db.add(broadcast)
+    db.commit()
+
+    r = client.post(
+        f"{settings.API_V1_STR}/broadcasts/{broadcast.id}/resume",
+        headers=superuser_token_headers,
+    )
+    assert r.status_code == 202
+    # Its job isn't done yet, resuming again would send the emails twice
+    r = client.post(
+        f"{settings.API_V1_STR}/broadcasts/{broadcast.id}/resume",
+        headers=superuser_token_headers,
+    )
+    assert r.status_code == 409
+    assert r.json()["detail"] == "Broadcast is being sent"
+    run_pending_jobs(session=db)
+
+    assert sorted(message["To"] for message in server.messages) == sorted(emails[2:])
+    db.refresh(broadcast)
+    assert broadcast.status == "done"
+    assert broadcast.recipients_processed == len(emails)
+
+    r = client.post(
+        f"{settings.API_V1_STR}/broadcasts/{broadcast.id}/resume",
+        headers=superuser_token_headers,
+    )
+    assert r.status_code == 409
+
+
+def test_broadcast_continues_in_new_job(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    db: Session,
+    server: SMTPServer,
+) -> None:
+    with (
+        patch("app.core.config.settings.BROADCAST_BATCH_SIZE", 1),
+        patch("app.core.config.settings.BROADCAST_JOB_SECONDS", 0),
+    ):
+        r = client.post(
+            f"{settings.API_V1_STR}/broadcasts/",
+            headers=superuser_token_headers,
+            json={"subject": "Batched", "message": "Hello"},
+        )
+        assert r.status_code == 202
+        jobs = run_pending_jobs(session=db)
+
+    emails = active_user_emails(db)
+    # One job per batch, then one finding no recipients left
+    assert jobs == len(emails) + 1
+    assert sorted(message["To"] for message in server.messages) == sorted(emails)
+    count = db.exec(
+        select(func.count()).select_from(Job).where(Job.status != "done")
+    ).one()
+    assert count == 0
+
+
+def test_create_broadcast_by_normal_user(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    r = client.post(
+        f"{settings.API_V1_STR}/broadcasts/",
+        headers=normal_user_token_headers,
+        json={"subject": "Hi", "message": "Hello"},
+    )
+    assert r.status_code == 403
+
+
+def test_read_broadcast_not_found(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/broadcasts/{uuid.uuid4()}",
+        headers=superuser_token_headers,
+    )
+    assert r.status_code == 404
+    assert r.json() == {"detail": "Broadcast not found"}
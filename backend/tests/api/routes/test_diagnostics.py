@@ -0,0 +1,174 @@
+import os
+from collections.abc import Generator
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+
+
+@pytest.fixture(autouse=True)
+def profiles(tmp_path: Path) -> Generator[None, None, None]:
+    with patch("app.core.config.settings.PROFILING_DIRECTORY", str(tmp_path)):
+        yield
+
+
+def test_profile_request(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    login_data = {
+        "username": settings.FIRST_SUPERUSER,
+        "password": settings.FIRST_SUPERUSER_PASSWORD,
+    }
+    r = client.post(
+        f"{settings.API_V1_STR}/login/access-token",
+        data=login_data,
+        headers={**superuser_token_headers, "X-Profile": "1"},
+    )
+    assert r.status_code == 200
+    profile_id = r.headers["x-profile-id"]
+
+    r = client.get(
+        f"{settings.API_V1_STR}/diagnostics/profiles/{profile_id}",
+        headers=superuser_token_headers,
+    )
+    assert r.status_code == 200
+    assert "samples" in r.text
+    assert "login_access_token" in r.text
+
+    r = client.get(
+        f"{settings.API_V1_STR}/diagnostics/profiles/{profile_id}",
+        params={"format": "collapsed"},
+        headers=superuser_token_headers,
+    )
+    assert r.status_code == 200
+    assert ";verify_password (" in r.text
+
+
+def test_profile_request_normal_user(
+    client: TestClient, normal_user_token_headers: dict[str, str], tmp_path: Path
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/items/",
+        headers={**normal_user_token_headers, "X-Profile": "1"},
+    )
+    assert r.status_code == 200
+    assert "x-profile-id" not in r.headers
+    assert not list(tmp_path.iterdir())
+
+
+def test_profile_request_prunes_old_profiles(
+    client: TestClient, superuser_token_headers: dict[str, str], tmp_path: Path
+) -> None:
+    for age, name in enumerate(["newer", "older"], start=1):
+        old = tmp_path / f"{name}.collapsed"
+        old.write_text("")
+        os.utime(old, (0, 1000 - age))
+    with patch("app.core.config.settings.PROFILING_MAX_PROFILES", 2):
+        r = client.get(
+            f"{settings.API_V1_STR}/items/",
+            headers={**superuser_token_headers, "X-Profile": "1"},
+        )
+    assert r.status_code == 200
+    profile_id = r.headers["x-profile-id"]
+    assert sorted(path.name for path in tmp_path.iterdir()) == sorted(
+        [f"{profile_id}.collapsed", "newer.collapsed"]
+    )
+
+
+def test_read_profile_not_found(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/diagnostics/profiles/{'0' * 32}",
+        headers=superuser_token_headers,
+    )
+    assert r.status_code == 404
+
+
+def test_read_profile_normal_user(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/diagnostics/profiles/{'0' * 32}",
+        headers=normal_user_token_headers,
+    )
+    assert r.status_code == 403
+
+
+def test_memory_tracing(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    url = f"{settings.API_V1_STR}/diagnostics/memory"
+    r = client.post(
+        f"{url}/start", params={"frames": 5}, headers=superuser_token_headers
+    )
+    assert r.status_code == 200
+    status = r.json()
+    assert status["tracing"] and status["has_snapshot"]
+    assert status["pid"] == os.getpid()
+    assert status["rss"] > 0
+    try:
+        # The traces and snapshot are kept, whatever the frames asked for
+        r = client.post(
+            f"{url}/start", params={"frames": 10}, headers=superuser_token_headers
+        )
+        assert r.status_code == 409
+        assert r.json()["detail"] == "Memory tracing is already started, stop it first"
+
+        leak = [bytearray(10_000) for _ in range(100)]
+        r = client.get(
+            f"{url}/allocations",
+            params={"compare": True, "limit": 5},
+            headers=superuser_token_headers,
+        )
+        assert r.status_code == 200
+        (top, *_) = r.json()["data"]
+        assert top["size_diff"] >= 1_000_000
+        assert "test_diagnostics.py" in top["traceback"][0]
+
+        r = client.post(f"{url}/snapshot", headers=superuser_token_headers)
+        assert r.status_code == 200
+        r = client.get(
+            f"{url}/allocations",
+            params={"group_by": "traceback", "limit": 5},
+            headers=superuser_token_headers,
+        )
+        assert r.status_code == 200
+        assert len(r.json()["data"]) == 5
+        del leak
+    finally:
+        r = client.post(f"{url}/stop", headers=superuser_token_headers)
+    assert r.status_code == 200
+    assert not r.json()["tracing"]
+
+    r = client.get(f"{url}/allocations", headers=superuser_token_headers)
+    assert r.status_code == 400
+
+
+def test_read_object_counts_and_gc_stats(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    url = f"{settings.API_V1_STR}/diagnostics/memory"
+    r = client.get(
+        f"{url}/objects", params={"limit": 10}, headers=superuser_token_headers
+    )
+    assert r.status_code == 200
+    assert len(r.json()["data"]) == 10
+    assert "builtins.dict" in {count["type"] for count in r.json()["data"]}
+
+    r = client.get(f"{url}/gc", headers=superuser_token_headers)
+    assert r.status_code == 200
+    assert len(r.json()["generations"]) == 3
+
+
+def test_memory_normal_user(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    r = client.post(
+        f"{settings.API_V1_STR}/diagnostics/memory/start",
+        headers=normal_user_token_headers,
+    )
+    assert r.status_code == 403
@@ -1,10 +1,23 @@
+import asyncio
 import uuid
+from collections.abc import Awaitable, Callable
+from unittest.mock import patch
 
 from fastapi.testclient import TestClient
 from sqlmodel import Session
 
+from app import crud
 from app.core.config import settings
+from app.core.events import ItemEvent, item_event_broker
+from app.main import app
+from app.models import UserUpdate
 from tests.utils.item import create_random_item
+from tests.utils.queries import assert_max_statements
+from tests.utils.sse import EventStream
+from tests.utils.user import create_random_user, user_authentication_headers
+from tests.utils.utils import random_lower_string
+
+EVENTS_URL = f"{settings.API_V1_STR}/items/events"
 
 
 def test_create_item(
@@ -79,6 +92,55 @@ def test_read_items(
     assert len(content["data"]) >= 2
 
 
+def test_read_items_cached(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    client.get(f"{settings.API_V1_STR}/items/", headers=normal_user_token_headers)
+    with assert_max_statements(1) as statements:
+        response = client.get(
+            f"{settings.API_V1_STR}/items/", headers=normal_user_token_headers
+        )
+    assert response.status_code == 200
+    # Only the current user is loaded, for its items version
+    assert 'FROM "user"' in statements[0]
+
+
+def test_read_items_cache_invalidated_on_change(
+    client: TestClient, db: Session
+) -> None:
+    user = create_random_user(db)
+    password = random_lower_string()
+    user = crud.update_user(
+        session=db, db_user=user, user_in=UserUpdate(password=password)
+    )
+    headers = user_authentication_headers(
+        client=client, email=user.email, password=password
+    )
+    response = client.get(f"{settings.API_V1_STR}/items/", headers=headers)
+    assert response.json() == {"data": [], "count": 0}
+
+    response = client.post(
+        f"{settings.API_V1_STR}/items/", headers=headers, json={"title": "Foo"}
+    )
+    item_id = response.json()["id"]
+    response = client.get(f"{settings.API_V1_STR}/items/", headers=headers)
+    content = response.json()
+    assert content["count"] == 1
+    assert content["data"][0]["title"] == "Foo"
+    response = client.get(f"{settings.API_V1_STR}/users/me", headers=headers)
+    assert response.json()["item_count"] == 1
+
+    client.put(
+        f"{settings.API_V1_STR}/items/{item_id}", headers=headers, json={"title": "Bar"}
+    )
+    response = client.get(f"{settings.API_V1_STR}/items/", headers=headers)
+    assert response.json()["data"][0]["title"] == "Bar"
+
+    client.delete(f"{settings.API_V1_STR}/items/{item_id}", headers=headers)
+    response = client.get(f"{settings.API_V1_STR}/items/", headers=headers)
+    assert response.json() == {"data": [], "count": 0}
+
+
 def test_update_item(
     client: TestClient, superuser_token_headers: dict[str, str], db: Session
 ) -> None:
@@ -162,3 +224,143 @@ def test_delete_item_not_enough_permissions(
     assert response.status_code == 400
     content = response.json()
     assert content["detail"] == "Not enough permissions"
+
+
+def run_with_broker(test: Callable[[], Awaitable[None]]) -> None:
+    """
+    Run an async test, closing the item events broker in its event loop.
+    """
+
+    async def run() -> None:
+        try:
+            await test()
+        finally:
+            await item_event_broker.close()
+
+    asyncio.run(run())
+
+
+async def wait_listening() -> None:
+    async def poll() -> None:
+        while not item_event_broker.listening:
+            await asyncio.sleep(0.01)
+
+    await asyncio.wait_for(poll(), 5)
+
+
+def new_user_headers(client: TestClient, db: Session) -> dict[str, str]:
+    user = create_random_user(db)
+    password = random_lower_string()
+    crud.update_user(session=db, db_user=user, user_in=UserUpdate(password=password))
+    return user_authentication_headers(
+        client=client, email=user.email, password=password
+    )
+
+
+def test_item_events_of_own_items(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    other_headers = new_user_headers(client, db)
+    url = f"{settings.API_V1_STR}/items/"
+
+    async def test() -> None:
+        async with EventStream(app, EVENTS_URL, normal_user_token_headers) as stream:
+            assert stream.status == 200
+            await wait_listening()
+            r = await asyncio.to_thread(
+                client.post, url, headers=other_headers, json={"title": "Other"}
+            )
+            other_id = r.json()["id"]
+            r = await asyncio.to_thread(
+                client.post,
+                url,
+                headers=normal_user_token_headers,
+                json={"title": "Own"},
+            )
+            own_id = r.json()["id"]
+            await stream.read_until(own_id)
+        assert [event["data"]["item_id"] for event in stream.events()] == [own_id]
+        assert other_id not in stream.text
+
+    run_with_broker(test)
+
+
+def test_item_events_resume_from_last_event_id(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    headers = normal_user_token_headers
+
+    async def test() -> None:
+        async with EventStream(app, EVENTS_URL, headers) as stream:
+            await wait_listening()
+            r = await asyncio.to_thread(
+                client.post,
+                f"{settings.API_V1_STR}/items/",
+                headers=headers,
+                json={"title": "Foo"},
+            )
+            item_url = f"{settings.API_V1_STR}/items/{r.json()['id']}"
+            await asyncio.to_thread(
+                client.put, item_url, headers=headers, json={"title": "Bar"}
+            )
+            await asyncio.to_thread(client.delete, item_url, headers=headers)
+            await stream.read_until("event: deleted")
+        # Each change was notified once committed
+        events = stream.events()
+        assert [event["event"] for event in events] == ["created", "updated", "deleted"]
+        assert {event["data"]["item_id"] for event in events} == {r.json()["id"]}
+
+        last_event_id = str(events[0]["id"])
+        resumed_headers = {**headers, "Last-Event-ID": last_event_id}
+        async with EventStream(app, EVENTS_URL, resumed_headers) as resumed:
+            await resumed.read_until("event: deleted")
+        assert resumed.events() == events[1:]
+
+        # Too old to be replayed
+        async with EventStream(
+            app, EVENTS_URL, {**headers, "Last-Event-ID": "0"}
+        ) as reset:
+            await reset.read_until("event: reset")
+
+    run_with_broker(test)
+
+
+def test_item_events_heartbeat(normal_user_token_headers: dict[str, str]) -> None:
+    async def test() -> None:
+        with patch("app.core.config.settings.ITEM_EVENTS_HEARTBEAT_SECONDS", 0.01):
+            async with EventStream(
+                app, EVENTS_URL, normal_user_token_headers
+            ) as stream:
+                await stream.read_until(": ping")
+
+    run_with_broker(test)
+
+
+def test_item_events_slow_client_dropped(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    r = client.get(f"{settings.API_V1_STR}/users/me", headers=normal_user_token_headers)
+    owner_id = r.json()["id"]
+
+    async def test() -> None:
+        with patch.object(item_event_broker, "queue_size", 1):
+            async with EventStream(
+                app, EVENTS_URL, normal_user_token_headers
+            ) as stream:
+                stream.resumed.clear()
+                for id in range(3):
+                    event = ItemEvent(
+                        id=-1 - id,
+                        action="created",
+                        item_id=str(uuid.uuid4()),
+                        owner_id=owner_id,
+                    )
+                    item_event_broker.dispatch(event)
+                    await asyncio.sleep(0.01)
+                stream.resumed.set()
+                # The events queued are sent, then the stream ends so the client
+                # reconnects and resumes
+                await stream.wait_ended()
+        assert 0 < len(stream.events()) < 3
+
+    run_with_broker(test)
@@ -0,0 +1,40 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app.core.config import settings
+from tests.utils.item import create_random_item
+from tests.utils.queries import assert_max_statements
+
+# Statements executed by each endpoint, whatever the number of rows returned
+BUDGETS = {
+    "GET /items/": 3,
+    "GET /items/{item_id}": 2,
+    "GET /users/": 3,
+    "GET /users/me": 1,
+    "GET /users/{user_id}": 2,
+}
+
+
+@pytest.fixture(scope="module")
+def items(db: Session) -> None:
+    for _ in range(20):
+        create_random_item(db)
+
+
+@pytest.mark.parametrize("endpoint", BUDGETS)
+def test_query_budget(
+    endpoint: str,
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    db: Session,
+    items: None,  # noqa: ARG001
+) -> None:
+    item = create_random_item(db)
+    method, path = endpoint.split(" ")
+    path = path.format(item_id=item.id, user_id=item.owner_id)
+    with assert_max_statements(BUDGETS[endpoint]):
+        r = client.request(
+            method, f"{settings.API_V1_STR}{path}", headers=superuser_token_headers
+        )
+    assert r.status_code == 200
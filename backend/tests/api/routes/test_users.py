@@ -2,12 +2,15 @@ import uuid
 from unittest.mock import patch
 
 from fastapi.testclient import TestClient
-from sqlmodel import Session, select
+from sqlmodel import Session, col, select
 
+import app.purge  # noqa: F401, registers its job handlers
 from app import crud
 from app.core.config import settings
+from app.core.jobs import run_pending_jobs
 from app.core.security import verify_password
-from app.models import User, UserCreate
+from app.models import Item, ItemCreate, Job, User, UserCreate
+from tests.utils.user import create_random_user
 from tests.utils.utils import random_email, random_lower_string
 
 
@@ -146,6 +149,66 @@ def test_create_user_by_normal_user(
     assert r.status_code == 403
 
 
+def test_create_users_bulk(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    existing = create_random_user(db)
+    new_emails = [random_email() for _ in range(3)]
+    data = {
+        "data": [
+            {"email": email, "password": random_lower_string()}
+            for email in [*new_emails, existing.email, new_emails[0].upper()]
+        ]
+    }
+    with (
+        patch("app.utils.send_email", return_value=None) as send_email,
+        patch("app.core.config.settings.SMTP_HOST", "smtp.example.com"),
+        patch("app.core.config.settings.SMTP_USER", "admin@example.com"),
+    ):
+        r = client.post(
+            f"{settings.API_V1_STR}/users/bulk",
+            headers=superuser_token_headers,
+            json=data,
+        )
+        assert send_email.call_count == 0
+        job = db.exec(
+            select(Job)
+            .where(Job.name == "send_new_account_emails")
+            .order_by(col(Job.id).desc())
+        ).first()
+        assert job
+        assert job.status == "pending"
+        run_pending_jobs(session=db)
+    assert r.status_code == 200
+    content = r.json()
+    assert content["count"] == 3
+    assert sorted(user["email"] for user in content["data"]) == sorted(new_emails)
+    assert content["conflicts"] == [existing.email, new_emails[0]]
+    assert sorted(c.kwargs["email_to"] for c in send_email.call_args_list) == sorted(
+        new_emails
+    )
+    db.refresh(job)
+    assert job.status == "done"
+    # The passwords are not kept once sent
+    assert job.payload == {}
+    for email, user_in in zip(new_emails, data["data"], strict=False):
+        user = crud.get_user_by_email(session=db, email=email)
+        assert user
+        assert verify_password(user_in["password"], user.hashed_password)
+
+
+def test_create_users_bulk_by_normal_user(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    data = {"data": [{"email": random_email(), "password": random_lower_string()}]}
+    r = client.post(
+        f"{settings.API_V1_STR}/users/bulk",
+        headers=normal_user_token_headers,
+        json=data,
+    )
+    assert r.status_code == 403
+
+
 def test_retrieve_users(
     client: TestClient, superuser_token_headers: dict[str, str], db: Session
 ) -> None:
@@ -304,6 +367,24 @@ def test_register_user(client: TestClient, db: Session) -> None:
     assert verify_password(password, user_db.hashed_password)
 
 
+def test_register_user_email_case_insensitive(client: TestClient) -> None:
+    username = random_email()
+    password = random_lower_string()
+    data = {"email": username.upper(), "password": password}
+    r = client.post(f"{settings.API_V1_STR}/users/signup", json=data)
+    assert r.status_code == 200
+    assert r.json()["email"] == username
+
+    data = {"email": username.capitalize(), "password": random_lower_string()}
+    r = client.post(f"{settings.API_V1_STR}/users/signup", json=data)
+    assert r.status_code == 400
+
+    login_data = {"username": username.upper(), "password": password}
+    r = client.post(f"{settings.API_V1_STR}/login/access-token", data=login_data)
+    assert r.status_code == 200
+    assert "access_token" in r.json()
+
+
 def test_register_user_already_exists_error(client: TestClient) -> None:
     password = random_lower_string()
     full_name = random_lower_string()
@@ -402,9 +483,10 @@ def test_delete_user_me(client: TestClient, db: Session) -> None:
         f"{settings.API_V1_STR}/users/me",
         headers=headers,
     )
-    assert r.status_code == 200
+    assert r.status_code == 202
     deleted_user = r.json()
-    assert deleted_user["message"] == "User deleted successfully"
+    assert deleted_user["message"] == "User deletion started"
+    run_pending_jobs(session=db)
     result = db.exec(select(User).where(User.id == user_id)).first()
     assert result is None
 
@@ -437,13 +519,59 @@ def test_delete_user_super_user(
         f"{settings.API_V1_STR}/users/{user_id}",
         headers=superuser_token_headers,
     )
-    assert r.status_code == 200
+    assert r.status_code == 202
     deleted_user = r.json()
-    assert deleted_user["message"] == "User deleted successfully"
+    assert deleted_user["message"] == "User deletion started"
+    run_pending_jobs(session=db)
     result = db.exec(select(User).where(User.id == user_id)).first()
     assert result is None
 
 
+def test_delete_user_purges_items_in_batches(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    user = create_random_user(db)
+    user_id = user.id
+    for _ in range(5):
+        crud.create_item(session=db, item_in=ItemCreate(title="Foo"), owner_id=user_id)
+    with (
+        patch("app.core.config.settings.USER_PURGE_BATCH_SIZE", 2),
+        patch("app.core.config.settings.USER_PURGE_BATCH_DELAY_SECONDS", 0),
+    ):
+        r = client.delete(
+            f"{settings.API_V1_STR}/users/{user_id}",
+            headers=superuser_token_headers,
+        )
+        assert r.status_code == 202
+        r = client.get(
+            f"{settings.API_V1_STR}/users/{user_id}/deletion",
+            headers=superuser_token_headers,
+        )
+        assert r.json()["status"] == "pending"
+        run_pending_jobs(session=db)
+    r = client.get(
+        f"{settings.API_V1_STR}/users/{user_id}/deletion",
+        headers=superuser_token_headers,
+    )
+    assert r.status_code == 200
+    deletion = r.json()
+    assert deletion["status"] == "done"
+    assert deletion["items_deleted"] == 5
+    assert deletion["finished_at"]
+    assert db.exec(select(Item).where(Item.owner_id == user_id)).first() is None
+
+
+def test_read_user_deletion_not_found(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/users/{uuid.uuid4()}/deletion",
+        headers=superuser_token_headers,
+    )
+    assert r.status_code == 404
+    assert r.json()["detail"] == "User deletion not found"
+
+
 def test_delete_user_not_found(
     client: TestClient, superuser_token_headers: dict[str, str]
 ) -> None:
@@ -0,0 +1,20 @@
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.warmup import ready
+
+
+def test_readiness_check(client: TestClient) -> None:
+    r = client.get(f"{settings.API_V1_STR}/utils/readiness-check/")
+    assert r.status_code == 200
+    assert r.json() is True
+
+
+def test_readiness_check_warming_up(client: TestClient) -> None:
+    ready.clear()
+    try:
+        r = client.get(f"{settings.API_V1_STR}/utils/readiness-check/")
+    finally:
+        ready.set()
+    assert r.status_code == 503
+    assert r.json() == {"detail": "Warming up"}
@@ -5,22 +5,28 @@ from fastapi.testclient import TestClient
 from sqlmodel import Session, delete
 
 from app.core.config import settings
-from app.core.db import engine, init_db
+from app.core.db import get_engine, init_db
 from app.main import app
-from app.models import Item, User
+from app.models import Broadcast, Item, Job, User, UserDeletion
 from tests.utils.user import authentication_token_from_email
 from tests.utils.utils import get_superuser_token_headers
 
 
 @pytest.fixture(scope="session", autouse=True)
 def db() -> Generator[Session, None, None]:
-    with Session(engine) as session:
+    with Session(get_engine()) as session:
         init_db(session)
         yield session
         statement = delete(Item)
         session.execute(statement)
         statement = delete(User)
         session.execute(statement)
+        statement = delete(UserDeletion)
+        session.execute(statement)
+        statement = delete(Job)
+        session.execute(statement)
+        statement = delete(Broadcast)
+        session.execute(statement)
         session.commit()
 
 
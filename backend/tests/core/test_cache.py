@@ -0,0 +1,46 @@
+from app.core.cache import LRUCacheBackend
+
+
+def test_lru_cache_hit_and_miss() -> None:
+    cache = LRUCacheBackend(max_entries=10, max_bytes=1024)
+    assert cache.get("a") is None
+    cache.set("a", b"value")
+    assert cache.get("a") == b"value"
+    stats = cache.stats()
+    assert stats.hits == 1
+    assert stats.misses == 1
+    assert stats.hit_rate == 0.5
+    assert stats.entries == 1
+    assert stats.size_bytes == len(b"value")
+
+
+def test_lru_cache_evicts_least_recently_used() -> None:
+    cache = LRUCacheBackend(max_entries=2, max_bytes=1024)
+    cache.set("a", b"1")
+    cache.set("b", b"2")
+    assert cache.get("a") == b"1"
+    cache.set("c", b"3")
+    assert cache.get("b") is None
+    assert cache.get("a") == b"1"
+    assert cache.get("c") == b"3"
+    assert cache.stats().evictions == 1
+
+
+def test_lru_cache_memory_limit() -> None:
+    cache = LRUCacheBackend(max_entries=100, max_bytes=10)
+    cache.set("a", b"12345")
+    cache.set("b", b"12345")
+    cache.set("c", b"12345")
+    assert cache.get("a") is None
+    assert cache.stats().size_bytes == 10
+    cache.set("big", b"x" * 11)
+    assert cache.get("big") is None
+    assert cache.get("c") == b"12345"
+
+
+def test_lru_cache_clear() -> None:
+    cache = LRUCacheBackend(max_entries=10, max_bytes=1024)
+    cache.set("a", b"1")
+    cache.clear()
+    assert cache.get("a") is None
+    assert cache.stats().entries == 0
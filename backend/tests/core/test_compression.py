@@ -0,0 +1,119 @@
+import zlib
+from collections.abc import Callable, Iterator
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.core.compression import (
+    CompressionMiddleware,
+    available_encodings,
+    choose_encoding,
+    get_compressor,
+)
+
+LEVELS = {
+    "application/json": {"zstd": 3, "br": 4, "gzip": 6},
+    "text/event-stream": {"gzip": 1},
+}
+
+app = FastAPI()
+app.add_middleware(CompressionMiddleware, minimum_size=100, levels=LEVELS)
+
+
+@app.get("/json")
+def json_data(size: int) -> list[int]:
+    return list(range(size))
+
+
+@app.get("/text")
+def text_data() -> PlainTextResponse:
+    return PlainTextResponse("text " * 100)
+
+
+@app.get("/stream")
+def stream_data() -> StreamingResponse:
+    def events() -> Iterator[str]:
+        for number in range(3):
+            yield f"data: {number}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+client = TestClient(app)
+
+
+@pytest.mark.parametrize(
+    "accept_encoding,expected",
+    [
+        ("gzip, deflate, br, zstd", "zstd"),
+        ("gzip, br;q=0.9", "gzip"),
+        ("br;q=0.5, gzip;q=0.5", "br"),
+        ("*", "zstd"),
+        ("*;q=0.5, zstd;q=0", "br"),
+        ("identity", None),
+        ("gzip;q=0", None),
+        ("", None),
+    ],
+)
+def test_choose_encoding(accept_encoding: str, expected: str | None) -> None:
+    assert choose_encoding(accept_encoding, ["zstd", "br", "gzip"]) == expected
+
+
+def skip_unavailable(encoding: str) -> None:
+    if encoding not in available_encodings():
+        pytest.skip(f"{encoding} support is not installed")
+
+
+def get_decompress(encoding: str) -> Callable[[bytes], bytes]:
+    if encoding == "br":
+        import brotli
+
+        return brotli.Decompressor().process  # type: ignore[no-any-return]
+    if encoding == "zstd":
+        import zstandard
+
+        return zstandard.ZstdDecompressor().decompressobj().decompress
+    return zlib.decompressobj(31).decompress
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "br", "zstd"])
+def test_compress_response(encoding: str) -> None:
+    skip_unavailable(encoding)
+    r = client.get("/json?size=1000", headers={"Accept-Encoding": encoding})
+    assert r.status_code == 200
+    assert r.headers["content-encoding"] == encoding
+    assert r.headers["vary"] == "Accept-Encoding"
+    assert int(r.headers["content-length"]) < len(str(list(range(1000))))
+    assert r.json() == list(range(1000))
+
+
+def test_small_response_not_compressed() -> None:
+    r = client.get("/json?size=10", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in r.headers
+    assert r.headers["vary"] == "Accept-Encoding"
+    assert r.json() == list(range(10))
+
+
+def test_other_content_types_not_compressed() -> None:
+    r = client.get("/text", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in r.headers
+    assert "vary" not in r.headers
+
+
+def test_compress_streamed_response() -> None:
+    r = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert r.headers["content-encoding"] == "gzip"
+    assert "content-length" not in r.headers
+    assert r.text == "".join(f"data: {number}\n\n" for number in range(3))
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "br", "zstd"])
+def test_flushed_chunks_decode(encoding: str) -> None:
+    skip_unavailable(encoding)
+    decompress = get_decompress(encoding)
+    compressor = get_compressor(encoding, 1)
+    # Each flushed chunk can be decoded before the stream ends
+    for chunk in (b"data: 1\n\n", b"data: 2\n\n"):
+        assert decompress(compressor.compress(chunk) + compressor.flush()) == chunk
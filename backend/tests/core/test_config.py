@@ -0,0 +1,18 @@
+import pytest
+
+from app.core.config import Settings
+
+DEPLOYMENT = {
+    "ENVIRONMENT": "staging",
+    "SECRET_KEY": "secret-key",
+    "POSTGRES_PASSWORD": "postgres-password",
+    "FIRST_SUPERUSER_PASSWORD": "superuser-password",
+}
+
+
+def test_metrics_token_required_for_deployments() -> None:
+    with pytest.raises(ValueError, match="METRICS_BEARER_TOKEN"):
+        Settings(**DEPLOYMENT, METRICS_BEARER_TOKEN="")  # type: ignore[arg-type]
+    Settings(**DEPLOYMENT, METRICS_BEARER_TOKEN="token")  # type: ignore[arg-type]
+    Settings(**DEPLOYMENT, METRICS_ENABLED=False)  # type: ignore[arg-type]
+    Settings(ENVIRONMENT="local")  # type: ignore[call-arg]
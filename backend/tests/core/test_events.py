@@ -0,0 +1,61 @@
+import asyncio
+import uuid
+from unittest.mock import patch
+
+from app.core.events import ItemEvent, ItemEventBroker
+
+
+def make_event(id: int, owner_id: uuid.UUID) -> ItemEvent:
+    return ItemEvent(
+        id=id, action="created", item_id=str(uuid.uuid4()), owner_id=str(owner_id)
+    )
+
+
+def test_broker_fans_out_events_by_owner() -> None:
+    async def run() -> None:
+        broker = ItemEventBroker(history_size=10, queue_size=10)
+        owner_id = uuid.uuid4()
+        with patch.object(broker, "_ensure_listening"):
+            own, _ = broker.subscribe(owner_id=owner_id)
+            other, _ = broker.subscribe(owner_id=uuid.uuid4())
+            everything, _ = broker.subscribe(owner_id=None)
+        event = make_event(1, owner_id)
+        broker.dispatch(event)
+        assert own.queue.get_nowait() == event
+        assert other.queue.empty()
+        assert everything.queue.get_nowait() == event
+
+    asyncio.run(run())
+
+
+def test_broker_resumes_from_last_event_id() -> None:
+    async def run() -> None:
+        broker = ItemEventBroker(history_size=10, queue_size=10)
+        owner_id = uuid.uuid4()
+        events = [make_event(id, owner_id) for id in (3, 1, 2)]
+        for event in events:
+            broker.dispatch(event)
+        with patch.object(broker, "_ensure_listening"):
+            resumed, complete = broker.subscribe(owner_id=owner_id, last_event_id=3)
+            assert complete
+            assert resumed.queue.get_nowait() == events[1]
+            assert resumed.queue.get_nowait() == events[2]
+            _, complete = broker.subscribe(owner_id=owner_id, last_event_id=42)
+            assert not complete
+
+    asyncio.run(run())
+
+
+def test_broker_drops_slow_subscriber() -> None:
+    async def run() -> None:
+        broker = ItemEventBroker(history_size=10, queue_size=1)
+        owner_id = uuid.uuid4()
+        with patch.object(broker, "_ensure_listening"):
+            slow, _ = broker.subscribe(owner_id=owner_id)
+        broker.dispatch(make_event(1, owner_id))
+        broker.dispatch(make_event(2, owner_id))
+        assert slow.dropped
+        broker.dispatch(make_event(3, owner_id))
+        assert slow.queue.qsize() == 1
+
+    asyncio.run(run())
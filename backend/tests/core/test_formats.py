@@ -0,0 +1,133 @@
+import logging
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.formats import available_formats, choose_format, decode, encode
+
+
+@pytest.fixture(autouse=True)
+def formats_installed() -> None:
+    if available_formats() != {"msgpack", "cbor"}:
+        pytest.skip("msgpack and cbor2 are not installed")
+
+
+@pytest.mark.parametrize(
+    "accept,expected",
+    [
+        ("application/msgpack", "msgpack"),
+        ("application/x-msgpack", "msgpack"),
+        ("application/cbor", "cbor"),
+        ("application/cbor, application/json;q=0.5", "cbor"),
+        # JSON wins ties, browsers and the frontend client get JSON
+        ("application/msgpack, application/json", None),
+        ("application/json, text/plain, */*", None),
+        ("*/*", None),
+        ("application/json;q=0, */*", "msgpack"),
+        ("application/msgpack;q=0", None),
+        ("text/event-stream", None),
+        ("", None),
+    ],
+)
+def test_choose_format(accept: str, expected: str | None) -> None:
+    assert choose_format(accept) == expected
+
+
+@pytest.mark.parametrize("format", ["msgpack", "cbor"])
+def test_create_item_in_binary_format(
+    client: TestClient, superuser_token_headers: dict[str, str], format: str
+) -> None:
+    media_type = f"application/{format}"
+    data = {"title": "Binary", "description": "Sent as " + format}
+    r = client.post(
+        f"{settings.API_V1_STR}/items/",
+        headers={
+            **superuser_token_headers,
+            "Content-Type": media_type,
+            "Accept": media_type,
+        },
+        content=encode(format, data),
+    )
+    assert r.status_code == 200
+    assert r.headers["content-type"] == media_type
+    assert "Accept" in r.headers["vary"]
+    content = decode(format, r.content)
+    assert content["title"] == data["title"]
+    assert content["description"] == data["description"]
+    assert isinstance(content["id"], str)
+
+
+def test_json_by_default(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    r = client.get(f"{settings.API_V1_STR}/users/me", headers=superuser_token_headers)
+    assert r.headers["content-type"] == "application/json"
+    # Cached JSON must not be served to clients asking for a binary format
+    assert "Accept" in r.headers["vary"]
+    assert r.json()["email"] == settings.FIRST_SUPERUSER
+
+
+def test_errors_in_binary_format(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    r = client.post(
+        f"{settings.API_V1_STR}/items/",
+        headers={
+            **superuser_token_headers,
+            "Content-Type": "application/msgpack",
+            "Accept": "application/msgpack",
+        },
+        content=encode("msgpack", {"description": "No title"}),
+    )
+    assert r.status_code == 422
+    assert decode("msgpack", r.content)["detail"][0]["loc"] == ["body", "title"]
+
+
+def test_invalid_binary_body(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    r = client.post(
+        f"{settings.API_V1_STR}/items/",
+        headers={**superuser_token_headers, "Content-Type": "application/cbor"},
+        content=b"\xff\xff",
+    )
+    assert r.status_code == 400
+    assert r.json() == {"detail": "Invalid request body"}
+
+
+def test_binary_body_not_representable_in_json(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    r = client.post(
+        f"{settings.API_V1_STR}/items/",
+        headers={**superuser_token_headers, "Content-Type": "application/msgpack"},
+        content=encode("msgpack", {"title": b"\xff\xfe"}),
+    )
+    assert r.status_code == 400
+    assert r.json() == {"detail": "Invalid request body"}
+
+
+def test_binary_body_routing_seen_by_outer_middlewares(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    with caplog.at_level(logging.DEBUG, logger="app.core.queries"):
+        r = client.post(
+            f"{settings.API_V1_STR}/items/",
+            headers={**superuser_token_headers, "Content-Type": "application/cbor"},
+            content=encode("cbor", {"title": "Foo"}),
+        )
+    assert r.status_code == 200
+    record = next(r for r in caplog.records if "request executed" in r.message)
+    assert "endpoint=create_item" in record.message
+
+
+def test_openapi_stays_json(client: TestClient) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/openapi.json",
+        headers={"Accept": "application/msgpack"},
+    )
+    assert r.headers["content-type"] == "application/json"
+    assert r.json()["openapi"]
@@ -0,0 +1,165 @@
+from collections.abc import Generator
+from datetime import datetime, timedelta, timezone
+from typing import Any
+from unittest.mock import patch
+
+import pytest
+from sqlmodel import Session, delete
+
+from app.core.db import get_engine
+from app.core.jobs import (
+    claim_job,
+    enqueue_job,
+    finish_job,
+    job_handlers,
+    renew_job_lease,
+    run_job,
+    run_pending_jobs,
+)
+from app.models import Job
+
+calls: list[dict[str, Any]] = []
+
+
+def record(payload: dict[str, Any]) -> None:
+    calls.append(payload)
+
+
+def fail(payload: dict[str, Any]) -> None:
+    raise ValueError(payload["message"])
+
+
+def renew(payload: dict[str, Any]) -> None:
+    with Session(get_engine()) as session:
+        renew_job_lease(session=session)
+    calls.append(payload)
+
+
+@pytest.fixture(autouse=True)
+def handlers(db: Session) -> Generator[None, None, None]:
+    db.exec(delete(Job))  # type: ignore
+    db.commit()
+    calls.clear()
+    handlers = {"test_record": record, "test_fail": fail, "test_renew": renew}
+    with patch.dict(job_handlers, handlers):
+        yield
+
+
+def test_run_jobs_by_priority(db: Session) -> None:
+    enqueue_job(session=db, name="test_record", payload={"n": 1})
+    enqueue_job(session=db, name="test_record", payload={"n": 2}, priority=10)
+    enqueue_job(
+        session=db,
+        name="test_record",
+        payload={"n": 3},
+        run_at=datetime.now(timezone.utc) + timedelta(hours=1),
+    )
+    db.commit()
+    assert run_pending_jobs(session=db) == 2
+    assert calls == [{"n": 2}, {"n": 1}]
+
+
+def test_claimed_jobs_are_skipped(db: Session) -> None:
+    first = enqueue_job(session=db, name="test_record", payload={"n": 1}, priority=1)
+    enqueue_job(session=db, name="test_record", payload={"n": 2})
+    db.commit()
+    with Session(get_engine()) as other:
+        # Lock the first job without claiming it, as a worker in the middle of
+        # its claim would
+        assert other.get(Job, first.id, with_for_update=True)
+        job = claim_job(session=db)
+        assert job
+        assert job.payload == {"n": 2}
+        other.rollback()
+    job = claim_job(session=db)
+    assert job
+    assert job.payload == {"n": 1}
+
+
+def test_failed_job_is_retried_then_dead_lettered(db: Session) -> None:
+    job = enqueue_job(
+        session=db, name="test_fail", payload={"message": "boom"}, max_attempts=2
+    )
+    db.commit()
+    with patch("app.core.config.settings.JOBS_RETRY_BACKOFF_SECONDS", 60):
+        assert run_pending_jobs(session=db) == 1
+    db.refresh(job)
+    assert job.status == "pending"
+    assert job.attempts == 1
+    assert job.run_at > datetime.now(timezone.utc) + timedelta(seconds=50)
+    assert "boom" in (job.last_error or "")
+    # Not due yet
+    assert run_pending_jobs(session=db) == 0
+
+    job.run_at = datetime.now(timezone.utc)
+    db.add(job)
+    db.commit()
+    assert run_pending_jobs(session=db) == 1
+    db.refresh(job)
+    assert job.status == "dead"
+    assert job.attempts == 2
+    assert job.finished_at
+
+
+def test_unknown_job_is_dead_lettered(db: Session) -> None:
+    job = enqueue_job(session=db, name="test_unknown")
+    db.commit()
+    assert run_pending_jobs(session=db) == 1
+    db.refresh(job)
+    assert job.status == "dead"
+    assert job.attempts == 1
+
+
+def test_expired_lease_is_claimed_again(db: Session) -> None:
+    enqueue_job(session=db, name="test_record", payload={"n": 1})
+    db.commit()
+    with Session(get_engine()) as other:
+        with patch("app.core.config.settings.JOBS_LEASE_SECONDS", -1):
+            stale = claim_job(session=other)
+        assert stale
+        job = claim_job(session=db)
+        assert job
+        assert job.id == stale.id
+        assert job.attempts == 2
+        run_job(session=db, job=job)
+        # The outcome of the expired claim is ignored
+        finish_job(session=other, job=stale, error="lost")
+    db.refresh(job)
+    assert job.status == "done"
+    assert job.last_error is None
+
+
+def test_renewed_lease_is_not_claimed(db: Session) -> None:
+    enqueue_job(session=db, name="test_renew", payload={"n": 1})
+    db.commit()
+    with patch("app.core.config.settings.JOBS_LEASE_SECONDS", -1):
+        job = claim_job(session=db)
+    assert job
+
+    def run_other_jobs(payload: dict[str, Any]) -> None:
+        renew(payload)
+        # Expired when claimed, but renewed by the handler
+        with Session(get_engine()) as other:
+            assert claim_job(session=other) is None
+
+    with patch.dict(job_handlers, {"test_renew": run_other_jobs}):
+        run_job(session=db, job=job)
+    db.refresh(job)
+    assert job.status == "done"
+    assert calls == [{"n": 1}]
+
+
+def test_lost_lease_stops_the_handler(db: Session) -> None:
+    enqueue_job(session=db, name="test_renew", payload={"n": 1})
+    db.commit()
+    with Session(get_engine()) as other:
+        with patch("app.core.config.settings.JOBS_LEASE_SECONDS", -1):
+            stale = claim_job(session=other)
+        assert stale
+        job = claim_job(session=db)
+        assert job
+        run_job(session=other, job=stale)
+    assert calls == []
+    db.refresh(job)
+    assert job.status == "running"
+    assert job.attempts == 2
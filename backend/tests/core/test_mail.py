@@ -0,0 +1,91 @@
+import time
+from collections.abc import Callable, Generator
+from email.utils import parseaddr
+from typing import Any
+from unittest.mock import patch
+
+import pytest
+
+from app.core.mail import MailDispatcher, OutgoingEmail
+from tests.utils.smtp import SMTPServer, smtp_server
+
+
+@pytest.fixture
+def server() -> Generator[SMTPServer, None, None]:
+    with (
+        smtp_server() as server,
+        patch("app.core.config.settings.SMTP_HOST", "127.0.0.1"),
+        patch("app.core.config.settings.SMTP_PORT", server.port),
+        patch("app.core.config.settings.SMTP_TLS", False),
+        patch("app.core.config.settings.SMTP_USER", None),
+        patch("app.core.config.settings.EMAILS_FROM_EMAIL", "admin@example.com"),
+    ):
+        yield server
+
+
+def get_dispatcher(**kwargs: float) -> MailDispatcher:
+    options: dict[str, Any] = {"workers": 2, "batch_size": 10, "max_retries": 3}
+    options.update(kwargs)
+    return MailDispatcher(retry_backoff_seconds=0.01, idle_timeout_seconds=5, **options)
+
+
+def wait_for(condition: Callable[[], bool], timeout: float = 5) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def outgoing_email(number: int) -> OutgoingEmail:
+    return OutgoingEmail(
+        email_to=f"user{number}@example.com",
+        subject=f"Subject {number}",
+        html_content="<p>Hello</p>",
+    )
+
+
+def test_dispatcher_reuses_connections(server: SMTPServer) -> None:
+    dispatcher = get_dispatcher()
+    for number in range(25):
+        dispatcher.enqueue(outgoing_email(number))
+    dispatcher.close()
+    assert len(server.messages) == 25
+    assert server.connections <= 2
+    subjects = {message["Subject"] for message in server.messages}
+    assert subjects == {f"Subject {number}" for number in range(25)}
+    assert parseaddr(server.messages[0]["From"])[1] == "admin@example.com"
+
+
+def test_dispatcher_retries_temporary_failures(server: SMTPServer) -> None:
+    server.fail_next = ["451 Try again later", "451 Try again later"]
+    dispatcher = get_dispatcher()
+    dispatcher.enqueue(outgoing_email(1))
+    wait_for(lambda: len(server.messages) == 1)
+    dispatcher.close()
+    assert server.messages[0]["To"] == "user1@example.com"
+
+
+def test_dispatcher_gives_up_after_max_retries(server: SMTPServer) -> None:
+    server.fail_next = ["451 Try again later"] * 3 + ["550 Mailbox unavailable"]
+    dispatcher = get_dispatcher(max_retries=3)
+    dispatcher.enqueue(outgoing_email(1))
+    wait_for(lambda: len(server.fail_next) == 1)
+    # Permanent failures are not retried
+    dispatcher.enqueue(outgoing_email(2))
+    dispatcher.enqueue(outgoing_email(3))
+    wait_for(lambda: len(server.messages) == 1)
+    dispatcher.close()
+    assert [message["To"] for message in server.messages] == ["user3@example.com"]
+
+
+def test_dispatcher_flush_waits_for_retries(server: SMTPServer) -> None:
+    server.fail_next = ["451 Try again later", "550 Mailbox unavailable"]
+    dispatcher = get_dispatcher(rate_limit=50)
+    start = time.monotonic()
+    for number in range(5):
+        dispatcher.enqueue(outgoing_email(number))
+    assert dispatcher.flush(timeout=5)
+    # 6 attempts, spaced by the rate limit
+    assert time.monotonic() - start >= 0.1
+    assert len(server.messages) == 4
+    dispatcher.close()
@@ -0,0 +1,81 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.metrics import metrics_enabled
+from app.core.security import get_password_hash
+
+pytestmark = pytest.mark.skipif(
+    not metrics_enabled(), reason="prometheus-client is not installed"
+)
+
+WORKER = """
+from app.core.metrics import get_metrics, mark_process_dead
+
+metrics = get_metrics()
+metrics.request_seconds.labels("utils-health_check", "GET", "200").observe(0.1)
+metrics.requests_in_progress.inc()
+mark_process_dead()
+"""
+
+
+def test_metrics(client: TestClient, superuser_token_headers: dict[str, str]) -> None:
+    r = client.get(f"{settings.API_V1_STR}/items/", headers=superuser_token_headers)
+    assert r.status_code == 200
+    client.get("/not-found")
+
+    r = client.get("/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain")
+    samples = r.text
+    assert (
+        'http_request_duration_seconds_count{method="GET",route="items-read_items",'
+        'status="200"}'
+    ) in samples
+    assert 'route="unmatched",status="404"' in samples
+    assert 'db_pool_connections{state="checked_out"}' in samples
+    assert "threadpool_threads_limit 40.0" in samples
+    assert 'items_cache_lookups{result="hit"}' in samples
+    assert "items_cache_size_bytes" in samples
+    # The scrape itself
+    assert "http_requests_in_progress 1.0" in samples
+
+
+def test_metrics_bearer_token(client: TestClient) -> None:
+    with patch("app.core.config.settings.METRICS_BEARER_TOKEN", "secret"):
+        assert client.get("/metrics").status_code == 401
+        r = client.get("/metrics", headers={"Authorization": "Bearer secret"})
+    assert r.status_code == 200
+
+
+def test_password_hash_metrics() -> None:
+    from prometheus_client import REGISTRY
+
+    name = "password_hash_duration_seconds_count"
+    before = REGISTRY.get_sample_value(name, {"operation": "hash"}) or 0.0
+    get_password_hash("password")
+    assert REGISTRY.get_sample_value(name, {"operation": "hash"}) == before + 1
+
+
+def test_metrics_aggregated_across_workers(tmp_path: Path) -> None:
+    from prometheus_client import CollectorRegistry, multiprocess
+
+    env = {
+        **os.environ,
+        "PROMETHEUS_MULTIPROC_DIR": str(tmp_path),
+        "PYTHONPATH": str(Path(__file__).parents[2]),
+    }
+    for _ in range(2):
+        subprocess.run([sys.executable, "-c", WORKER], env=env, check=True)
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry, path=str(tmp_path))  # type: ignore[no-untyped-call]
+    labels = {"route": "utils-health_check", "method": "GET", "status": "200"}
+    assert registry.get_sample_value("http_request_duration_seconds_count", labels) == 2
+    # Stopped workers no longer count as handling requests
+    assert not registry.get_sample_value("http_requests_in_progress")
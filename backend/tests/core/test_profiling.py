@@ -0,0 +1,91 @@
+import asyncio
+import threading
+from collections import Counter
+from contextvars import copy_context
+from unittest.mock import patch
+
+from app.core.profiling import (
+    RateLimiter,
+    Sampler,
+    active_sampler,
+    call_tree,
+    collapsed_stacks,
+    parse_collapsed_stacks,
+    register_thread,
+)
+
+
+def test_collapsed_stacks_round_trip() -> None:
+    samples = Counter({("main (a.py:1)", "read (b.py:2)"): 3, ("main (a.py:1)",): 1})
+    assert collapsed_stacks(samples) == (
+        "main (a.py:1);read (b.py:2) 3\nmain (a.py:1) 1\n"
+    )
+    assert parse_collapsed_stacks(collapsed_stacks(samples)) == samples
+
+
+def test_call_tree() -> None:
+    samples = Counter(
+        {
+            ("main", "render"): 1,
+            ("main", "query"): 3,
+            ("main", "query", "fetch"): 196,
+        }
+    )
+    assert call_tree(samples) == (
+        "200 samples\n"
+        "100.0%    200  main\n"
+        " 99.5%    199    query\n"
+        " 98.0%    196      fetch\n"
+        "  0.5%      1    render\n"
+    )
+    assert "render" not in call_tree(samples, min_share=0.01)
+
+
+def test_rate_limiter() -> None:
+    rate_limiter = RateLimiter(limit=2, period=60)
+    with patch("app.core.profiling.time.monotonic", return_value=0.0):
+        assert rate_limiter.acquire()
+        # One at a time
+        assert not rate_limiter.acquire()
+        rate_limiter.release()
+        assert rate_limiter.acquire()
+        rate_limiter.release()
+        assert not rate_limiter.acquire()
+    with patch("app.core.profiling.time.monotonic", return_value=60.0):
+        assert rate_limiter.acquire()
+
+
+def registered_work(done: threading.Event) -> None:
+    register_thread()
+    done.wait()
+
+
+def other_work(done: threading.Event) -> None:
+    register_thread()
+    done.wait()
+
+
+def test_sampler_samples_registered_threads() -> None:
+    async def profile() -> Sampler:
+        sampler = Sampler(interval=0.001, max_seconds=5)
+        token = active_sampler.set(sampler)
+        done = threading.Event()
+        # Only the first thread runs in the context of the profiled request
+        threads = [
+            threading.Thread(target=copy_context().run, args=(registered_work, done)),
+            threading.Thread(target=other_work, args=(done,)),
+        ]
+        active_sampler.reset(token)
+        for thread in threads:
+            thread.start()
+        sampler.start()
+        await asyncio.sleep(0.05)
+        done.set()
+        for thread in threads:
+            thread.join()
+        sampler.stop()
+        return sampler
+
+    stacks = collapsed_stacks(asyncio.run(profile()).samples)
+    assert "registered_work (" in stacks
+    assert "other_work (" not in stacks
@@ -0,0 +1,54 @@
+import logging
+import uuid
+from unittest.mock import patch
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+
+from app.core.db import get_engine
+from app.core.queries import QueryCountMiddleware, parameters_shape
+from app.models import User
+
+
+def test_parameters_shape() -> None:
+    assert parameters_shape({"id": uuid.uuid4(), "limit": 100}) == (
+        "{id: UUID, limit: int}"
+    )
+    assert parameters_shape(("a", None)) == "(str, NoneType)"
+    assert parameters_shape([{"title": "a"}, {"title": "b"}], executemany=True) == (
+        "2 x {title: str}"
+    )
+
+
+def test_slow_statement_logged(db: Session, caplog: pytest.LogCaptureFixture) -> None:
+    with (
+        patch("app.core.config.settings.SLOW_STATEMENT_THRESHOLD_SECONDS", 0.0),
+        caplog.at_level(logging.WARNING, logger="app.core.queries"),
+    ):
+        db.exec(select(User).where(User.email == "secret@example.com")).first()
+    record = next(r for r in caplog.records if "slow statement" in r.message)
+    assert 'FROM "user"' in record.message
+    assert "parameters={email_1: str}" in record.message
+    assert "secret@example.com" not in record.message
+
+
+def test_query_count_middleware(caplog: pytest.LogCaptureFixture) -> None:
+    app = FastAPI()
+    app.add_middleware(QueryCountMiddleware, threshold=2)
+
+    @app.get("/users")
+    def read_users() -> int:
+        with Session(get_engine()) as session:
+            for _ in range(3):
+                session.exec(select(User)).first()
+        return 3
+
+    with caplog.at_level(logging.DEBUG, logger="app.core.queries"):
+        with TestClient(app) as client:
+            client.get("/users")
+    record = next(r for r in caplog.records if "request executed" in r.message)
+    assert record.levelno == logging.WARNING
+    assert "executed 3 statements" in record.message
+    assert "endpoint=read_users" in record.message
@@ -0,0 +1,27 @@
+import json
+import uuid
+
+from app.core.responses import PydanticJSONResponse, TrustedResponse
+from app.models import ItemPublic, ItemsPublic
+
+
+def test_pydantic_json_response() -> None:
+    content = {"data": [{"title": "Café", "id": 1}], "count": 1, "next": None}
+    response = PydanticJSONResponse(content)
+    assert response.media_type == "application/json"
+    assert json.loads(bytes(response.body)) == content
+
+
+def test_pydantic_json_response_not_finite() -> None:
+    response = PydanticJSONResponse({"values": [float("nan"), float("inf"), 1.5]})
+    assert response.body == b'{"values":[null,null,1.5]}'
+
+
+def test_trusted_response() -> None:
+    item = ItemPublic(id=uuid.uuid4(), owner_id=uuid.uuid4(), title="Item")
+    page = ItemsPublic(data=[item], count=1)
+    response = TrustedResponse(page)
+    assert response.headers["content-type"] == "application/json"
+    assert ItemsPublic.model_validate_json(bytes(response.body)) == page
+    # Already serialized pages are sent as they are
+    assert TrustedResponse(response.body).body == response.body
@@ -0,0 +1,64 @@
+from collections.abc import Generator
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from jinja2 import Environment, FileSystemLoader, ModuleLoader, Template
+
+from app.core import templates
+from app.core.templates import (
+    EMAIL_TEMPLATES_DIR,
+    get_email_templates,
+    load_email_templates,
+    render_email_template,
+)
+
+CONTEXT = {
+    "project_name": "Project",
+    "username": "user@example.com",
+    "email": "user@example.com",
+    "valid_hours": 48,
+    "link": "http://localhost/reset",
+}
+
+
+@pytest.fixture(autouse=True)
+def clear_environment() -> Generator[None, None, None]:
+    get_email_templates.cache_clear()
+    yield
+    get_email_templates.cache_clear()
+
+
+def test_render_email_template() -> None:
+    source = (EMAIL_TEMPLATES_DIR / "reset_password.html").read_text()
+    html_content = render_email_template(
+        template_name="reset_password.html", context=CONTEXT
+    )
+    assert html_content == Template(source).render(CONTEXT)
+
+
+def test_loaded_templates_are_not_read_again() -> None:
+    load_email_templates()
+    with (
+        patch.object(FileSystemLoader, "get_source", side_effect=AssertionError),
+        patch.object(Environment, "compile", side_effect=AssertionError),
+    ):
+        html_content = render_email_template(
+            template_name="new_account.html", context=CONTEXT
+        )
+    assert "user@example.com" in html_content
+
+
+def test_precompiled_templates(tmp_path: Path) -> None:
+    environment = Environment(loader=FileSystemLoader(EMAIL_TEMPLATES_DIR))
+    environment.compile_templates(tmp_path, zip=None)
+    with (
+        patch.object(templates, "COMPILED_EMAIL_TEMPLATES_DIR", tmp_path),
+        patch.object(FileSystemLoader, "get_source", side_effect=AssertionError),
+        patch.object(Environment, "compile", side_effect=AssertionError),
+    ):
+        html_content = render_email_template(
+            template_name="test_email.html", context=CONTEXT
+        )
+        assert isinstance(get_email_templates().loader.loaders[0], ModuleLoader)  # type: ignore[union-attr]
+    assert "user@example.com" in html_content
@@ -0,0 +1,57 @@
+import logging
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.timing import Timings, request_timings, timed
+
+
+def test_timed_outside_sampled_request() -> None:
+    with timed("page"):
+        pass
+    assert request_timings.get() is None
+
+
+def test_timed_adds_up() -> None:
+    timings = Timings()
+    token = request_timings.set(timings)
+    try:
+        with timed("page"):
+            pass
+        with timed("page"):
+            pass
+    finally:
+        request_timings.reset(token)
+    assert list(timings.phases) == ["page"]
+    assert timings.server_timing().startswith("page;dur=")
+
+
+def test_server_timing_sampled(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    with (
+        patch("app.core.timing.random.random", return_value=0.0),
+        caplog.at_level(logging.INFO, logger="app.core.timing"),
+    ):
+        r = client.get(f"{settings.API_V1_STR}/items/", headers=superuser_token_headers)
+    assert r.status_code == 200
+    phases = {
+        metric.split(";")[0].strip() for metric in r.headers["server-timing"].split(",")
+    }
+    assert {"auth", "user", "db", "count", "page", "total"} <= phases
+    record = next(r for r in caplog.records if "request timings" in r.message)
+    assert "endpoint=read_items status=200" in record.message
+    assert "page" in record.timings  # type: ignore[attr-defined]
+
+
+def test_server_timing_not_sampled(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    with patch("app.core.timing.random.random", return_value=0.999):
+        r = client.get(f"{settings.API_V1_STR}/items/", headers=superuser_token_headers)
+    assert r.status_code == 200
+    assert "server-timing" not in r.headers
@@ -0,0 +1,99 @@
+from collections.abc import Generator
+from typing import TYPE_CHECKING
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.tracing import opentelemetry_installed, traced
+
+if TYPE_CHECKING:
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+        InMemorySpanExporter,
+    )
+
+pytestmark = pytest.mark.skipif(
+    not opentelemetry_installed(), reason="opentelemetry-sdk is not installed"
+)
+
+
+@pytest.fixture
+def exporter() -> Generator["InMemorySpanExporter", None, None]:
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+        InMemorySpanExporter,
+    )
+
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    with patch("app.core.tracing._tracer", provider.get_tracer("test")):
+        yield exporter
+
+
+def test_traced_disabled() -> None:
+    with traced("nothing"):
+        pass
+
+
+def test_request_spans(
+    exporter: "InMemorySpanExporter",
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+) -> None:
+    r = client.get(f"{settings.API_V1_STR}/items/", headers=superuser_token_headers)
+    assert r.status_code == 200
+    spans = {span.name: span for span in exporter.get_finished_spans()}
+    request = spans[f"GET {settings.API_V1_STR}/items/"]
+    assert request.attributes is not None
+    assert request.attributes["http.response.status_code"] == 200
+    assert request.parent is None
+    for name in ["get_current_user", "SELECT"]:
+        assert spans[name].context is not None and request.context is not None
+        assert spans[name].context.trace_id == request.context.trace_id
+
+
+def test_request_continues_client_trace(
+    exporter: "InMemorySpanExporter", client: TestClient
+) -> None:
+    trace_id = "4bf92f3577b34da6a3ce929d0e0e4736"
+    client.get(
+        f"{settings.API_V1_STR}/utils/health-check/",
+        headers={"traceparent": f"00-{trace_id}-00f067aa0ba902b7-01"},
+    )
+    (span,) = exporter.get_finished_spans()
+    assert span.context is not None
+    assert format(span.context.trace_id, "032x") == trace_id
+
+
+def test_tail_sampling() -> None:
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+        InMemorySpanExporter,
+    )
+    from opentelemetry.trace import Status, StatusCode
+
+    from app.core.tail_sampling import TailSamplingSpanProcessor
+
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(
+        TailSamplingSpanProcessor(
+            SimpleSpanProcessor(exporter), sample_rate=0.0, slow_seconds=60
+        )
+    )
+    tracer = provider.get_tracer("test")
+    with tracer.start_as_current_span("fast"):
+        with tracer.start_as_current_span("child"):
+            pass
+    assert not exporter.get_finished_spans()
+    with tracer.start_as_current_span("failed"):
+        with tracer.start_as_current_span("child") as child:
+            child.set_status(Status(StatusCode.ERROR))
+    assert [span.name for span in exporter.get_finished_spans()] == [
+        "child",
+        "failed",
+    ]
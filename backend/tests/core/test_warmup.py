@@ -0,0 +1,12 @@
+from app.core.db import get_engine
+from app.core.warmup import warm_up_pool
+
+
+def test_warm_up_pool() -> None:
+    engine = get_engine()
+    engine.dispose()
+    warm_up_pool(3)
+    assert engine.pool.checkedin() == 3  # type: ignore[attr-defined]
+    # Never more than the pool keeps
+    warm_up_pool(100)
+    assert engine.pool.checkedin() == engine.pool.size()  # type: ignore[attr-defined]
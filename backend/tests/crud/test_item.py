@@ -0,0 +1,70 @@
+import uuid
+
+from sqlmodel import Session, col, update
+
+from app import crud
+from app.models import ItemCreate, ItemPublic, ItemsPublic, User
+from tests.utils.item import create_random_item
+from tests.utils.utils import random_lower_string
+
+
+def test_get_item(db: Session) -> None:
+    item = create_random_item(db)
+    assert crud.get_item(session=db, item_id=item.id) == item
+    assert crud.get_item(session=db, item_id=item.id, owner_id=item.owner_id) == item
+
+
+def test_get_item_other_owner(db: Session) -> None:
+    item = create_random_item(db)
+    assert crud.get_item(session=db, item_id=item.id, owner_id=uuid.uuid4()) is None
+
+
+def test_get_items_page_json(db: Session) -> None:
+    item = create_random_item(db)
+    crud.create_item(
+        session=db,
+        item_in=ItemCreate(title=random_lower_string(), description='"quoted" é'),
+        owner_id=item.owner_id,
+    )
+    body = crud.get_items_page_json(
+        session=db, count=2, skip=0, limit=10, owner_id=item.owner_id
+    )
+    page = ItemsPublic.model_validate_json(body)
+    assert page.count == 2
+    assert ItemPublic.model_validate(item) in page.data
+    assert {i.description for i in page.data} == {item.description, '"quoted" é'}
+
+    body = crud.get_items_page_json(
+        session=db, count=2, skip=2, limit=10, owner_id=item.owner_id
+    )
+    assert ItemsPublic.model_validate_json(body) == ItemsPublic(data=[], count=2)
+
+
+def test_item_count_maintained(db: Session) -> None:
+    item = create_random_item(db)
+    owner = db.get(User, item.owner_id)
+    assert owner
+    db.refresh(owner)
+    assert owner.item_count == 1
+    db.delete(item)
+    crud.record_item_change(session=db, item=item, action="deleted")
+    db.commit()
+    db.refresh(owner)
+    assert owner.item_count == 0
+    item_in = ItemCreate(title=random_lower_string())
+    crud.create_item(session=db, item_in=item_in, owner_id=owner.id)
+    db.refresh(owner)
+    assert owner.item_count == 1
+
+
+def test_reconcile_item_counts(db: Session) -> None:
+    item = create_random_item(db)
+    statement = update(User).where(col(User.id) == item.owner_id).values(item_count=7)
+    db.exec(statement)  # type: ignore
+    db.commit()
+    assert crud.reconcile_item_counts(session=db, batch_size=2) >= 1
+    owner = db.get(User, item.owner_id)
+    assert owner
+    db.refresh(owner)
+    assert owner.item_count == 1
+    assert crud.reconcile_item_counts(session=db, batch_size=2) == 0
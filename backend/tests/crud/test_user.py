@@ -1,9 +1,12 @@
+from typing import Any, get_args
+
+import pytest
 from fastapi.encoders import jsonable_encoder
-from sqlmodel import Session
+from sqlmodel import Session, func, select, text
 
 from app import crud
 from app.core.security import verify_password
-from app.models import User, UserCreate, UserUpdate
+from app.models import User, UserCreate, UserOrderBy, UserUpdate
 from tests.utils.utils import random_email, random_lower_string
 
 
@@ -16,6 +19,24 @@ def test_create_user(db: Session) -> None:
     assert hasattr(user, "hashed_password")
 
 
+def test_create_user_if_not_exists(db: Session) -> None:
+    email = random_email()
+    user_in = UserCreate(email=email, password=random_lower_string())
+    user = crud.create_user_if_not_exists(session=db, user_create=user_in)
+    assert user
+    assert user.email == email
+    assert crud.get_user_by_email(session=db, email=email) == user
+
+
+def test_create_user_if_not_exists_conflict(db: Session) -> None:
+    email = random_email()
+    user_in = UserCreate(email=email, password=random_lower_string())
+    user = crud.create_user(session=db, user_create=user_in)
+    other_in = UserCreate(email=email, password=random_lower_string())
+    assert crud.create_user_if_not_exists(session=db, user_create=other_in) is None
+    assert crud.get_user_by_email(session=db, email=email) == user
+
+
 def test_authenticate_user(db: Session) -> None:
     email = random_email()
     password = random_lower_string()
@@ -26,6 +47,15 @@ def test_authenticate_user(db: Session) -> None:
     assert user.email == authenticated_user.email
 
 
+def test_get_user_by_email_case_insensitive(db: Session) -> None:
+    email = random_email()
+    user_in = UserCreate(email=email.upper(), password=random_lower_string())
+    user = crud.create_user(session=db, user_create=user_in)
+    assert user.email == email
+    assert crud.get_user_by_email(session=db, email=email.upper()) == user
+    assert crud.get_user_by_email(session=db, email=email.capitalize()) == user
+
+
 def test_not_authenticate_user(db: Session) -> None:
     email = random_email()
     password = random_lower_string()
@@ -89,3 +119,68 @@ def test_update_user(db: Session) -> None:
     assert user_2
     assert user.email == user_2.email
     assert verify_password(new_password, user_2.hashed_password)
+
+
+def user_list_indexes(filters: dict[str, Any], order_by: UserOrderBy) -> set[str]:
+    """
+    The indexes able to serve a page of the admin user list.
+    """
+    if "search" in filters:
+        return {"ix_user_email_trgm", "ix_user_full_name_trgm"}
+    column = "email" if order_by.lstrip("-") == "email" else "full_name_id"
+    for flag in ("is_active", "is_superuser"):
+        if flag in filters:
+            return {f"ix_user_{flag}_{column}"}
+    return {"ix_user_email" if column == "email" else "ix_user_full_name_id"}
+
+
+@pytest.mark.parametrize("order_by", get_args(UserOrderBy))
+@pytest.mark.parametrize(
+    "filters",
+    [
+        {},
+        # Selective values, scanning the sorted index and filtering is cheaper
+        # when most rows match
+        {"is_active": False},
+        {"is_superuser": True},
+        {"search": "example"},
+        {"is_active": False, "search": "example"},
+    ],
+)
+def test_user_list_uses_indexes(
+    db: Session, filters: dict[str, Any], order_by: UserOrderBy
+) -> None:
+    conditions = crud.get_user_filters(**filters)
+    count_statement = select(func.count()).select_from(User).where(*conditions)
+    page_statement = (
+        select(User)
+        .where(*conditions)
+        .order_by(*crud.USER_ORDER_BY[order_by])
+        .offset(100)
+        .limit(100)
+    )
+    # Estimate the filters from the rows the other tests left, not from stale
+    # statistics
+    db.exec(text('ANALYZE "user"'))  # type: ignore
+    # The test table is tiny, make sequential scans and sorts the last resort so
+    # the plan shows whether an index can serve the query, in order, at all
+    db.exec(text("SET LOCAL enable_seqscan = off"))  # type: ignore
+    db.exec(text("SET LOCAL enable_sort = off"))  # type: ignore
+    try:
+        for statement in (count_statement, page_statement):
+            compiled = statement.compile(db.get_bind())
+            result = db.connection().exec_driver_sql(
+                f"EXPLAIN {compiled}", compiled.params
+            )
+            plan = "\n".join(result.scalars())
+            assert "Seq Scan" not in plan, plan
+            if "search" not in filters:
+                # Not a full index scan discarding the rows filtered out
+                assert "Filter:" not in plan, plan
+            if statement is page_statement:
+                indexes = user_list_indexes(filters, order_by)
+                assert any(f" {index} " in plan for index in indexes), plan
+                if "search" not in filters:
+                    assert "Sort" not in plan, plan
+    finally:
+        db.rollback()
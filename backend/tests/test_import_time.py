@@ -0,0 +1,39 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).parent.parent
+# Cold imports of the app, paid by every worker (re)start, alembic run and client
+# generation. app.main takes about 1.1s, the margin is for slower CI machines
+IMPORT_TIME_BUDGET_SECONDS = 1.5
+# Only needed once the app runs, they must be imported on first use
+LAZY_MODULES = ["psycopg", "sentry_sdk"]
+
+
+def import_times(module: str) -> dict[str, float]:
+    """
+    Cumulative import time in seconds of each module imported by `module`.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line.removeprefix("import time:").split("|")
+        times[name.strip()] = int(cumulative) / 1_000_000
+    return times
+
+
+@pytest.mark.parametrize("module", ["app.main", "app.models"])
+def test_import_time(module: str) -> None:
+    times = import_times(module)
+    assert times[module] < IMPORT_TIME_BUDGET_SECONDS
+    assert not [name for name in LAZY_MODULES if name in times]
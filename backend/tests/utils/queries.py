@@ -0,0 +1,32 @@
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any
+
+from sqlalchemy import Connection, event
+
+from app.core.db import get_engine
+
+
+@contextmanager
+def assert_max_statements(budget: int) -> Iterator[list[str]]:
+    """
+    Fail when more than `budget` statements are executed in the block, such as
+    by a request made with the test client.
+    """
+    statements: list[str] = []
+
+    def before_cursor_execute(
+        _conn: Connection, _cursor: Any, statement: str, *_: Any
+    ) -> None:
+        statements.append(statement)
+
+    engine = get_engine()
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    executed = "\n\n".join(statements)
+    assert len(statements) <= budget, (
+        f"{len(statements)} statements executed, the budget is {budget}:\n\n{executed}"
+    )
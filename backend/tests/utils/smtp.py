@@ -0,0 +1,75 @@
+import socketserver
+import threading
+from collections.abc import Generator
+from contextlib import contextmanager
+from email import message_from_bytes
+from email.message import Message
+
+
+class SMTPServer(socketserver.ThreadingTCPServer):
+    """
+    Minimal plain SMTP server recording the messages it receives.
+
+    `fail_next` makes the next data transfers fail with the given reply.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), SMTPHandler)
+        self.messages: list[Message] = []
+        self.connections = 0
+        self.fail_next: list[str] = []
+        self.lock = threading.Lock()
+
+    @property
+    def port(self) -> int:
+        return int(self.server_address[1])
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    server: SMTPServer
+
+    def reply(self, line: str) -> None:
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self) -> None:
+        with self.server.lock:
+            self.server.connections += 1
+        self.reply("220 localhost")
+        while line := self.rfile.readline():
+            command = line.decode().strip().split(" ", 1)[0].upper()
+            if command == "EHLO":
+                self.reply("250 localhost")
+            elif command in ("HELO", "MAIL", "RCPT", "RSET", "NOOP"):
+                self.reply("250 OK")
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data = b""
+                while (chunk := self.rfile.readline()) not in (b".\r\n", b""):
+                    data += chunk
+                with self.server.lock:
+                    failure = (
+                        self.server.fail_next.pop(0) if self.server.fail_next else None
+                    )
+                    if failure is None:
+                        self.server.messages.append(message_from_bytes(data))
+                self.reply(failure or "250 OK")
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+@contextmanager
+def smtp_server() -> Generator[SMTPServer, None, None]:
+    server = SMTPServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
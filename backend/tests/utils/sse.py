@@ -0,0 +1,109 @@
+import asyncio
+import json
+from typing import Any
+
+from starlette.types import ASGIApp, Message
+
+
+class EventStream:
+    """
+    A streamed response read while it is being sent, the test client only
+    returns once the response is complete.
+
+    Sending can be paused to act as a slow client. Leaving the block disconnects
+    the client.
+    """
+
+    def __init__(self, app: ASGIApp, path: str, headers: dict[str, str]) -> None:
+        self.app = app
+        self.scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "root_path": "",
+            "query_string": b"",
+            "headers": [
+                (name.lower().encode(), value.encode())
+                for name, value in headers.items()
+            ],
+            "server": ("testserver", 80),
+            "client": ("testclient", 50000),
+        }
+        self.status: int | None = None
+        self.text = ""
+        self.ended = False
+        self.started = asyncio.Event()
+        self.resumed = asyncio.Event()
+        self.resumed.set()
+        self._received = asyncio.Condition()
+        self._request_sent = False
+        self._disconnected = asyncio.Event()
+
+    async def __aenter__(self) -> "EventStream":
+        self._task = asyncio.create_task(
+            self.app(self.scope, self._receive, self._send)
+        )
+        await asyncio.wait_for(self.started.wait(), 5)
+        return self
+
+    async def __aexit__(self, *_: Any) -> None:
+        self._disconnected.set()
+        self.resumed.set()
+        await asyncio.wait_for(self._task, 5)
+
+    async def _receive(self) -> Message:
+        if not self._request_sent:
+            self._request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await self._disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def _send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.status = message["status"]
+            self.started.set()
+            return
+        await self.resumed.wait()
+        async with self._received:
+            self.text += message.get("body", b"").decode()
+            self.ended = not message.get("more_body", False)
+            self._received.notify_all()
+
+    async def read_until(self, text: str, timeout: float = 5) -> str:
+        """
+        Wait for `text` to be sent, returns what was sent so far.
+        """
+        async with self._received:
+            await asyncio.wait_for(
+                self._received.wait_for(lambda: text in self.text or self.ended),
+                timeout,
+            )
+        assert text in self.text, self.text
+        return self.text
+
+    async def wait_ended(self, timeout: float = 5) -> None:
+        async with self._received:
+            await asyncio.wait_for(self._received.wait_for(lambda: self.ended), timeout)
+
+    def events(self) -> list[dict[str, Any]]:
+        """
+        The events received, with their id, type and decoded data.
+        """
+        events = []
+        for block in self.text.split("\n\n"):
+            fields = dict(
+                line.split(": ", 1) for line in block.splitlines() if ": " in line
+            )
+            if "event" in fields:
+                events.append(
+                    {
+                        "id": int(fields["id"]) if "id" in fields else None,
+                        "event": fields["event"],
+                        "data": json.loads(fields["data"]),
+                    }
+                )
+        return events